@@ -0,0 +1,86 @@
+"""
+Benchmark: concurrent API throughput with blocking database calls.
+
+The Supabase client is synchronous. Called directly from an async endpoint it
+blocks the event loop for the whole round trip, so concurrent requests are
+served one at a time. This runs the same endpoint against a simulated DB call
+(a sleep of --latency seconds) called inline and through the bounded DB thread
+pool (db/pool.py), and reports throughput and when the median and 95th
+percentile request had completed.
+
+Usage:
+    python benchmarks/bench_db_offload.py [--requests 200] [--concurrency 50] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from freelingo_agent.config import DB_POOL_SIZE
+from freelingo_agent.db.pool import run_db
+
+
+def build_app(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    def fake_db_query(user_id: str) -> List[dict]:
+        time.sleep(latency)  # network round trip of the blocking client
+        return [{"user_id": user_id, "word": "bonjour"}]
+
+    @app.get("/inline/{user_id}")
+    async def inline(user_id: str):
+        return fake_db_query(user_id)
+
+    @app.get("/pooled/{user_id}")
+    async def pooled(user_id: str):
+        return await run_db(fake_db_query, user_id)
+
+    return app
+
+
+async def measure(label: str, client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    started = time.perf_counter()
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            response = await client.get(f"{path}/user{i}")
+            response.raise_for_status()
+        # From the start of the run: with a blocked loop, queued requests wait before they are even sent
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<8} {requests / elapsed:>10.1f} req/s {statistics.median(latencies) * 1000:>10.1f} ms {p95 * 1000:>10.1f} ms")
+
+
+async def run(args: argparse.Namespace) -> None:
+    app = build_app(args.latency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{args.requests} requests, concurrency {args.concurrency}, "
+              f"{args.latency * 1000:.0f} ms simulated DB latency, DB pool size {DB_POOL_SIZE}")
+        print(f"{'db call':<8} {'throughput':>16} {'p50 done':>13} {'p95 done':>10}")
+        await measure("inline", client, "/inline", args.requests, args.concurrency)
+        await measure("pooled", client, "/pooled", args.requests, args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="total requests per variant")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated DB round trip in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
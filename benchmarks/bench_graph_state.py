@@ -0,0 +1,120 @@
+"""
+Benchmark: workflow state handling on large sessions.
+
+Compares the previous GraphState shape (carrying the whole UserSession with its
+pydantic-ai message history, per-word models and last agent response) against
+the lean GraphState (transcript + known word strings). For each shape it
+measures what LangGraph does around every node: re-validating the state into
+the schema and serializing it for the checkpointer.
+
+Usage:
+    python benchmarks/bench_graph_state.py [--turns 200] [--words 2000] [--nodes 16]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from pydantic import BaseModel, Field
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, ToolCallPart, UserPromptPart
+
+from freelingo_agent.agents.agents_config import DIALOGUE_AGENT_PROMPT
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.user_session import UserSession
+from freelingo_agent.models.words_model import Word, WordSuggestion
+
+
+class LegacyGraphState(BaseModel):
+    """The pre-slimming state shape, reproduced for comparison"""
+    user_id: str
+    user_session: UserSession
+    session_id: Optional[str] = None
+    transcript: Optional[Transcript] = None
+    last_feedback: Optional[FeedbackAgentOutput] = None
+    last_plan: Optional[PlannerAgentOutput] = None
+    last_words: Optional[WordSuggestion] = None
+    last_referee_decision: Optional[RefereeAgentOutput] = None
+    referee_feedback_history: List[RefereeAgentOutput] = Field(default_factory=list)
+    state_transitions: List[str] = Field(default_factory=list)
+
+
+def build_session(turns: int, word_count: int):
+    """A long session: known words, full message history and the matching transcript"""
+    words = [Word(id=str(i), user_id="bench_user", word=f"mot{i}", translation=f"word {i}") for i in range(word_count)]
+    system_prompt = DIALOGUE_AGENT_PROMPT.format(known_words=json.dumps([w.word for w in words]))
+
+    history = []
+    transcript_turns = []
+    for i in range(turns):
+        response = {
+            "rationale": {
+                "reasoning_summary": f"Turn {i}: keep the conversation going with known words.",
+                "vocabulary_challenge": {"description": "Limited verbs available.", "tags": ["no_verbs"]},
+                "rule_checks": {
+                    "used_only_allowed_vocabulary": True,
+                    "one_sentence": True,
+                    "max_eight_words": True,
+                    "no_corrections_or_translations": True,
+                },
+            },
+            "ai_reply": {"text": f"mot{i} ou mot{i + 1} ?", "word_count": 3},
+        }
+        # pydantic-ai resends the system prompt in the first request of every run
+        history.append(ModelRequest(parts=[SystemPromptPart(content=system_prompt), UserPromptPart(content=f"réponse {i}")]))
+        history.append(ModelResponse(parts=[ToolCallPart(tool_name="final_result", args=json.dumps(response))]))
+        transcript_turns.append({"ai_turn": response, "user_turn": {"text": f"réponse {i}"}})
+
+    session = UserSession(
+        user_id="bench_user",
+        session_id="bench_session",
+        known_words=words,
+        dialogue_history=history,
+        last_agent_response=transcript_turns[-1]["ai_turn"] if transcript_turns else None,
+    )
+    return session, Transcript(transcript=transcript_turns)
+
+
+def measure(label: str, make_state: Callable[[], BaseModel], nodes: int) -> None:
+    serde = JsonPlusSerializer()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    state = make_state()
+    checkpoint_bytes = 0
+    for _ in range(nodes):
+        # LangGraph coerces channel values back into the schema before each node...
+        state = type(state)(**dict(state))
+        # ...and the checkpointer serializes every channel after it
+        for value in dict(state).values():
+            checkpoint_bytes += len(serde.dumps_typed(value)[1])
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<8} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>10.2f} MiB {checkpoint_bytes / nodes / 1024:>14.1f} KiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="dialogue turns in the session")
+    parser.add_argument("--words", type=int, default=2000, help="known words")
+    parser.add_argument("--nodes", type=int, default=16, help="node executions per run (16 = worst-case referee loop)")
+    args = parser.parse_args()
+
+    session, transcript = build_session(args.turns, args.words)
+    print(f"{args.turns} turns, {args.words} known words, {args.nodes} node executions")
+    print(f"{'state':<8} {'handling':>13} {'peak mem':>14} {'ckpt per node':>18}")
+
+    measure("legacy", lambda: LegacyGraphState(user_id=session.user_id, user_session=session, transcript=transcript), args.nodes)
+    measure("lean", lambda: GraphState(user_session=session, transcript=transcript), args.nodes)
+
+
+if __name__ == "__main__":
+    main()
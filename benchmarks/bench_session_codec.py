@@ -0,0 +1,92 @@
+"""
+Benchmark: serialized size and encode/decode time of long dialogue sessions.
+
+Compares the JSON form of a UserSession (pydantic-ai message history as JSON,
+with the system prompt and its known-word list repeated in every run) against
+the session codec (services/session_codec.py): msgpack with each system prompt
+stored once, uncompressed, zlib and, when zstandard is installed, zstd.
+
+Usage:
+    python benchmarks/bench_session_codec.py [--turns 50,200] [--words 2000] [--repeat 20]
+"""
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, ToolCallPart, ToolReturnPart, UserPromptPart
+
+from freelingo_agent.agents.agents_config import DIALOGUE_AGENT_PROMPT
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.user_session import UserSession
+from freelingo_agent.services import session_codec
+from freelingo_agent.services.session_codec import decode_session, encode_session
+
+
+def build_session(turns: int, word_count: int) -> UserSession:
+    system_prompt = DIALOGUE_AGENT_PROMPT.format(known_words=json.dumps([f"mot{i}" for i in range(word_count)]))
+    history = []
+    transcript_turns = []
+    for i in range(turns):
+        response = {
+            "rationale": {
+                "reasoning_summary": f"Turn {i}: keep the conversation going with known words.",
+                "vocabulary_challenge": {"description": "Limited verbs available.", "tags": ["no_verbs"]},
+                "rule_checks": {
+                    "used_only_allowed_vocabulary": True,
+                    "one_sentence": True,
+                    "max_eight_words": True,
+                    "no_corrections_or_translations": True,
+                },
+            },
+            "ai_reply": {"text": f"mot{i} ou mot{i + 1} ?", "word_count": 3},
+        }
+        # Every turn is an agent run: the system prompt is resent with its first request
+        history.append(ModelRequest(parts=[SystemPromptPart(content=system_prompt), UserPromptPart(content=f"réponse {i}")]))
+        history.append(ModelResponse(parts=[ToolCallPart(tool_name="final_result", args=json.dumps(response), tool_call_id=f"call-{i}")]))
+        history.append(ModelRequest(parts=[ToolReturnPart(tool_name="final_result", content="Final result processed.", tool_call_id=f"call-{i}")]))
+        transcript_turns.append({"ai_turn": response, "user_turn": {"text": f"réponse {i}"}})
+
+    return UserSession(
+        user_id="bench_user",
+        session_id="bench_session",
+        dialogue_history=history,
+        transcript=Transcript(transcript=transcript_turns).transcript,
+        last_agent_response=transcript_turns[-1]["ai_turn"] if transcript_turns else None,
+    )
+
+
+def measure(label: str, encode: Callable[[], bytes], decode: Callable[[bytes], object], repeat: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        payload = encode()
+    encode_ms = (time.perf_counter() - started) * 1000 / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(payload)
+    decode_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"{label:<10} {len(payload) / 1024:>12.1f} KiB {encode_ms:>10.2f} ms {decode_ms:>10.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", default="50,200", help="comma-separated session lengths in turns")
+    parser.add_argument("--words", type=int, default=2000, help="known words embedded in the system prompt")
+    parser.add_argument("--repeat", type=int, default=20, help="encode/decode rounds per measurement")
+    args = parser.parse_args()
+
+    exclude = {"dialogue_agent"}
+    for turns in (int(value) for value in args.turns.split(",")):
+        session = build_session(turns, args.words)
+        print(f"\n{turns} turns, {args.words} known words")
+        print(f"{'format':<10} {'size':>16} {'encode':>13} {'decode':>13}")
+        measure("json", lambda: session.model_dump_json(exclude=exclude).encode(), UserSession.model_validate_json, args.repeat)
+        measure("msgpack", lambda: encode_session(session, compression="none"), decode_session, args.repeat)
+        measure("zlib", lambda: encode_session(session, compression="zlib"), decode_session, args.repeat)
+        if session_codec.zstandard is not None:
+            measure("zstd", lambda: encode_session(session, compression="zstd"), decode_session, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,81 @@ create table public.words (
 -- No Row Level Security - backend handles user isolation
 create index on public.words(user_id);
 
+-- Migration: normalized word key (case- and accent-insensitive) so bulk imports
+-- and accepted suggestions skip words the learner already has.
+-- The API writes word_key; unaccent is only needed for this backfill.
+create extension if not exists unaccent;
+alter table public.words add column if not exists word_key text;
+update public.words set word_key = lower(unaccent(btrim(regexp_replace(word, '\s+', ' ', 'g'))))
+  where word_key is null;
+
+-- Keep the oldest row of any existing duplicates
+delete from public.words w
+  using public.words older
+  where w.user_id = older.user_id and w.word_key = older.word_key
+    and (older.created_at, older.id) < (w.created_at, w.id);
+
+create unique index if not exists words_user_word_key_idx on public.words(user_id, word_key);
+
+-- Keyset pages of a user's words, newest first
+create index if not exists words_user_created_idx on public.words(user_id, created_at desc, id desc);
+
+-- Per-user vocabulary version, bumped on every change to the user's words.
+-- The API serves it as the word list ETag, so unchanged lists cost one key lookup
+create table if not exists public.vocabulary_versions (
+  user_id text primary key,
+  version bigint not null default 0,
+  updated_at timestamp with time zone default now()
+);
+
+create or replace function public.bump_vocabulary_version()
+returns trigger
+language plpgsql as $$
+begin
+  insert into public.vocabulary_versions as v (user_id, version)
+    values (coalesce(new.user_id, old.user_id), 1)
+    on conflict (user_id) do update set version = v.version + 1, updated_at = now();
+  return null;
+end;
+$$;
+
+create or replace trigger words_bump_vocabulary_version
+  after insert or update or delete on public.words
+  for each row execute function public.bump_vocabulary_version();
+
+insert into public.vocabulary_versions (user_id, version)
+  select distinct user_id, 1 from public.words
+  on conflict (user_id) do nothing;
+
+-- =========================
+-- 📘 Table: word_stats
+-- Spaced-repetition statistics per word (SM-2 ease/interval), updated in one
+-- batch after each session from the transcript and the feedback mistakes
+-- =========================
+create table if not exists public.word_stats (
+  word_id uuid primary key references public.words(id) on delete cascade,
+  user_id text not null,
+  times_used integer not null default 0,  -- learner turns containing the word
+  times_offered integer not null default 0,  -- AI turns containing the word
+  error_count integer not null default 0,  -- feedback mistakes containing the word
+  last_seen_at timestamp with time zone,
+  ease double precision not null default 2.5,
+  interval_days double precision not null default 0,
+  repetitions integer not null default 0,
+  due_at timestamp with time zone,
+  updated_at timestamp with time zone default now()
+);
+
+create index if not exists word_stats_user_idx on public.word_stats(user_id);
+
+-- Per-user review queue (most urgent words first, capped at REVIEW_QUEUE_SIZE),
+-- rebuilt together with the stats so serving it never scans the vocabulary
+create table if not exists public.review_queues (
+  user_id text primary key,
+  items jsonb not null default '[]',
+  updated_at timestamp with time zone default now()
+);
+
 -- =========================
 -- 📘 Table: dialogue_sessions
 -- =========================
@@ -30,4 +105,109 @@ create table public.dialogue_sessions (
   created_at timestamp with time zone default now()
 );
 
-create index on public.dialogue_sessions(user_id);
\ No newline at end of file
+create index on public.dialogue_sessions(user_id);
+
+-- Migration: summary columns written at save time, so listing sessions
+-- never reads the messages blob, and an index for newest-first keyset pages
+alter table public.dialogue_sessions
+  add column if not exists message_count integer not null default 0,
+  add column if not exists turn_count integer not null default 0,
+  add column if not exists duration_seconds double precision;
+
+-- Backfill existing rows (messages is a dumped transcript, or a flat message list on older rows)
+update public.dialogue_sessions set
+  turn_count = case
+    when jsonb_typeof(messages) = 'object' then jsonb_array_length(messages->'transcript')
+    else (select count(*) from jsonb_array_elements(messages) m where m->>'sender' = 'user')
+  end,
+  message_count = case
+    when jsonb_typeof(messages) = 'object' then 2 * jsonb_array_length(messages->'transcript')
+    else jsonb_array_length(messages)
+  end,
+  duration_seconds = extract(epoch from (ended_at - started_at));
+
+create index if not exists dialogue_sessions_user_started_idx
+  on public.dialogue_sessions(user_id, started_at desc, id desc);
+
+-- =========================
+-- 📘 Table: dialogue_turns
+-- One row per AI/user turn, written in one batch when a session is saved,
+-- so per-turn analytics do not have to fetch and parse messages blobs
+-- =========================
+create table public.dialogue_turns (
+  session_id uuid not null references public.dialogue_sessions(id) on delete cascade,
+  idx integer not null,  -- position of the turn in the session transcript
+  user_id text not null,
+  ai_text text not null,
+  user_text text not null,
+  user_word_count integer not null,
+  tags text[] not null default '{}',  -- vocabulary_challenge tags of the AI turn
+  used_only_allowed_vocabulary boolean not null,
+  one_sentence boolean not null,
+  max_eight_words boolean not null,
+  no_corrections_or_translations boolean not null,
+  created_at timestamp with time zone default now(),
+  primary key (session_id, idx)
+);
+
+create index on public.dialogue_turns(user_id, created_at desc);
+create index on public.dialogue_turns using gin(tags);
+
+-- Turn and rule-check totals of a learner's recent sessions
+create or replace function public.learner_turn_summary(p_user_id text, p_since timestamp with time zone, p_exclude_session uuid default null)
+returns table (
+  sessions bigint,
+  turns bigint,
+  avg_user_words double precision,
+  not_allowed_vocabulary bigint,
+  not_one_sentence bigint,
+  over_eight_words bigint,
+  corrections_or_translations bigint
+)
+language sql stable as $$
+  select
+    count(distinct session_id),
+    count(*),
+    coalesce(avg(user_word_count), 0)::double precision,
+    count(*) filter (where not used_only_allowed_vocabulary),
+    count(*) filter (where not one_sentence),
+    count(*) filter (where not max_eight_words),
+    count(*) filter (where not no_corrections_or_translations)
+  from public.dialogue_turns
+  where user_id = p_user_id
+    and created_at >= p_since
+    and (p_exclude_session is null or session_id <> p_exclude_session);
+$$;
+
+-- How often each vocabulary_challenge tag came up in a learner's recent turns
+create or replace function public.learner_challenge_tag_counts(p_user_id text, p_since timestamp with time zone, p_exclude_session uuid default null)
+returns table (tag text, turns bigint)
+language sql stable as $$
+  select t.tag, count(*)
+  from public.dialogue_turns, unnest(tags) as t(tag)
+  where user_id = p_user_id
+    and created_at >= p_since
+    and (p_exclude_session is null or session_id <> p_exclude_session)
+  group by t.tag
+  order by count(*) desc;
+$$;
+
+-- =========================
+-- 📘 Table: workflow_results
+-- Post-session workflow outputs, so retried session ends and later reads
+-- return the stored feedback/plan/words instead of re-running the agents
+-- =========================
+create table public.workflow_results (
+  id uuid primary key default gen_random_uuid(),
+  session_id uuid not null references public.dialogue_sessions(id) on delete cascade,
+  user_id text not null,
+  transcript_hash text not null,  -- sha256 of the transcript the workflow ran on
+  feedback jsonb,
+  plan jsonb,
+  new_words jsonb,
+  is_valid boolean,
+  created_at timestamp with time zone default now(),
+  unique (session_id, transcript_hash)
+);
+
+create index on public.workflow_results(user_id);
@@ -47,6 +47,7 @@ JSON SCHEMA
 
 INPUT FORMAT YOU RECEIVE
 - known_words: List of learner's current French vocabulary
+- review_words: Known words the learner is shakiest on, most urgent first (if any). Prefer example sentences that reuse them
 - Plan: Planner's session objectives and identified vocab gaps to address
 - Feedback: Insights about learner's mistakes, strengths, and conversation needs
 - Referee Feedback: Previous validation attempts and concerns (if any)
@@ -462,6 +463,7 @@ INPUT FORMAT YOU RECEIVE
 - known_words: List of learner's current French vocabulary
 - Transcript: A short transcript with alternating turns, labeled as AI: and Student:
 - new_words: Previously suggested vocabulary (if any)
+- Learner history: Turn statistics from the learner's earlier sessions — vocabulary challenge tags that keep recurring, average reply length (if any). Use it to tell recurring patterns from one-off mistakes; never cite it as a mistake from this transcript
 - Referee Feedback: Previous validation attempts and concerns (if any)
 
 DECISION RULES
@@ -630,8 +632,10 @@ JSON SCHEMA
 
 INPUT FORMAT YOU RECEIVE
 - known_words: List of learner's current French vocabulary
+- review_words / known_word_count: Instead of known_words once the learner has word statistics — the known words most in need of practice (most urgent first) and the size of the vocabulary. Prefer objectives that bring review_words back into conversation
 - Feedback: Insights about learner's mistakes, strengths, and conversation needs
 - new_words: Previously suggested vocabulary (if any)
+- Learner history: Turn statistics from the learner's earlier sessions — recurring vocabulary challenge tags, average reply length (if any). Prefer objectives and vocab_gaps that also address recurring patterns
 - Referee Feedback: Previous validation attempts and concerns (if any)
 
 DECISION RULES
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from freelingo_agent.services.dialogue_service import run_dialogue_turn
-from freelingo_agent.services.dialogue_session_service import save_dialogue_session_service, list_dialogue_sessions_service, get_dialogue_session_service, get_conversation_with_agent_responses
+from freelingo_agent.services.dialogue_session_service import end_dialogue_session_service, list_dialogue_sessions_service, get_dialogue_session_service, get_conversation_with_agent_responses
 from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
-from freelingo_agent.models.dialogue_session import EndSessionResponse, SessionSummary
+from freelingo_agent.models.dialogue_session import EndSessionResponse, SessionSummary, SessionListPage, WorkflowResult
 from freelingo_agent.models.user import User
 from freelingo_agent.services.auth_service import get_current_user
-from freelingo_agent.services.user_session_service import get_dialogue_history_from_session
-from typing import Any
-from datetime import datetime
+from freelingo_agent.services.user_session_service import get_dialogue_history_from_session, mark_session_ended, get_last_ended_session_id, user_session, SessionConflictError
+from freelingo_agent.services.workflow_result_service import run_session_workflow, get_session_workflow_result, retry_session_workflow, resume_session_workflow
+from freelingo_agent.services.trace_service import load_trace
+from freelingo_agent.services.dialogue_turn_service import get_learner_history
+from freelingo_agent.services.word_stats_service import get_review_words, update_word_stats_after_session
+from freelingo_agent.db.pool import run_db
+from typing import Any, Optional
+from datetime import datetime, timezone
 
 router = APIRouter()
 workflow_service = GraphWorkflowService()
@@ -22,7 +27,10 @@ class DialogueResponse(BaseModel):
 
 @router.post("/dialogue", response_model=DialogueResponse)
 async def dialogue_endpoint(payload: DialogueRequest):
-    ai_response, full_response = await run_dialogue_turn(user_id=payload.user_id, student_response=payload.message)
+    try:
+        ai_response, full_response = await run_dialogue_turn(user_id=payload.user_id, student_response=payload.message)
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail="Session changed by another request, retry")
     # UI only gets the clean text, full_response is available for storage if needed
     return DialogueResponse(response=ai_response)
 
@@ -38,44 +46,59 @@ async def save_end_dialogue_session(
         raise HTTPException(status_code=403, detail="Can only save sessions for yourself")
     
     try:
-        # Check if there's dialogue history to save
-        dialogue_history = get_dialogue_history_from_session(user_id)
-        
-        if not dialogue_history:
-            raise HTTPException(status_code=400, detail="No conversation to save")
-        
-        # Get session data BEFORE saving (since save clears the session)
-        from freelingo_agent.models.graph_state import GraphState
-        from freelingo_agent.models.user_session import UserSession
-        from freelingo_agent.services.user_session_service import get_session
-        from freelingo_agent.services.words_service import fetch_known_words
-        from freelingo_agent.services.dialogue_session_service import construct_transcript_from_dialogue_history
-        
-        # Get current user session with dialogue history and known words BEFORE saving
-        current_session = get_session(user_id)
-        known_words = fetch_known_words(user_id)
-        
-        # Construct transcript BEFORE saving (since save clears the session)
-        transcript = construct_transcript_from_dialogue_history(user_id)
-        
-        # Create enriched UserSession for workflow
-        enriched_session = UserSession(
-            user_id=user_id,
-            known_words=known_words,
-            dialogue_history=current_session.dialogue_history,
-            last_agent_response=current_session.last_agent_response,
-            created_at=current_session.created_at,
-            updated_at=current_session.updated_at
-        )
+        # Only the session changes happen in here, so they are saved (to a shared store,
+        # if any) before the workflow runs and a concurrent turn does not wait on it
+        async with user_session(user_id):
+            # Check if there's dialogue history to save
+            dialogue_history = get_dialogue_history_from_session(user_id)
+            
+            if not dialogue_history:
+                # A retry after the session was already saved: return that session's results instead of failing
+                last_session_id = get_last_ended_session_id(user_id)
+                if not last_session_id:
+                    raise HTTPException(status_code=400, detail="No conversation to save")
+            else:
+                last_session_id = None
+                
+                # Get session data BEFORE saving (since save clears the session)
+                from freelingo_agent.services.user_session_service import get_session
+                from freelingo_agent.services.words_service import fetch_known_words_async
+                from freelingo_agent.services.dialogue_session_service import construct_transcript_from_dialogue_history
+                
+                # Get current user session with dialogue history and known words BEFORE saving
+                current_session = get_session(user_id)
+                known_words = await fetch_known_words_async(user_id)
+                
+                # Construct transcript BEFORE saving (since save clears the session)
+                transcript = construct_transcript_from_dialogue_history(user_id)
+                
+                # End the session: flush its remaining turns and mark it complete (or save it in one go)
+                now = datetime.now(timezone.utc).isoformat()
+                session_start = current_session.started_at or current_session.created_at
+                session_start_time = session_start.isoformat() if session_start else now
+                session_id = await end_dialogue_session_service(
+                    user_id=user_id,
+                    started_at=session_start_time,  # Use actual session creation time
+                    ended_at=now,
+                    transcript=transcript
+                )
+                mark_session_ended(user_id, session_id)
         
-        # Save the session (this constructs transcript from session and saves it)
-        now = datetime.utcnow().isoformat()
-        session_start_time = current_session.created_at.isoformat() if current_session.created_at else now
-        session_id = save_dialogue_session_service(
-            user_id=user_id,
-            started_at=session_start_time,  # Use actual session creation time
-            ended_at=now
-        )
+        if last_session_id:
+            result = await get_session_workflow_result(last_session_id)
+            if result is None:
+                # The first run produced no feedback, so nothing was stored: retry it on the saved transcript
+                try:
+                    result = await retry_session_workflow(workflow_service, user_id, last_session_id)
+                except Exception as workflow_error:
+                    print(f"Workflow retry failed: {workflow_error}")
+            return EndSessionResponse(
+                session_id=last_session_id,
+                status="already_saved",
+                feedback=result.feedback if result else None,
+                plan=result.plan if result else None,
+                new_words=result.new_words if result else None
+            )
         
         # Log session completion with transcript summary
         print(f"\n🎯 DIALOGUE SESSION ENDED")
@@ -95,26 +118,31 @@ async def save_end_dialogue_session(
         print(f"   Status: Session saved successfully\n")
         
         # Trigger workflow with the transcript we constructed BEFORE saving
+        # (the workflow only needs word strings, not the session or its message history)
+        from freelingo_agent.models.graph_state import GraphState
         state = GraphState(
             user_id=user_id,
-            user_session=enriched_session,
-            transcript=transcript
+            session_id=session_id,
+            known_words=[word.word for word in known_words],
+            transcript=transcript,
+            learner_history=await run_db(get_learner_history, user_id, exclude_session_id=session_id),
+            review_words=await run_db(get_review_words, user_id)
         )
         
-        # Run workflow and capture results
-        feedback = None
-        new_words = None
+        # Run workflow and capture results (stored with the session, so retries and GETs reuse them)
+        result = None
         
         try:
-            final_state = await workflow_service.trigger_feedback_loop(state)
-            feedback = final_state.last_feedback
-            new_words = final_state.last_words
+            result = await run_session_workflow(workflow_service, state)
         except Exception as workflow_error:
             # Log the workflow error but don't fail the entire request
             print(f"Workflow execution failed: {workflow_error}")
             # Continue with session saved but no feedback
             pass
         
+        # Fold the session into the word stats and rebuild the review queue for the next one
+        await run_db(update_word_stats_after_session, user_id, transcript, result.feedback if result else None)
+        
         # Create session summary
         session_summary = SessionSummary(
             total_exchanges=len(dialogue_history),
@@ -126,28 +154,93 @@ async def save_end_dialogue_session(
         return EndSessionResponse(
             session_id=session_id,
             status="saved",
-            feedback=feedback,
-            new_words=new_words,
+            feedback=result.feedback if result else None,
+            plan=result.plan if result else None,
+            new_words=result.new_words if result else None,
             session_summary=session_summary
         )
-        
+            
+    except HTTPException:
+        raise
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail="Session changed by another request, retry")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/dialogue-sessions/{user_id}")
-async def list_dialogue_sessions(user_id: str, current_user: User = Depends(get_current_user)):
+@router.post("/dialogue-session/{session_id}/resume-workflow", response_model=EndSessionResponse)
+async def resume_dialogue_session_workflow(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Finish an interrupted post-session workflow from its last checkpoint"""
+    interrupted_state = await workflow_service.get_interrupted_run(session_id)
+    if interrupted_state is None:
+        raise HTTPException(status_code=404, detail="No interrupted workflow for this session")
+    if interrupted_state.user_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Can only resume your own sessions")
+    
+    try:
+        final_state = await resume_session_workflow(workflow_service, session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if final_state is None:
+        raise HTTPException(status_code=404, detail="No interrupted workflow for this session")
+    
+    return EndSessionResponse(
+        session_id=session_id,
+        status="resumed",
+        feedback=final_state.last_feedback,
+        plan=final_state.last_plan,
+        new_words=final_state.last_words
+    )
+
+@router.get("/dialogue-session/{session_id}/workflow-result", response_model=WorkflowResult)
+async def get_dialogue_session_workflow_result(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stored feedback/plan/words of a session's workflow run (waits if the run is still in progress)"""
+    result = await get_session_workflow_result(session_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No workflow result for this session")
+    if result.user_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Can only view results of your own sessions")
+    return result
+
+@router.get("/dialogue-session/{session_id}/workflow-trace")
+async def get_dialogue_session_workflow_trace(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Timeline of the session's workflow run as Chrome trace JSON (open in Perfetto or chrome://tracing)"""
+    trace = load_trace(session_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No workflow trace for this session")
+    if trace["metadata"]["user_id"] != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Can only view traces of your own sessions")
+    return trace
+
+@router.get("/dialogue-sessions/{user_id}", response_model=SessionListPage)
+async def list_dialogue_sessions(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Newest-first session summaries, keyset-paginated via next_cursor"""
     if current_user.user_id != user_id:
         raise HTTPException(status_code=403, detail="Can only list your own sessions")
     try:
-        sessions = list_dialogue_sessions_service(user_id)
-        return sessions
+        return await run_db(list_dialogue_sessions_service, user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/dialogue-session/{session_id}")
 async def get_dialogue_session(session_id: str) -> Any:
     try:
-        session = get_dialogue_session_service(session_id)
+        session = await run_db(get_dialogue_session_service, session_id)
         return session
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e)) 
\ No newline at end of file
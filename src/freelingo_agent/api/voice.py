@@ -1,42 +1,155 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, status
+from freelingo_agent.config import VOICE_AUDIO_QUEUE_CHUNKS
+from freelingo_agent.models.user import User
+from freelingo_agent.services.auth_service import authenticate
+from freelingo_agent.services.dialogue_service import run_dialogue_turn
 from freelingo_agent.services.google_stt_service import GoogleSTTService
+from freelingo_agent.services.user_session_service import SessionConflictError
 from starlette.websockets import WebSocketDisconnect
+from typing import AsyncIterator, Optional
 import asyncio
+import json
+import time
 
 router = APIRouter()
 stt_service = GoogleSTTService()
 
+
+def _elapsed_ms(started: float, ended: float) -> float:
+    return round((ended - started) * 1000, 1)
+
+
+def _message_type(text: Optional[str]) -> Optional[str]:
+    try:
+        return json.loads(text).get("type")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+async def authenticate_socket(websocket: WebSocket) -> Optional[User]:
+    """User named by the first message, {"type": "auth", "token": <Firebase ID token>}; None if it is not valid"""
+    try:
+        message = await websocket.receive_json()
+        if message.get("type") != "auth":
+            return None
+        return await authenticate(message.get("token") or "")
+    except WebSocketDisconnect:
+        raise
+    except Exception:
+        return None
+
+
+async def run_voice_turn(websocket: WebSocket, user_id: str, audio: AsyncIterator[bytes]) -> None:
+    """One spoken reply: transcribe it, run the dialogue turn, and send the AI reply with stage timings"""
+    started = time.perf_counter()
+    try:
+        transcript = await stt_service.stream_transcribe(audio)
+    except Exception as e:
+        print("🚨 STT error:", e)
+        await websocket.send_json({"type": "error", "stage": "stt", "detail": str(e)})
+        return
+    recognized = time.perf_counter()
+    print(f"🗣️ Final transcript: {transcript}")
+    await websocket.send_json({"type": "transcript", "text": transcript})
+    if not transcript.strip():
+        # Nothing was said: an empty message would restart the conversation
+        return
+
+    try:
+        ai_message, _ = await run_dialogue_turn(user_id, transcript)
+    except SessionConflictError:
+        await websocket.send_json({"type": "error", "stage": "dialogue", "detail": "Session changed by another request, retry"})
+        return
+    except Exception as e:
+        print(f"🚨 Dialogue error for {user_id}: {e}")
+        await websocket.send_json({"type": "error", "stage": "dialogue", "detail": "Dialogue turn failed"})
+        return
+    answered = time.perf_counter()
+    await websocket.send_json({
+        "type": "reply",
+        "text": ai_message,
+        # stt includes the time spent speaking: audio is recognized as it arrives
+        "timings": {
+            "stt_ms": _elapsed_ms(started, recognized),
+            "dialogue_ms": _elapsed_ms(recognized, answered),
+            "total_ms": _elapsed_ms(started, answered),
+        },
+    })
+
+
 @router.websocket("/ws")
 async def voice_websocket(websocket: WebSocket):
+    """
+    Spoken dialogue on one socket. The client authenticates once with its
+    first message, {"type": "auth", "token": <Firebase ID token>}, then sends
+    each reply as binary PCM frames followed by {"type": "end_of_audio"}.
+    For each reply the server sends {"type": "transcript"}, then
+    {"type": "reply"} with the AI's text and per-stage timings, or
+    {"type": "error"}; the socket stays open for the next reply.
+    """
     await websocket.accept()
-    print("🔌 WebSocket connected")
+    try:
+        user = await authenticate_socket(websocket)
+    except WebSocketDisconnect:
+        return
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    print(f"🔌 WebSocket connected: {user.user_id}")
+    await websocket.send_json({"type": "ready"})
 
-    queue = asyncio.Queue()
+    # Bounded: while recognition lags, the socket is not read and the client is held back
+    queue = asyncio.Queue(maxsize=VOICE_AUDIO_QUEUE_CHUNKS)
+    connected = True
+    # Recognition ended (single utterance) before the client's end_of_audio: the rest of that audio is dropped
+    tail_pending = False
 
     async def receive_audio():
-        try:
-            while True:
-                data = await websocket.receive_bytes()
-                await queue.put(data)
-        except WebSocketDisconnect:
-            print("❌ WebSocket disconnected")
-            await queue.put(None)  # Sentinel to end STT stream
-
-    async def audio_stream():
+        nonlocal connected
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                await queue.put(message["bytes"])
+            elif _message_type(message.get("text")) == "end_of_audio":
+                await queue.put(None)
+        print("❌ WebSocket disconnected")
+        connected = False
+        await queue.put(None)  # Sentinel to end STT stream
+
+    async def audio_stream(first_chunk: bytes):
+        nonlocal tail_pending
+        tail_pending = True
+        yield first_chunk
         while True:
             chunk = await queue.get()
             if chunk is None:
-                break
+                tail_pending = False
+                return
             yield chunk
 
     # Run receiver in background
     receiver_task = asyncio.create_task(receive_audio())
 
     try:
-        transcript = await stt_service.stream_transcribe(audio_stream())
-        print(f"🗣️ Final transcript: {transcript}")
-    except Exception as e:
-        print("🚨 STT error:", e)
+        while True:
+            if tail_pending:
+                while await queue.get() is not None:
+                    pass
+                tail_pending = False
+            if not connected and queue.empty():
+                break
+            # Recognition starts with the first chunk of the next reply
+            first_chunk = await queue.get()
+            if first_chunk is None:
+                if not connected:
+                    break
+                continue
+            await run_voice_turn(websocket, user.user_id, audio_stream(first_chunk))
+    except WebSocketDisconnect:
+        pass
     finally:
         receiver_task.cancel()
-        await websocket.close()
\ No newline at end of file
+        if connected:
+            await websocket.close()
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Iterator, List, Dict, Any, Optional
 from datetime import datetime
-from freelingo_agent.models.words_model import Word, DialogueMessage, DialogueResponse
+import csv
+import hashlib
+import io
+import json
+from freelingo_agent.models.words_model import (
+    Word, DialogueMessage, DialogueResponse, BulkWordsRequest, BulkWordsResponse, AcceptSuggestionsRequest, ReviewQueue
+)
 from freelingo_agent.models.user import User
 from freelingo_agent.services.auth_service import get_current_user
-from freelingo_agent.services.words_service import suggest_new_words_for_user
+from freelingo_agent.services.words_service import suggest_new_words_for_user, list_user_words_service
 from freelingo_agent.services.dialogue_service import run_dialogue_turn
 from freelingo_agent.services.user_session_service import get_session
-from freelingo_agent.db.words import get_user_words, create_word, update_word, delete_word
+from freelingo_agent.services.word_cache_service import (
+    get_user_words_cached, find_user_word, create_user_word, create_user_words, update_user_word, delete_user_word
+)
+from freelingo_agent.db.words import word_key, get_vocabulary_version_db
+from freelingo_agent.db.repository import DuplicateWordError
+from freelingo_agent.services.word_stats_service import get_review_queue
+from freelingo_agent.db.pool import run_db
+from freelingo_agent.config import REVIEW_QUEUE_SIZE
 
 router = APIRouter(tags=["words"])
 
@@ -19,18 +33,64 @@ async def health_check():
 
 
 
-@router.get("/words/{user_id}", response_model=List[Word])
-async def get_user_words_endpoint(user_id: str, current_user: User = Depends(get_current_user)):
-    """Get all words for a user"""
+def word_list_etag(version: int, *params: Any) -> str:
+    """ETag of one listing: the vocabulary version plus the parameters that shape the response"""
+    shape = hashlib.sha256(json.dumps(params).encode("utf-8")).hexdigest()[:12]
+    return f'"v{version}-{shape}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+@router.get("/words/{user_id}", response_model=List[Dict[str, Any]])
+async def get_user_words_endpoint(
+    user_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. `word` or `id,word,translation`"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a user's words, newest first. With `limit` (and `cursor` from the
+    X-Next-Cursor header) the list is paginated; `fields` projects each word,
+    so items are Word objects reduced to the requested columns.
+    Responses carry an ETag, and If-None-Match with an unchanged vocabulary
+    returns 304 without reading the words.
+    """
     # Verify the user is requesting their own data
     if current_user.user_id != user_id:
         raise HTTPException(status_code=403, detail="Can only access your own words")
     
+    # Read the version before the words: a write in between makes the ETag older, never newer, than the body
+    etag = version = None
+    try:
+        version = await run_db(get_vocabulary_version_db, user_id)
+        etag = word_list_etag(version, limit, cursor, fields)
+    except Exception as e:
+        print(f"⚠️  Could not read vocabulary version for {user_id}: {e}")
+    
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    
     try:
-        words = get_user_words(user_id)
-        return words
+        page = await run_db(list_user_words_service, user_id, limit=limit, cursor=cursor, fields=fields, vocabulary_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch words: {str(e)}")
+    
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return JSONResponse(page["words"], headers=headers)
 
 @router.post("/words", response_model=Word)
 async def create_word_endpoint(word: Word, current_user: User = Depends(get_current_user)):
@@ -40,26 +100,126 @@ async def create_word_endpoint(word: Word, current_user: User = Depends(get_curr
         raise HTTPException(status_code=403, detail="Can only create words for yourself")
     
     try:
-        new_word = create_word(word.user_id, word)
+        new_word = await run_db(create_user_word, word.user_id, word)
         return new_word
     except Exception as e:
+        if isinstance(e, DuplicateWordError):
+            raise HTTPException(status_code=409, detail=f"Word already exists: {word.word}")
         raise HTTPException(status_code=500, detail=f"Failed to create word: {str(e)}")
 
+def bulk_response(requested: List[Word], created: List[Word]) -> BulkWordsResponse:
+    """Everything requested that did not produce a created row is reported as skipped"""
+    new_keys = {word_key(word.word) for word in created}
+    skipped = []
+    for word in requested:
+        key = word_key(word.word)
+        if key in new_keys:
+            new_keys.discard(key)  # later repeats in the request were skipped
+        else:
+            skipped.append(word.word)
+    return BulkWordsResponse(created=created, skipped=skipped)
+
+@router.post("/words/bulk", response_model=BulkWordsResponse)
+async def create_words_bulk_endpoint(request: BulkWordsRequest, current_user: User = Depends(get_current_user)):
+    """Add many words at once; words the user already has are skipped"""
+    if any(word.user_id != current_user.user_id for word in request.words):
+        raise HTTPException(status_code=403, detail="Can only create words for yourself")
+    
+    try:
+        created = await run_db(create_user_words, current_user.user_id, request.words)
+        return bulk_response(request.words, created)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create words: {str(e)}")
+
+@router.post("/words/{user_id}/accept-suggestions", response_model=BulkWordsResponse)
+async def accept_suggestions_endpoint(user_id: str, request: AcceptSuggestionsRequest, current_user: User = Depends(get_current_user)):
+    """Save suggested new words (from /new-words or a session's workflow result) in one call"""
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Can only accept suggestions for yourself")
+    
+    suggestion = request.suggestion
+    accepted = request.words if request.words is not None else suggestion.new_words
+    unknown = [word for word in accepted if word not in suggestion.new_words]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Not in the suggestion: {', '.join(unknown)}")
+    
+    words = []
+    for word in accepted:
+        usage = suggestion.usages.get(word)
+        words.append(Word(
+            user_id=user_id,
+            word=word,
+            # usage.en translates the example sentence, not the word
+            translation=request.translations.get(word, ""),
+            example=usage.fr if usage else None
+        ))
+    
+    try:
+        created = await run_db(create_user_words, user_id, words)
+        return bulk_response(words, created)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to accept suggestions: {str(e)}")
+
+EXPORT_FIELDS = ["id", "word", "translation", "example", "created_at"]
+
+def export_csv(words: List[Word]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for word in words:
+        writer.writerow(word.model_dump(mode="json", include=set(EXPORT_FIELDS)))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson(words: List[Word]) -> Iterator[str]:
+    for word in words:
+        yield json.dumps(word.model_dump(mode="json", include=set(EXPORT_FIELDS)), ensure_ascii=False) + "\n"
+
+@router.get("/words/{user_id}/export")
+async def export_words_endpoint(
+    user_id: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Download the user's vocabulary as CSV or NDJSON, streamed row by row"""
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Can only export your own words")
+    
+    try:
+        words = await run_db(get_user_words_cached, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch words: {str(e)}")
+    
+    if format == "csv":
+        body, media_type = export_csv(words), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(words), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="freelingo-words.{format}"'
+    })
+
 @router.put("/words/{word_id}", response_model=Word)
 async def update_word_endpoint(word_id: str, updates: Word, current_user: User = Depends(get_current_user)):
     """Update a word"""
     try:
-        updated_word = update_word(word_id, updates)
-        if not updated_word:
+        # Verify the user owns this word before changing it
+        word = await run_db(find_user_word, current_user.user_id, word_id)
+        if not word:
             raise HTTPException(status_code=404, detail="Word not found")
-        
-        # Verify the user owns this word
-        if updated_word.user_id != current_user.user_id:
+        if word.user_id != current_user.user_id:
             raise HTTPException(status_code=403, detail="Can only update your own words")
         
+        updated_word = await run_db(update_user_word, word_id, updates)
+        if not updated_word:
+            raise HTTPException(status_code=404, detail="Word not found")
+        
         return updated_word
     except HTTPException:
         raise
+    except DuplicateWordError:
+        raise HTTPException(status_code=409, detail=f"Word already exists: {updates.word}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update word: {str(e)}")
 
@@ -69,14 +229,13 @@ async def update_word_endpoint(word_id: str, updates: Word, current_user: User =
 async def delete_word_endpoint(word_id: str, current_user: User = Depends(get_current_user)):
     """Delete a word"""
     try:
-        # First get the word to check ownership
-        words = get_user_words(current_user.user_id)
-        word_to_delete = next((w for w in words if w.id == word_id), None)
+        # First get the word to check ownership (cached list, else a single-row lookup)
+        word_to_delete = await run_db(find_user_word, current_user.user_id, word_id)
         
-        if not word_to_delete:
+        if not word_to_delete or word_to_delete.user_id != current_user.user_id:
             raise HTTPException(status_code=404, detail="Word not found")
         
-        success = delete_word(word_id)
+        success = await run_db(delete_user_word, current_user.user_id, word_id)
         if not success:
             raise HTTPException(status_code=404, detail="Word not found")
         
@@ -120,4 +279,17 @@ async def get_new_words_endpoint(user_id: str, current_user: User = Depends(get_
         print(f"Error in get_new_words_endpoint: {str(e)}")
         print("Full stack trace:")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to fetch new words: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch new words: {str(e)}") 
+@router.get("/review-queue/{user_id}", response_model=ReviewQueue)
+async def get_review_queue_endpoint(
+    user_id: str,
+    limit: int = Query(REVIEW_QUEUE_SIZE, ge=1, le=REVIEW_QUEUE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """The user's known words most in need of practice, most urgent first (precomputed after each session)"""
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Can only access your own review queue")
+    try:
+        return await run_db(get_review_queue, user_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch review queue: {str(e)}")
@@ -6,6 +6,11 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
 
+# Supabase JWT signing keys: re-fetched after JWKS_TTL_SECONDS, or on a token with an unknown
+# key id, but never more often than every JWKS_MIN_REFRESH_SECONDS
+JWKS_TTL_SECONDS = float(os.getenv("JWKS_TTL_SECONDS", "600"))
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "30"))
+
 VAPI_API_KEY = os.getenv("VAPI_API_KEY")
 VAPI_ASSISTANT_ID = os.getenv("VAPI_ASSISTANT_ID")
 
@@ -22,17 +27,74 @@ REFEREE_LLM_MODEL = os.getenv("REFEREE_LLM_MODEL")
 LOGFIRE_TOKEN = os.getenv("OPENAI_API_KEY")
 GOOGLE_CREDS_PATH = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH", "firebase-service-account.json")
 
+# Local SQLite file for post-session workflow checkpoints (set empty to disable)
+WORKFLOW_CHECKPOINT_DB = os.getenv("WORKFLOW_CHECKPOINT_DB", "workflow_checkpoints.db")
+
+# Per-run budget for the post-session workflow (0 tokens means no token limit)
+WORKFLOW_TIME_BUDGET_SECONDS = float(os.getenv("WORKFLOW_TIME_BUDGET_SECONDS", "60"))
+WORKFLOW_TOKEN_BUDGET = int(os.getenv("WORKFLOW_TOKEN_BUDGET", "0"))
+
+# Per-run timeline recording (Chrome trace JSON written to WORKFLOW_TRACE_DIR)
+WORKFLOW_TRACE_ENABLED = os.getenv("WORKFLOW_TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+WORKFLOW_TRACE_DIR = os.getenv("WORKFLOW_TRACE_DIR", "workflow_traces")
+
+# Storage backend: "supabase", or "sqlite" for an embedded database file (local development and load tests)
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase").lower()
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "freelingo.db")
+
+# Threads for blocking Supabase calls made from async code (bounds concurrent DB requests)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+
+# Per-user word list cache: at most this many users / words in memory, reloaded after the TTL.
+# WORD_CACHE_REDIS_URL adds a shared Redis layer so API processes reuse each other's loads
+WORD_CACHE_MAX_USERS = int(os.getenv("WORD_CACHE_MAX_USERS", "1000"))
+WORD_CACHE_MAX_WORDS = int(os.getenv("WORD_CACHE_MAX_WORDS", "200000"))
+WORD_CACHE_TTL_SECONDS = float(os.getenv("WORD_CACHE_TTL_SECONDS", "300"))
+WORD_CACHE_REDIS_URL = os.getenv("WORD_CACHE_REDIS_URL", "")
+
+# In-memory dialogue sessions: dropped after SESSION_IDLE_TTL_SECONDS without a turn, and the
+# least recently used go first past SESSION_STORE_MAX_SESSIONS or ~SESSION_STORE_MAX_BYTES
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+SESSION_STORE_MAX_SESSIONS = int(os.getenv("SESSION_STORE_MAX_SESSIONS", "5000"))
+SESSION_STORE_MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Redis holding sessions for all API workers/replicas, so any of them can serve any turn
+SESSION_STORE_REDIS_URL = os.getenv("SESSION_STORE_REDIS_URL", "")
+# Without Redis, sessions are snapshotted to this directory every SESSION_SNAPSHOT_INTERVAL_SECONDS
+# and on shutdown, and restored on the user's next request after a restart (set empty to disable)
+SESSION_SNAPSHOT_DIR = os.getenv("SESSION_SNAPSHOT_DIR", "session_snapshots")
+SESSION_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SESSION_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+# Spaced-repetition review queue: words kept per user (rebuilt after each session),
+# and how many of them the planner and words agents get
+REVIEW_QUEUE_SIZE = int(os.getenv("REVIEW_QUEUE_SIZE", "50"))
+REVIEW_WORDS_FOR_AGENTS = int(os.getenv("REVIEW_WORDS_FOR_AGENTS", "10"))
+
+# Write-behind persistence of live dialogue turns: flush every N turns or T seconds,
+# and make dialogue turns wait once this many writes are pending
+TURN_FLUSH_BATCH_SIZE = int(os.getenv("TURN_FLUSH_BATCH_SIZE", "20"))
+TURN_FLUSH_INTERVAL_SECONDS = float(os.getenv("TURN_FLUSH_INTERVAL_SECONDS", "5"))
+TURN_WRITE_QUEUE_SIZE = int(os.getenv("TURN_WRITE_QUEUE_SIZE", "1000"))
+
+# Streaming speech recognition: concurrent recognitions (each holds a thread for its gRPC stream),
+# and audio chunks buffered per voice socket before the socket stops being read
+STT_MAX_STREAMS = int(os.getenv("STT_MAX_STREAMS", "32"))
+VOICE_AUDIO_QUEUE_CHUNKS = int(os.getenv("VOICE_AUDIO_QUEUE_CHUNKS", "32"))
+# Language the learner speaks in (BCP-47 code for Google Speech-to-Text)
+STT_LANGUAGE_CODE = os.getenv("STT_LANGUAGE_CODE", "fr-FR")
+
 # Firebase configuration
 FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
 FIREBASE_SERVICE_ACCOUNT_PATH = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH")
+# Verified ID token claims kept in memory until the token expires (at most this many tokens),
+# and how often Google's token signing certificates are re-fetched in the background
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+FIREBASE_CERT_REFRESH_SECONDS = float(os.getenv("FIREBASE_CERT_REFRESH_SECONDS", "3600"))
 
 # Set Google Application Credentials for Google Cloud services
 if FIREBASE_SERVICE_ACCOUNT_PATH:
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = FIREBASE_SERVICE_ACCOUNT_PATH
 
 required_vars = [
-    "SUPABASE_URL",
-    "SUPABASE_API_KEY",
     "VAPI_API_KEY",
     "VAPI_ASSISTANT_ID",
     "OPENAI_API_KEY",
@@ -45,6 +107,10 @@ required_vars = [
     "FIREBASE_PROJECT_ID",
 ]
 
+# Supabase credentials are only needed when it is the database backend
+if DB_BACKEND == "supabase":
+    required_vars += ["SUPABASE_URL", "SUPABASE_API_KEY"]
+
 # Optional vars (for development)
 optional_vars = [
     "FIREBASE_SERVICE_ACCOUNT_PATH",
@@ -1,7 +1,7 @@
-from freelingo_agent.db.supabase import supabase
-from typing import List, Optional, Dict, Any
+from freelingo_agent.db.repository import get_repository
+from typing import List, Optional, Dict, Any, Tuple
 
-def save_dialogue_session_db(session_id: str, user_id: str, messages: List[Dict[str, Any]], started_at: Optional[str] = None, ended_at: Optional[str] = None, created_at: Optional[str] = None) -> bool:
+def save_dialogue_session_db(session_id: str, user_id: str, messages: List[Dict[str, Any]], started_at: Optional[str] = None, ended_at: Optional[str] = None, created_at: Optional[str] = None, message_count: int = 0, turn_count: int = 0, duration_seconds: Optional[float] = None) -> bool:
     data = {
         "id": session_id,
         "user_id": user_id,
@@ -9,33 +9,58 @@ def save_dialogue_session_db(session_id: str, user_id: str, messages: List[Dict[
         "started_at": started_at,
         "ended_at": ended_at,
         "created_at": created_at,
+        "message_count": message_count,
+        "turn_count": turn_count,
+        "duration_seconds": duration_seconds,
     }
-    response = supabase.table("dialogue_sessions").insert(data).execute()
-    if not response.data:
-        raise RuntimeError("Failed to save session")
-    return True
+    return get_repository().save_dialogue_session(data)
 
-def list_dialogue_sessions_db(user_id: str) -> List[Dict[str, Any]]:
-    response = supabase.table("dialogue_sessions").select("id, started_at, ended_at, messages").eq("user_id", user_id).order("started_at", desc=True).execute()
+def list_dialogue_sessions_db(user_id: str, limit: int, before: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Newest-first page of a user's sessions from the summary columns (never the messages blob).
+    `before` is the (started_at, id) of the last row of the previous page.
+    """
     sessions = []
-    for row in response.data:
+    for row in get_repository().list_dialogue_sessions(user_id, limit, before):
         sessions.append({
             "session_id": row["id"],
             "started_at": row.get("started_at"),
             "ended_at": row.get("ended_at"),
-            "message_count": len(row.get("messages", [])),
+            "message_count": row.get("message_count") or 0,
+            "turn_count": row.get("turn_count") or 0,
+            "duration_seconds": row.get("duration_seconds"),
         })
     return sessions
 
 def get_dialogue_session_db(session_id: str) -> Optional[Dict[str, Any]]:
-    response = supabase.table("dialogue_sessions").select("*").eq("id", session_id).single().execute()
-    if not response.data:
+    row = get_repository().get_dialogue_session(session_id)
+    if not row:
         return None
-    row = response.data
     return {
         "session_id": row["id"],
         "user_id": row["user_id"],
         "messages": row["messages"],
         "started_at": row.get("started_at"),
         "ended_at": row.get("ended_at"),
-    } 
\ No newline at end of file
+    } 
+
+def list_dialogue_sessions_page_db(page_size: int, after_id: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One page of completed sessions (all users unless user_id is given), keyset-paginated by id"""
+    return get_repository().list_dialogue_sessions_page(page_size, after_id, user_id)
+
+def upsert_dialogue_sessions_db(sessions: List[Dict[str, Any]]) -> int:
+    """Create session rows for live sessions; rows that already exist are left as they are"""
+    if not sessions:
+        return 0
+    return get_repository().upsert_dialogue_sessions(sessions)
+
+def complete_dialogue_session_db(session_id: str, messages: Dict[str, Any], ended_at: Optional[str], message_count: int, turn_count: int, duration_seconds: Optional[float]) -> bool:
+    """Mark a live session as ended, storing its final transcript and summary columns"""
+    data = {
+        "messages": messages,
+        "ended_at": ended_at,
+        "message_count": message_count,
+        "turn_count": turn_count,
+        "duration_seconds": duration_seconds,
+    }
+    return get_repository().complete_dialogue_session(session_id, data)
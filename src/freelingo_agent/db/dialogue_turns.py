@@ -0,0 +1,14 @@
+from freelingo_agent.db.repository import get_repository
+from typing import List, Optional, Dict, Any
+
+def upsert_dialogue_turns_db(turns: List[Dict[str, Any]]) -> int:
+    """Write a batch of turns in one request; rewriting a (session_id, idx) turn is a no-op"""
+    if not turns:
+        return 0
+    return get_repository().upsert_dialogue_turns(turns)
+
+def get_learner_turn_summary_db(user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return get_repository().get_learner_turn_summary(user_id, since, exclude_session_id)
+
+def get_learner_challenge_tag_counts_db(user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Dict[str, int]:
+    return get_repository().get_learner_challenge_tag_counts(user_id, since, exclude_session_id)
@@ -0,0 +1,18 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from freelingo_agent.config import DB_POOL_SIZE
+
+T = TypeVar("T")
+
+# The Supabase client is synchronous; its calls run here so they never block the event loop.
+# All threads share the one client from db/supabase.py and its HTTP connection pool.
+_db_pool = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="freelingo-db")
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking DB function on the bounded DB thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_pool, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,106 @@
+import threading
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from freelingo_agent.config import DB_BACKEND, SQLITE_DB_PATH
+from freelingo_agent.models.words_model import Word
+
+
+class DuplicateWordError(Exception):
+    """The user already has a word with the same word_key"""
+
+
+class WordRepository(Protocol):
+    """Storage of learners' words; rows and filters are built by db/words.py"""
+
+    def get_known_words(self, user_id: str) -> List[str]: ...
+
+    def get_user_words(self, user_id: str) -> List[Word]: ...
+
+    def list_user_words_page(self, user_id: str, limit: int, before: Optional[Tuple[str, str]], fields: Sequence[str]) -> List[Dict[str, Any]]: ...
+
+    def get_vocabulary_version(self, user_id: str) -> int: ...
+
+    def get_word(self, word_id: str) -> Optional[Word]: ...
+
+    def get_words(self, word_ids: List[str]) -> List[Word]: ...
+
+    def create_word(self, user_id: str, word_data: Word) -> Word: ...
+
+    def create_words_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Word]: ...
+
+    def update_word(self, word_id: str, update_data: Dict[str, Any]) -> Optional[Word]: ...
+
+    def delete_word(self, word_id: str) -> bool: ...
+
+
+class WordStatsRepository(Protocol):
+    """Per-word spaced-repetition statistics and the precomputed review queue of each user"""
+
+    def get_word_stats(self, user_id: str) -> List[Dict[str, Any]]: ...
+
+    def upsert_word_stats(self, rows: List[Dict[str, Any]]) -> int: ...
+
+    def get_review_queue(self, user_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def save_review_queue(self, user_id: str, items: List[Dict[str, Any]]) -> bool: ...
+
+
+class DialogueSessionRepository(Protocol):
+    """Storage of dialogue sessions, their turns and workflow results"""
+
+    def save_dialogue_session(self, data: Dict[str, Any]) -> bool: ...
+
+    def list_dialogue_sessions(self, user_id: str, limit: int, before: Optional[Tuple[str, str]]) -> List[Dict[str, Any]]: ...
+
+    def get_dialogue_session(self, session_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def list_dialogue_sessions_page(self, page_size: int, after_id: Optional[str], user_id: Optional[str]) -> List[Dict[str, Any]]: ...
+
+    def upsert_dialogue_sessions(self, sessions: List[Dict[str, Any]]) -> int: ...
+
+    def complete_dialogue_session(self, session_id: str, data: Dict[str, Any]) -> bool: ...
+
+    def upsert_dialogue_turns(self, turns: List[Dict[str, Any]]) -> int: ...
+
+    def get_learner_turn_summary(self, user_id: str, since: str, exclude_session_id: Optional[str]) -> Optional[Dict[str, Any]]: ...
+
+    def get_learner_challenge_tag_counts(self, user_id: str, since: str, exclude_session_id: Optional[str]) -> Dict[str, int]: ...
+
+    def save_workflow_result(self, data: Dict[str, Any]) -> bool: ...
+
+    def get_workflow_result(self, session_id: str, transcript_hash: Optional[str]) -> Optional[Dict[str, Any]]: ...
+
+
+class Repository(WordRepository, WordStatsRepository, DialogueSessionRepository, Protocol):
+    pass
+
+
+_repository: Optional[Repository] = None
+_lock = threading.Lock()
+
+
+def create_repository(backend: str = DB_BACKEND) -> Repository:
+    """Repository for DB_BACKEND: "supabase" (default) or "sqlite" (embedded file at SQLITE_DB_PATH)"""
+    if backend == "supabase":
+        from freelingo_agent.db.supabase_repository import SupabaseRepository
+        return SupabaseRepository()
+    if backend == "sqlite":
+        from freelingo_agent.db.sqlite_repository import SqliteRepository
+        return SqliteRepository(SQLITE_DB_PATH)
+    raise ValueError(f"Unknown DB_BACKEND: {backend!r} (expected 'supabase' or 'sqlite')")
+
+
+def get_repository() -> Repository:
+    """The configured repository, created on first use so the other backend is never imported"""
+    global _repository
+    if _repository is None:
+        with _lock:
+            if _repository is None:
+                _repository = create_repository()
+    return _repository
+
+
+def set_repository(repository: Optional[Repository]) -> None:
+    """Swap the repository (tests, benchmarks); None goes back to the configured one"""
+    global _repository
+    _repository = repository
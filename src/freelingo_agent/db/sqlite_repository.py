@@ -0,0 +1,425 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from freelingo_agent.db import words as words_db
+from freelingo_agent.db.repository import DuplicateWordError
+from freelingo_agent.models.words_model import Word
+
+# Mirrors sql/freelingo.sql. uuid columns are text, jsonb/text[] are JSON text,
+# timestamps are ISO-8601 text in UTC so they sort as strings.
+SCHEMA = """
+create table if not exists words (
+  id text primary key,
+  user_id text not null,
+  word text not null,
+  word_key text,
+  translation text not null,
+  example text,
+  created_at text not null
+);
+create index if not exists words_user_idx on words(user_id);
+create unique index if not exists words_user_word_key_idx on words(user_id, word_key);
+create index if not exists words_user_created_idx on words(user_id, created_at desc, id desc);
+
+create table if not exists vocabulary_versions (
+  user_id text primary key,
+  version integer not null default 0,
+  updated_at text
+);
+
+create trigger if not exists words_version_insert after insert on words begin
+  insert into vocabulary_versions (user_id, version, updated_at) values (new.user_id, 1, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    on conflict (user_id) do update set version = version + 1, updated_at = excluded.updated_at;
+end;
+create trigger if not exists words_version_update after update on words begin
+  insert into vocabulary_versions (user_id, version, updated_at) values (new.user_id, 1, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    on conflict (user_id) do update set version = version + 1, updated_at = excluded.updated_at;
+end;
+create trigger if not exists words_version_delete after delete on words begin
+  insert into vocabulary_versions (user_id, version, updated_at) values (old.user_id, 1, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    on conflict (user_id) do update set version = version + 1, updated_at = excluded.updated_at;
+end;
+
+create table if not exists word_stats (
+  word_id text primary key references words(id) on delete cascade,
+  user_id text not null,
+  times_used integer not null default 0,
+  times_offered integer not null default 0,
+  error_count integer not null default 0,
+  last_seen_at text,
+  ease real not null default 2.5,
+  interval_days real not null default 0,
+  repetitions integer not null default 0,
+  due_at text,
+  updated_at text
+);
+create index if not exists word_stats_user_idx on word_stats(user_id);
+
+create table if not exists review_queues (
+  user_id text primary key,
+  items text not null default '[]',
+  updated_at text
+);
+
+create table if not exists dialogue_sessions (
+  id text primary key,
+  user_id text not null,
+  messages text not null,
+  started_at text,
+  ended_at text,
+  created_at text not null,
+  message_count integer not null default 0,
+  turn_count integer not null default 0,
+  duration_seconds real
+);
+create index if not exists dialogue_sessions_user_idx on dialogue_sessions(user_id);
+create index if not exists dialogue_sessions_user_started_idx on dialogue_sessions(user_id, started_at desc, id desc);
+
+create table if not exists dialogue_turns (
+  session_id text not null references dialogue_sessions(id) on delete cascade,
+  idx integer not null,
+  user_id text not null,
+  ai_text text not null,
+  user_text text not null,
+  user_word_count integer not null,
+  tags text not null default '[]',
+  used_only_allowed_vocabulary integer not null,
+  one_sentence integer not null,
+  max_eight_words integer not null,
+  no_corrections_or_translations integer not null,
+  created_at text not null,
+  primary key (session_id, idx)
+);
+create index if not exists dialogue_turns_user_created_idx on dialogue_turns(user_id, created_at desc);
+
+create table if not exists workflow_results (
+  id text primary key,
+  session_id text not null references dialogue_sessions(id) on delete cascade,
+  user_id text not null,
+  transcript_hash text not null,
+  feedback text,
+  plan text,
+  new_words text,
+  is_valid integer,
+  created_at text not null,
+  unique (session_id, transcript_hash)
+);
+create index if not exists workflow_results_user_idx on workflow_results(user_id);
+"""
+
+SESSION_COLUMNS = ("id", "user_id", "messages", "started_at", "ended_at", "created_at", "message_count", "turn_count", "duration_seconds")
+WORD_STATS_COLUMNS = (
+    "word_id", "user_id", "times_used", "times_offered", "error_count",
+    "last_seen_at", "ease", "interval_days", "repetitions", "due_at",
+)
+TURN_COLUMNS = (
+    "session_id", "idx", "user_id", "ai_text", "user_text", "user_word_count", "tags",
+    "used_only_allowed_vocabulary", "one_sentence", "max_eight_words", "no_corrections_or_translations",
+)
+
+
+def _now() -> str:
+    # Fixed width (always microseconds) so timestamps compare correctly as text
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _word_from_row(row: sqlite3.Row) -> Word:
+    return Word(
+        id=row["id"],
+        user_id=row["user_id"],
+        word=row["word"],
+        translation=row["translation"],
+        example=row["example"],
+        created_at=datetime.fromisoformat(row["created_at"])
+    )
+
+
+def _json_or_none(value: Any) -> Optional[str]:
+    return json.dumps(value) if value is not None else None
+
+
+class SqliteRepository:
+    """
+    Embedded SQLite implementation of the repository, for local development,
+    tests and load tests without a Supabase project. One connection shared by
+    the DB thread pool, serialized by a lock.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute("pragma foreign_keys=on")
+            self._conn.executescript(SCHEMA)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---- words ----
+
+    def get_known_words(self, user_id: str) -> List[str]:
+        rows = self._query("select word from words where user_id = ? order by created_at desc", (user_id,))
+        return [row["word"] for row in rows]
+
+    def get_user_words(self, user_id: str) -> List[Word]:
+        rows = self._query("select * from words where user_id = ? order by created_at desc", (user_id,))
+        return [_word_from_row(row) for row in rows]
+
+    def list_user_words_page(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None,
+        fields: Sequence[str] = words_db.WORD_FIELDS
+    ) -> List[Dict[str, Any]]:
+        unknown = [field for field in fields if field not in words_db.WORD_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        columns = ", ".join(dict.fromkeys(("created_at", "id") + tuple(fields)))
+        sql = f"select {columns} from words where user_id = ?"
+        params: List[Any] = [user_id]
+        if before:
+            sql += " and (created_at < ? or (created_at = ? and id < ?))"
+            params += [before[0], before[0], before[1]]
+        sql += " order by created_at desc, id desc limit ?"
+        return [dict(row) for row in self._query(sql, params + [limit])]
+
+    def get_vocabulary_version(self, user_id: str) -> int:
+        rows = self._query("select version from vocabulary_versions where user_id = ?", (user_id,))
+        return rows[0]["version"] if rows else 0
+
+    def get_word(self, word_id: str) -> Optional[Word]:
+        rows = self._query("select * from words where id = ?", (word_id,))
+        return _word_from_row(rows[0]) if rows else None
+
+    def get_words(self, word_ids: List[str]) -> List[Word]:
+        if not word_ids:
+            return []
+        placeholders = ", ".join("?" for _ in word_ids)
+        rows = self._query(f"select * from words where id in ({placeholders})", word_ids)
+        return [_word_from_row(row) for row in rows]
+
+    def create_word(self, user_id: str, word_data: Word) -> Word:
+        try:
+            rows = self._query(
+                "insert into words (id, user_id, word, word_key, translation, example, created_at) values (?, ?, ?, ?, ?, ?, ?) returning *",
+                (str(uuid.uuid4()), user_id, word_data.word, words_db.word_key(word_data.word), word_data.translation, word_data.example, _now()),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateWordError(word_data.word) from e
+        return _word_from_row(rows[0])
+
+    def create_words_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Word]:
+        created = []
+        with self._lock, self._conn:
+            for row in rows:
+                inserted = self._conn.execute(
+                    "insert into words (id, user_id, word, word_key, translation, example, created_at) values (?, ?, ?, ?, ?, ?, ?) "
+                    "on conflict (user_id, word_key) do nothing returning *",
+                    (str(uuid.uuid4()), row["user_id"], row["word"], row["word_key"], row["translation"], row.get("example"), _now()),
+                ).fetchall()
+                created.extend(_word_from_row(r) for r in inserted)
+        return created
+
+    def update_word(self, word_id: str, update_data: Dict[str, Any]) -> Optional[Word]:
+        columns = [column for column in update_data if column in ("word", "word_key", "translation", "example")]
+        if not columns:
+            return None
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        try:
+            rows = self._query(
+                f"update words set {assignments} where id = ? returning *",
+                [update_data[column] for column in columns] + [word_id],
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateWordError(update_data.get("word", word_id)) from e
+        return _word_from_row(rows[0]) if rows else None
+
+    def delete_word(self, word_id: str) -> bool:
+        return len(self._query("delete from words where id = ? returning id", (word_id,))) > 0
+
+    # ---- word stats and review queues ----
+
+    def get_word_stats(self, user_id: str) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._query("select * from word_stats where user_id = ?", (user_id,))]
+
+    def upsert_word_stats(self, rows: List[Dict[str, Any]]) -> int:
+        placeholders = ", ".join("?" for _ in WORD_STATS_COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in WORD_STATS_COLUMNS[2:])
+        with self._lock, self._conn:
+            for row in rows:
+                self._conn.execute(
+                    f"insert into word_stats ({', '.join(WORD_STATS_COLUMNS)}, updated_at) values ({placeholders}, ?) "
+                    f"on conflict (word_id) do update set {updates}, updated_at = excluded.updated_at",
+                    [row.get(column) for column in WORD_STATS_COLUMNS] + [_now()],
+                )
+        return len(rows)
+
+    def get_review_queue(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("select * from review_queues where user_id = ?", (user_id,))
+        if not rows:
+            return None
+        return {**dict(rows[0]), "items": json.loads(rows[0]["items"])}
+
+    def save_review_queue(self, user_id: str, items: List[Dict[str, Any]]) -> bool:
+        self._query(
+            "insert into review_queues (user_id, items, updated_at) values (?, ?, ?) "
+            "on conflict (user_id) do update set items = excluded.items, updated_at = excluded.updated_at",
+            (user_id, json.dumps(items), _now()),
+        )
+        return True
+
+    # ---- dialogue sessions ----
+
+    def _session_values(self, data: Dict[str, Any]) -> List[Any]:
+        values = {**data, "messages": json.dumps(data["messages"]), "created_at": data.get("created_at") or _now()}
+        return [values.get(column) for column in SESSION_COLUMNS]
+
+    def _insert_sessions(self, sessions: List[Dict[str, Any]], conflict: str) -> int:
+        placeholders = ", ".join("?" for _ in SESSION_COLUMNS)
+        with self._lock, self._conn:
+            for data in sessions:
+                self._conn.execute(
+                    f"insert into dialogue_sessions ({', '.join(SESSION_COLUMNS)}) values ({placeholders}) {conflict}",
+                    self._session_values({"message_count": 0, "turn_count": 0, **data}),
+                )
+        return len(sessions)
+
+    def save_dialogue_session(self, data: Dict[str, Any]) -> bool:
+        self._insert_sessions([data], "")
+        return True
+
+    def list_dialogue_sessions(self, user_id: str, limit: int, before: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        sql = "select id, started_at, ended_at, message_count, turn_count, duration_seconds from dialogue_sessions where user_id = ?"
+        params: List[Any] = [user_id]
+        if before:
+            sql += " and (started_at < ? or (started_at = ? and id < ?))"
+            params += [before[0], before[0], before[1]]
+        sql += " order by started_at desc, id desc limit ?"
+        return [dict(row) for row in self._query(sql, params + [limit])]
+
+    def _session_from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        session = dict(row)
+        session["messages"] = json.loads(session["messages"])
+        return session
+
+    def get_dialogue_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("select * from dialogue_sessions where id = ?", (session_id,))
+        return self._session_from_row(rows[0]) if rows else None
+
+    def list_dialogue_sessions_page(self, page_size: int, after_id: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Completed sessions only: live ones have no transcript in messages yet
+        sql = "select id, user_id, messages, started_at, ended_at from dialogue_sessions where ended_at is not null"
+        params: List[Any] = []
+        if user_id:
+            sql += " and user_id = ?"
+            params.append(user_id)
+        if after_id:
+            sql += " and id > ?"
+            params.append(after_id)
+        sql += " order by id limit ?"
+        return [self._session_from_row(row) for row in self._query(sql, params + [page_size])]
+
+    def upsert_dialogue_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        return self._insert_sessions(sessions, "on conflict (id) do nothing")
+
+    def complete_dialogue_session(self, session_id: str, data: Dict[str, Any]) -> bool:
+        rows = self._query(
+            "update dialogue_sessions set messages = ?, ended_at = ?, message_count = ?, turn_count = ?, duration_seconds = ? "
+            "where id = ? returning id",
+            (json.dumps(data["messages"]), data["ended_at"], data["message_count"], data["turn_count"], data["duration_seconds"], session_id),
+        )
+        if not rows:
+            raise RuntimeError("Failed to complete session")
+        return True
+
+    # ---- dialogue turns ----
+
+    def upsert_dialogue_turns(self, turns: List[Dict[str, Any]]) -> int:
+        columns = TURN_COLUMNS + ("created_at",)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in TURN_COLUMNS[2:])
+        with self._lock, self._conn:
+            for turn in turns:
+                values = {**turn, "tags": json.dumps(list(turn.get("tags") or [])), "created_at": turn.get("created_at") or _now()}
+                self._conn.execute(
+                    f"insert into dialogue_turns ({', '.join(columns)}) values ({', '.join('?' for _ in columns)}) "
+                    f"on conflict (session_id, idx) do update set {updates}",
+                    [values[column] for column in columns],
+                )
+        return len(turns)
+
+    def get_learner_turn_summary(self, user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            """
+            select
+              count(distinct session_id) as sessions,
+              count(*) as turns,
+              coalesce(avg(user_word_count), 0.0) as avg_user_words,
+              count(*) filter (where not used_only_allowed_vocabulary) as not_allowed_vocabulary,
+              count(*) filter (where not one_sentence) as not_one_sentence,
+              count(*) filter (where not max_eight_words) as over_eight_words,
+              count(*) filter (where not no_corrections_or_translations) as corrections_or_translations
+            from dialogue_turns
+            where user_id = ? and created_at >= ? and (? is null or session_id <> ?)
+            """,
+            (user_id, since, exclude_session_id, exclude_session_id),
+        )
+        return dict(rows[0]) if rows else None
+
+    def get_learner_challenge_tag_counts(self, user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Dict[str, int]:
+        rows = self._query(
+            """
+            select t.value as tag, count(*) as turns
+            from dialogue_turns, json_each(dialogue_turns.tags) as t
+            where user_id = ? and created_at >= ? and (? is null or session_id <> ?)
+            group by t.value
+            order by count(*) desc
+            """,
+            (user_id, since, exclude_session_id, exclude_session_id),
+        )
+        return {row["tag"]: row["turns"] for row in rows}
+
+    # ---- workflow results ----
+
+    def save_workflow_result(self, data: Dict[str, Any]) -> bool:
+        self._query(
+            "insert into workflow_results (id, session_id, user_id, transcript_hash, feedback, plan, new_words, is_valid, created_at) "
+            "values (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "on conflict (session_id, transcript_hash) do update set "
+            "feedback = excluded.feedback, plan = excluded.plan, new_words = excluded.new_words, is_valid = excluded.is_valid",
+            (
+                str(uuid.uuid4()), data["session_id"], data["user_id"], data["transcript_hash"],
+                _json_or_none(data.get("feedback")), _json_or_none(data.get("plan")), _json_or_none(data.get("new_words")),
+                data.get("is_valid"), _now(),
+            ),
+        )
+        return True
+
+    def get_workflow_result(self, session_id: str, transcript_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        sql = "select * from workflow_results where session_id = ?"
+        params: List[Any] = [session_id]
+        if transcript_hash:
+            sql += " and transcript_hash = ?"
+            params.append(transcript_hash)
+        rows = self._query(sql + " order by created_at desc limit 1", params)
+        if not rows:
+            return None
+        result = dict(rows[0])
+        for column in ("feedback", "plan", "new_words"):
+            result[column] = json.loads(result[column]) if result[column] is not None else None
+        if result["is_valid"] is not None:
+            result["is_valid"] = bool(result["is_valid"])
+        return result
@@ -0,0 +1,208 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from postgrest.exceptions import APIError
+
+from freelingo_agent.db import words as words_db
+from freelingo_agent.db.repository import DuplicateWordError
+from freelingo_agent.db.supabase import supabase
+from freelingo_agent.models.words_model import Word
+
+
+# Postgres error code PostgREST reports for a duplicate (user_id, word_key)
+UNIQUE_VIOLATION = "23505"
+
+
+def _word_from_row(row: Dict[str, Any]) -> Word:
+    return Word(
+        id=row["id"],
+        user_id=row["user_id"],
+        word=row["word"],
+        translation=row["translation"],
+        example=row.get("example"),
+        created_at=datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
+    )
+
+
+class SupabaseRepository:
+    """Words and dialogue sessions in the Supabase Postgres database (sql/freelingo.sql)"""
+
+    # ---- words ----
+
+    def get_known_words(self, user_id: str) -> List[str]:
+        response = supabase.table("words").select("word").eq("user_id", user_id).order("created_at", desc=True).execute()
+        return [row["word"] for row in response.data]
+
+    def get_user_words(self, user_id: str) -> List[Word]:
+        response = supabase.table("words").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+        return [_word_from_row(row) for row in response.data]
+
+    def list_user_words_page(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None,
+        fields: Sequence[str] = words_db.WORD_FIELDS
+    ) -> List[Dict[str, Any]]:
+        columns = ", ".join(dict.fromkeys(("created_at", "id") + tuple(fields)))
+        query = supabase.table("words").select(columns).eq("user_id", user_id)
+        if before:
+            created_at, word_id = before
+            # Quoted: timestamps contain characters PostgREST treats as reserved
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{word_id})')
+        response = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        return response.data
+
+    def get_vocabulary_version(self, user_id: str) -> int:
+        response = supabase.table("vocabulary_versions").select("version").eq("user_id", user_id).limit(1).execute()
+        return response.data[0]["version"] if response.data else 0
+
+    def get_word(self, word_id: str) -> Optional[Word]:
+        response = supabase.table("words").select("*").eq("id", word_id).limit(1).execute()
+        return _word_from_row(response.data[0]) if response.data else None
+
+    def get_words(self, word_ids: List[str]) -> List[Word]:
+        if not word_ids:
+            return []
+        response = supabase.table("words").select("*").in_("id", word_ids).execute()
+        return [_word_from_row(row) for row in response.data]
+
+    def create_word(self, user_id: str, word_data: Word) -> Word:
+        db_data = {
+            "user_id": user_id,
+            "word": word_data.word,
+            "word_key": words_db.word_key(word_data.word),
+            "translation": word_data.translation,
+            "example": word_data.example
+        }
+        try:
+            response = supabase.table("words").insert(db_data).execute()
+        except APIError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateWordError(word_data.word) from e
+            raise
+        return _word_from_row(response.data[0])
+
+    def create_words_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Word]:
+        created = []
+        for start in range(0, len(rows), words_db.BULK_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + words_db.BULK_INSERT_CHUNK_SIZE]
+            # ignore_duplicates: only the inserted rows come back
+            response = supabase.table("words").upsert(chunk, on_conflict="user_id,word_key", ignore_duplicates=True).execute()
+            created.extend(_word_from_row(row) for row in response.data)
+        return created
+
+    def update_word(self, word_id: str, update_data: Dict[str, Any]) -> Optional[Word]:
+        try:
+            response = supabase.table("words").update(update_data).eq("id", word_id).execute()
+        except APIError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateWordError(update_data.get("word", word_id)) from e
+            raise
+        return _word_from_row(response.data[0]) if response.data else None
+
+    def delete_word(self, word_id: str) -> bool:
+        response = supabase.table("words").delete().eq("id", word_id).execute()
+        return len(response.data) > 0
+
+    # ---- word stats and review queues ----
+
+    def get_word_stats(self, user_id: str) -> List[Dict[str, Any]]:
+        response = supabase.table("word_stats").select("*").eq("user_id", user_id).execute()
+        return response.data or []
+
+    def upsert_word_stats(self, rows: List[Dict[str, Any]]) -> int:
+        response = supabase.table("word_stats").upsert(rows, on_conflict="word_id").execute()
+        return len(response.data or [])
+
+    def get_review_queue(self, user_id: str) -> Optional[Dict[str, Any]]:
+        response = supabase.table("review_queues").select("*").eq("user_id", user_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def save_review_queue(self, user_id: str, items: List[Dict[str, Any]]) -> bool:
+        data = {"user_id": user_id, "items": items, "updated_at": datetime.now(timezone.utc).isoformat()}
+        response = supabase.table("review_queues").upsert(data, on_conflict="user_id").execute()
+        if not response.data:
+            raise RuntimeError("Failed to save review queue")
+        return True
+
+    # ---- dialogue sessions ----
+
+    def save_dialogue_session(self, data: Dict[str, Any]) -> bool:
+        response = supabase.table("dialogue_sessions").insert(data).execute()
+        if not response.data:
+            raise RuntimeError("Failed to save session")
+        return True
+
+    def list_dialogue_sessions(self, user_id: str, limit: int, before: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        query = supabase.table("dialogue_sessions").select("id, started_at, ended_at, message_count, turn_count, duration_seconds").eq("user_id", user_id)
+        if before:
+            started_at, session_id = before
+            # Quoted: timestamps contain characters PostgREST treats as reserved
+            query = query.or_(f'started_at.lt."{started_at}",and(started_at.eq."{started_at}",id.lt.{session_id})')
+        response = query.order("started_at", desc=True).order("id", desc=True).limit(limit).execute()
+        return response.data
+
+    def get_dialogue_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        response = supabase.table("dialogue_sessions").select("*").eq("id", session_id).single().execute()
+        return response.data or None
+
+    def list_dialogue_sessions_page(self, page_size: int, after_id: Optional[str] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Completed sessions only: live ones have no transcript in messages yet
+        query = supabase.table("dialogue_sessions").select("id, user_id, messages, started_at, ended_at").not_.is_("ended_at", "null")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if after_id:
+            query = query.gt("id", after_id)
+        response = query.order("id").limit(page_size).execute()
+        return response.data or []
+
+    def upsert_dialogue_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        supabase.table("dialogue_sessions").upsert(sessions, on_conflict="id", ignore_duplicates=True).execute()
+        return len(sessions)
+
+    def complete_dialogue_session(self, session_id: str, data: Dict[str, Any]) -> bool:
+        response = supabase.table("dialogue_sessions").update(data).eq("id", session_id).execute()
+        if not response.data:
+            raise RuntimeError("Failed to complete session")
+        return True
+
+    # ---- dialogue turns ----
+
+    def upsert_dialogue_turns(self, turns: List[Dict[str, Any]]) -> int:
+        response = supabase.table("dialogue_turns").upsert(turns, on_conflict="session_id,idx").execute()
+        if not response.data:
+            raise RuntimeError("Failed to save dialogue turns")
+        return len(response.data)
+
+    def get_learner_turn_summary(self, user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        response = supabase.rpc("learner_turn_summary", {
+            "p_user_id": user_id,
+            "p_since": since,
+            "p_exclude_session": exclude_session_id,
+        }).execute()
+        return response.data[0] if response.data else None
+
+    def get_learner_challenge_tag_counts(self, user_id: str, since: str, exclude_session_id: Optional[str] = None) -> Dict[str, int]:
+        response = supabase.rpc("learner_challenge_tag_counts", {
+            "p_user_id": user_id,
+            "p_since": since,
+            "p_exclude_session": exclude_session_id,
+        }).execute()
+        return {row["tag"]: row["turns"] for row in response.data or []}
+
+    # ---- workflow results ----
+
+    def save_workflow_result(self, data: Dict[str, Any]) -> bool:
+        # Upsert so a resumed or repeated run for the same transcript replaces the stored result
+        response = supabase.table("workflow_results").upsert(data, on_conflict="session_id,transcript_hash").execute()
+        if not response.data:
+            raise RuntimeError("Failed to save workflow result")
+        return True
+
+    def get_workflow_result(self, session_id: str, transcript_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        query = supabase.table("workflow_results").select("*").eq("session_id", session_id)
+        if transcript_hash:
+            query = query.eq("transcript_hash", transcript_hash)
+        response = query.order("created_at", desc=True).limit(1).execute()
+        return response.data[0] if response.data else None
@@ -0,0 +1,18 @@
+from freelingo_agent.db.repository import get_repository
+from typing import Any, Dict, List, Optional
+
+def get_word_stats_db(user_id: str) -> List[Dict[str, Any]]:
+    """Spaced-repetition stats rows of all the user's words that have any"""
+    return get_repository().get_word_stats(user_id)
+
+def upsert_word_stats_db(rows: List[Dict[str, Any]]) -> int:
+    """Write the stats of the words a session touched in one batch (keyed by word_id)"""
+    return get_repository().upsert_word_stats(rows)
+
+def get_review_queue_db(user_id: str) -> Optional[Dict[str, Any]]:
+    """The user's precomputed review queue row ({user_id, items, updated_at}), None if never built"""
+    return get_repository().get_review_queue(user_id)
+
+def save_review_queue_db(user_id: str, items: List[Dict[str, Any]]) -> bool:
+    """Replace the user's review queue; items are ordered, most urgent first"""
+    return get_repository().save_review_queue(user_id, items)
@@ -1,60 +1,80 @@
-from supabase import Client
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from freelingo_agent.models.words_model import Word
-from freelingo_agent.db.supabase import supabase
-import uuid
-from datetime import datetime
+from freelingo_agent.db.repository import get_repository
+import unicodedata
+
+# Rows per request for bulk inserts
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Columns a word listing can be projected to
+WORD_FIELDS = ("id", "user_id", "word", "translation", "example", "created_at")
+
+# Letters NFKD leaves alone but Postgres unaccent (used by the word_key backfill) expands
+_UNACCENT_EXTRA = str.maketrans({"œ": "oe", "Œ": "OE", "æ": "ae", "Æ": "AE", "ø": "o", "Ø": "O"})
+
+def word_key(word: str) -> str:
+    """Case- and accent-insensitive form of a word, unique per user ('Café' and 'cafe' are the same word)"""
+    decomposed = unicodedata.normalize("NFKD", word.translate(_UNACCENT_EXTRA))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
 
 def get_known_words(user_id: str) -> List[str]:
     """Get list of known words for backward compatibility"""
-    response = supabase.table("words").select("word").eq("user_id", user_id).order("created_at", desc=True).execute()
-    return [row["word"] for row in response.data]
+    return get_repository().get_known_words(user_id)
 
 def get_user_words(user_id: str) -> List[Word]:
     """Get all words for a user with full details"""
-    response = supabase.table("words").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-    
-    words = []
-    for row in response.data:
-        words.append(Word(
-            id=row["id"],
-            user_id=row["user_id"],
-            word=row["word"],
-            translation=row["translation"],
-            example=row.get("example"),
-            created_at=datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
-        ))
-    
-    return words
+    return get_repository().get_user_words(user_id)
+
+def list_user_words_page_db(
+    user_id: str,
+    limit: int,
+    before: Optional[Tuple[str, str]] = None,
+    fields: Sequence[str] = WORD_FIELDS
+) -> List[Dict[str, Any]]:
+    """
+    Newest-first page of a user's words with only the given columns (plus the
+    created_at/id sort keys). `before` is the (created_at, id) of the last row
+    of the previous page.
+    """
+    return get_repository().list_user_words_page(user_id, limit, before, fields)
+
+def get_vocabulary_version_db(user_id: str) -> int:
+    """Version of the user's word list, bumped by a trigger on every insert/update/delete (0 if never changed)"""
+    return get_repository().get_vocabulary_version(user_id)
 
+def get_word(word_id: str) -> Optional[Word]:
+    """Get a single word by ID"""
+    return get_repository().get_word(word_id)
 
+def get_words_by_ids(word_ids: List[str]) -> List[Word]:
+    """Words by ID in one query (missing IDs are left out, order is not kept)"""
+    return get_repository().get_words(word_ids)
 
 def create_word(user_id: str, word_data: Word) -> Word:
     """Create a new word with full details"""
-    db_data = {
-        "user_id": user_id,
-        "word": word_data.word,
-        "translation": word_data.translation,
-        "example": word_data.example
-    }
-    
-    response = supabase.table("words").insert(db_data).execute()
-    row = response.data[0]
-    
-    return Word(
-        id=row["id"],
-        user_id=row["user_id"],
-        word=row["word"],
-        translation=row["translation"],
-        example=row.get("example"),
-        created_at=datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
-    )
+    return get_repository().create_word(user_id, word_data)
+
+def create_words_bulk(user_id: str, words: List[Word]) -> List[Word]:
+    """Insert many words in a few requests; words the user already has (by word_key) are skipped, not duplicated"""
+    rows = {}
+    for word_data in words:
+        # First occurrence wins within the batch too
+        rows.setdefault(word_key(word_data.word), {
+            "user_id": user_id,
+            "word": word_data.word,
+            "word_key": word_key(word_data.word),
+            "translation": word_data.translation,
+            "example": word_data.example
+        })
+    return get_repository().create_words_bulk(user_id, list(rows.values()))
 
 def update_word(word_id: str, updates: Word) -> Optional[Word]:
     """Update a word"""
     update_data = {}
     if updates.word is not None:
         update_data["word"] = updates.word
+        update_data["word_key"] = word_key(updates.word)
     if updates.translation is not None:
         update_data["translation"] = updates.translation
     if updates.example is not None:
@@ -63,28 +83,8 @@ def update_word(word_id: str, updates: Word) -> Optional[Word]:
     if not update_data:
         return None
     
-    response = supabase.table("words").update(update_data).eq("id", word_id).execute()
-    
-    if not response.data:
-        return None
-    
-    row = response.data[0]
-    return Word(
-        id=row["id"],
-        user_id=row["user_id"],
-        word=row["word"],
-        translation=row["translation"],
-        example=row.get("example"),
-        created_at=datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
-    )
-
-
-
-
-
-
+    return get_repository().update_word(word_id, update_data)
 
 def delete_word(word_id: str) -> bool:
     """Delete a word by ID"""
-    response = supabase.table("words").delete().eq("id", word_id).execute()
-    return len(response.data) > 0
\ No newline at end of file
+    return get_repository().delete_word(word_id)
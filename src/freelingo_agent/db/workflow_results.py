@@ -0,0 +1,19 @@
+from freelingo_agent.db.repository import get_repository
+from typing import Optional, Dict, Any
+
+def save_workflow_result_db(session_id: str, user_id: str, transcript_hash: str, feedback: Optional[Dict[str, Any]], plan: Optional[Dict[str, Any]], new_words: Optional[Dict[str, Any]], is_valid: Optional[bool]) -> bool:
+    data = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "transcript_hash": transcript_hash,
+        "feedback": feedback,
+        "plan": plan,
+        "new_words": new_words,
+        "is_valid": is_valid,
+    }
+    # Upsert so a resumed or repeated run for the same transcript replaces the stored result
+    return get_repository().save_workflow_result(data)
+
+def get_workflow_result_db(session_id: str, transcript_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Latest stored result for a session, optionally only for one transcript version"""
+    return get_repository().get_workflow_result(session_id, transcript_hash)
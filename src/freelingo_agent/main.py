@@ -1,12 +1,96 @@
-from fastapi import FastAPI, Request
+import argparse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from freelingo_agent.api.auth import router as auth_router
 from freelingo_agent.api.voice import router as voice_router
 from freelingo_agent.api.words import router as words_router
 from freelingo_agent.api.dialogue import router as dialogue_router
+from freelingo_agent.services.metrics_service import record_http_request, render_metrics
+
+
+async def sweep_idle_sessions(interval_seconds: float = 60.0) -> None:
+    """Drop idle sessions (saving their live dialogue) even when no requests come in to trigger it"""
+    from freelingo_agent.services.user_session_service import session_store
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        # Off the event loop: with a shared store this reads it and saves abandoned sessions
+        try:
+            await loop.run_in_executor(None, session_store.sweep)
+        except Exception as e:
+            print(f"⚠️  Session sweep failed: {e}")
+
+async def snapshot_sessions(interval_seconds: float) -> None:
+    """Snapshot changed sessions to disk, so a crash loses at most one interval of dialogue"""
+    from freelingo_agent.services.user_session_service import session_store
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await loop.run_in_executor(None, session_store.snapshot)
+        except Exception as e:
+            print(f"⚠️  Session snapshot failed: {e}")
+
+async def refresh_firebase_certificates(interval_seconds: float, retry_seconds: float = 60.0) -> None:
+    """Keep the token signing certificates fresh so no request pays for fetching them"""
+    from freelingo_agent.services.auth_service import refresh_certificates
+    from freelingo_agent.services.metrics_service import record_certificate_refresh
+    loop = asyncio.get_running_loop()
+    failures = 0
+    while True:
+        try:
+            await loop.run_in_executor(None, refresh_certificates)
+        except Exception as e:
+            # Verification still fetches the certificates itself; failures are counted so they can be alerted on
+            failures += 1
+            record_certificate_refresh("failed")
+            print(f"⚠️  Firebase certificate refresh failed ({failures} in a row): {e}")
+            await asyncio.sleep(min(interval_seconds, retry_seconds))
+            continue
+        if failures:
+            print(f"✅ Firebase certificate refresh recovered after {failures} failure(s)")
+        failures = 0
+        record_certificate_refresh("ok")
+        await asyncio.sleep(interval_seconds)
 
-app = FastAPI(title="FreeLingo API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Background loops while the API runs; on shutdown, stop them and save what is still in memory"""
+    from freelingo_agent.config import SESSION_SNAPSHOT_INTERVAL_SECONDS, FIREBASE_CERT_REFRESH_SECONDS
+    from freelingo_agent.services.auth_service import certificate_request
+    from freelingo_agent.services.turn_writer_service import turn_writer
+    from freelingo_agent.services.user_session_service import session_store
+    if FIREBASE_CERT_REFRESH_SECONDS > 0:
+        # Fails startup if the Firebase SDK no longer has the internals the refresh uses
+        certificate_request()
+    tasks = [
+        asyncio.create_task(sweep_idle_sessions()),
+        asyncio.create_task(snapshot_sessions(SESSION_SNAPSHOT_INTERVAL_SECONDS)),
+    ]
+    if FIREBASE_CERT_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(refresh_firebase_certificates(FIREBASE_CERT_REFRESH_SECONDS)))
+    app.state.background_tasks = tasks
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Final write-behind flush so turns of live sessions survive a deploy
+        await turn_writer.close()
+        # Deploys and reloads restart the process: live dialogue is restored from the snapshot on the next turn
+        written = await asyncio.get_running_loop().run_in_executor(None, session_store.snapshot)
+        if written:
+            print(f"✅ Snapshotted {written} session(s)")
+
+app = FastAPI(title="FreeLingo API", version="1.0.0", lifespan=lifespan)
 
 
 
@@ -20,8 +104,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (not raw path) to keep user ids out of metric labels
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        record_http_request(request.method, route_path, status, time.perf_counter() - started)
+
 app.include_router(auth_router)
 
 app.include_router(voice_router)
@@ -33,6 +132,12 @@ app.include_router(dialogue_router, prefix="/api")
 async def health_check():
     return {"status": "OK", "message": "FreeLingo API is running"}
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -43,8 +148,88 @@ async def root():
         "health": "/api/health"
     }
 
+async def resume_workflows(session_ids: List[str]) -> None:
+    """Finish interrupted post-session workflows (all of them when no ids are given)."""
+    from freelingo_agent.api.dialogue import workflow_service
+    from freelingo_agent.services.workflow_result_service import resume_session_workflow
+
+    if not session_ids:
+        session_ids = await workflow_service.list_interrupted_runs()
+        print(f"Found {len(session_ids)} interrupted workflow run(s)")
+
+    for session_id in session_ids:
+        final_state = await resume_session_workflow(workflow_service, session_id)
+        if final_state is None:
+            print(f"⚠️  No interrupted workflow for session {session_id}")
+        else:
+            print(f"✅ Resumed workflow for session {session_id}")
+
+def export_trace(session_id: str, output: Optional[str]) -> None:
+    """Write a recorded workflow timeline as Chrome trace JSON (stdout when no output file)."""
+    from freelingo_agent.services.trace_service import load_trace
+
+    trace = load_trace(session_id)
+    if trace is None:
+        raise SystemExit(f"No workflow trace for session {session_id} (is WORKFLOW_TRACE_ENABLED set?)")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        print(f"✅ Wrote {len(trace['traceEvents'])} trace events to {output}")
+    else:
+        print(json.dumps(trace))
+
+async def reanalyze(args: argparse.Namespace) -> None:
+    """Re-run the post-session workflow over stored dialogue sessions (e.g. after a prompt change)."""
+    from freelingo_agent.db.dialogue_session import list_dialogue_sessions_page_db
+    from freelingo_agent.db.words import get_known_words
+    from freelingo_agent.services.reanalysis_service import reanalyze_sessions, convert_ndjson_to_parquet
+
+    # Parquet cannot be appended to, so results stream to NDJSON and are converted at the end
+    to_parquet = args.output.endswith(".parquet")
+    ndjson_path = args.output + ".ndjson" if to_parquet else args.output
+
+    await reanalyze_sessions(
+        output_path=ndjson_path,
+        fetch_page=lambda page_size, after_id: list_dialogue_sessions_page_db(page_size, after_id, user_id=args.user_id),
+        fetch_known_words=get_known_words,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        page_size=args.page_size,
+        limit=args.limit,
+    )
+    if to_parquet:
+        count = convert_ndjson_to_parquet(ndjson_path, args.output)
+        print(f"✅ Wrote {count} results to {args.output}")
+
 def main():
     """Main entry point for the freelingo command."""
+    parser = argparse.ArgumentParser(prog="freelingo", description="FreeLingo API server and maintenance commands")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("serve", help="Run the API server (default)")
+    resume_parser = subparsers.add_parser("resume", help="Finish interrupted post-session workflow runs")
+    resume_parser.add_argument("session_ids", nargs="*", help="Session ids to resume (default: every interrupted run)")
+    trace_parser = subparsers.add_parser("trace", help="Export a workflow run timeline as Chrome trace / Perfetto JSON")
+    trace_parser.add_argument("session_id", help="Session id of the traced workflow run")
+    trace_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    reanalyze_parser = subparsers.add_parser("reanalyze", help="Re-run feedback/plan/words generation over stored dialogue sessions")
+    reanalyze_parser.add_argument("-o", "--output", default="reanalysis.ndjson", help="Results file, .ndjson or .parquet (re-running with the same file resumes)")
+    reanalyze_parser.add_argument("--concurrency", type=int, default=4, help="Workflow runs in flight at once")
+    reanalyze_parser.add_argument("--rate", type=float, default=0.0, help="Max workflow runs started per second (0 = unlimited)")
+    reanalyze_parser.add_argument("--page-size", type=int, default=100, help="Sessions fetched from the database per page")
+    reanalyze_parser.add_argument("--limit", type=int, help="Stop after re-analysing this many sessions (not counting those already in the output)")
+    reanalyze_parser.add_argument("--user-id", help="Only sessions of this user")
+    args = parser.parse_args()
+
+    if args.command == "resume":
+        asyncio.run(resume_workflows(args.session_ids))
+        return
+    if args.command == "trace":
+        export_trace(args.session_id, args.output)
+        return
+    if args.command == "reanalyze":
+        asyncio.run(reanalyze(args))
+        return
+
     import uvicorn
     uvicorn.run("freelingo_agent.main:app", host="0.0.0.0", port=8000, reload=True)
 
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from typing import List, Literal, Optional, Dict, Any
+from datetime import datetime
 from .feedback_model import FeedbackAgentOutput
+from .planner_model import PlannerAgentOutput
 from .words_model import WordSuggestion
 
 
@@ -9,9 +11,33 @@ class SessionSummary(BaseModel):
     vocabulary_used: int
     session_duration: Optional[str] = None
 
+class SessionListItem(BaseModel):
+    session_id: str
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    message_count: int = 0
+    turn_count: int = 0
+    duration_seconds: Optional[float] = None
+
+class SessionListPage(BaseModel):
+    sessions: List[SessionListItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; None on the last page
+
 class EndSessionResponse(BaseModel):
     session_id: str
     status: str
     feedback: Optional[FeedbackAgentOutput] = None
+    plan: Optional[PlannerAgentOutput] = None
+    new_words: Optional[WordSuggestion] = None
+    session_summary: Optional[SessionSummary] = None
+
+class WorkflowResult(BaseModel):
+    """Stored post-session workflow outputs, keyed by session id + transcript hash"""
+    session_id: str
+    user_id: str
+    transcript_hash: str
+    feedback: Optional[FeedbackAgentOutput] = None
+    plan: Optional[PlannerAgentOutput] = None
     new_words: Optional[WordSuggestion] = None
-    session_summary: Optional[SessionSummary] = None 
\ No newline at end of file
+    is_valid: Optional[bool] = None
+    created_at: Optional[datetime] = None 
\ No newline at end of file
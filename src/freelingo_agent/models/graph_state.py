@@ -1,30 +1,37 @@
-from typing import Dict, List, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Literal
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 
-from .dialogue_model import DialogueResponse
 from .feedback_model import FeedbackAgentOutput
 from .planner_model import PlannerAgentOutput
 from .words_model import WordSuggestion
 from .referee_model import RefereeAgentOutput
 from .user_session import UserSession
-from .transcript_model import Transcript
+from .transcript_model import Transcript, LearnerHistory
 
 
 class GraphState(BaseModel):
-    """State for the LangGraph workflow - integrates with existing UserSession"""
-    # User and session info (using existing models)
+    """Lean state for the LangGraph workflow.
+    
+    Holds only what the nodes read. Every node receives and returns the whole state
+    (and the checkpointer saves it after each node), so live session objects and the
+    pydantic-ai message history stay in the UserSession and are never copied in.
+    Pass `user_session=` to derive user id, session id and known words from a session.
+    """
+    # User and session info
     user_id: str
-    user_session: UserSession  # Your existing UserSession
+    session_id: Optional[str] = None  # Saved dialogue session id, used as the checkpoint thread id
+    known_words: List[str] = Field(default_factory=list)
+    review_words: List[str] = Field(default_factory=list)  # Top of the spaced-repetition review queue, most urgent first
     
     # Current workflow state
     current_agent: Literal["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE"] = "FEEDBACK"
     
     # Workflow context
     transcript: Optional[Transcript] = None
+    learner_history: Optional[LearnerHistory] = None  # Turn analytics of earlier sessions
     
     # Agent outputs
-    last_dialogue_response: Optional[DialogueResponse] = None
     last_feedback: Optional[FeedbackAgentOutput] = None
     last_plan: Optional[PlannerAgentOutput] = None
     last_words: Optional[WordSuggestion] = None
@@ -34,7 +41,6 @@ class GraphState(BaseModel):
     referee_feedback_history: List[RefereeAgentOutput] = Field(default_factory=list)
     
     # Workflow control
-    should_continue: bool = True
     next_agent: Optional[Literal["PLANNER", "NEW_WORDS", "FEEDBACK", "END"]] = None
     
     # Retry tracking to prevent infinite loops
@@ -44,16 +50,42 @@ class GraphState(BaseModel):
     # State transition tracking
     state_transitions: List[Literal["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE", "END"]] = Field(default_factory=list)
     
-    # Context for agents (derived from existing session data)
-    conversation_context: str = ""
-    learning_focus: List[str] = Field(default_factory=list)
+    # Run budget - checked before each node; unset values fall back to the service defaults
+    time_budget_seconds: Optional[float] = None
+    token_budget: Optional[int] = None
+    deadline_at: Optional[float] = None  # epoch seconds
+    tokens_used: int = 0
+    budget_exhausted: bool = False
+    
+    # Per-node consumption, one entry per node execution
+    node_durations: Dict[str, List[float]] = Field(default_factory=dict)
+    node_tokens: Dict[str, List[int]] = Field(default_factory=dict)
+    
+    # Best-scoring agent outputs seen by the referee so far
+    best_score: int = -1
+    best_feedback: Optional[FeedbackAgentOutput] = None
+    best_plan: Optional[PlannerAgentOutput] = None
+    best_words: Optional[WordSuggestion] = None
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     
-    class Config:
-        arbitrary_types_allowed = True
+    @model_validator(mode="before")
+    @classmethod
+    def _from_user_session(cls, data: Any) -> Any:
+        """Take ids and known word strings from a UserSession instead of storing the session"""
+        if not isinstance(data, dict) or "user_session" not in data:
+            return data
+        data = dict(data)
+        session = data.pop("user_session")
+        if isinstance(session, dict):
+            session = UserSession(**session)
+        data.setdefault("user_id", session.user_id)
+        if session.session_id:
+            data.setdefault("session_id", session.session_id)
+        data.setdefault("known_words", [word.word for word in session.known_words])
+        return data
 
 
 class AgentTransition(BaseModel):
@@ -15,3 +15,11 @@ class TranscriptTurn(BaseModel):
 
 class Transcript(BaseModel):
     transcript: List[TranscriptTurn]
+
+class LearnerHistory(BaseModel):
+    """Per-turn analytics over a learner's recent sessions, given to agents as cross-session context"""
+    sessions: int
+    turns: int
+    avg_user_words_per_turn: float
+    challenge_tags: Dict[str, int] = Field(default_factory=dict)  # vocabulary_challenge tag -> turns
+    rule_check_failures: Dict[str, int] = Field(default_factory=dict)  # rule -> turns where the AI broke it
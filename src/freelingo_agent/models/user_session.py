@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime, timezone
 from pydantic_ai.messages import ModelMessage
 from freelingo_agent.models.words_model import Word
+from freelingo_agent.models.transcript_model import TranscriptTurn, AiTurn
 
 class UserSession(BaseModel):
     user_id: str
@@ -12,6 +13,10 @@ class UserSession(BaseModel):
     dialogue_agent: Optional[Any] = None  # Using Any to avoid type annotation issues
     dialogue_history: List[ModelMessage] = Field(default_factory=list)
     last_agent_response: Optional[Dict[str, Any]] = None  # Store full agent response
+    started_at: Optional[datetime] = None  # First turn of the live dialogue session
+    transcript: List[TranscriptTurn] = Field(default_factory=list)  # Completed AI/user turns, appended per dialogue turn
+    pending_ai_turn: Optional[AiTurn] = None  # Latest AI turn, waiting for the user's reply
+    last_ended_session_id: Optional[str] = None  # Lets a retried session end find the saved session
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
@@ -19,6 +19,44 @@ class Word(BaseModel):
     example: Optional[str] = None
     created_at: Optional[datetime] = None
 
+class WordStats(BaseModel):
+    """Spaced-repetition statistics of one word, updated in batch after each session"""
+    word_id: str
+    user_id: str
+    times_used: int = 0  # learner turns containing the word
+    times_offered: int = 0  # AI turns containing the word
+    error_count: int = 0  # feedback mistakes containing the word
+    last_seen_at: Optional[datetime] = None
+    ease: float = 2.5  # SM-2 ease factor
+    interval_days: float = 0.0
+    repetitions: int = 0  # successful sessions in a row
+    due_at: Optional[datetime] = None  # None until the learner has used the word
+
+class ReviewItem(BaseModel):
+    word_id: str
+    word: str
+    translation: str
+    priority: float  # higher is reviewed first
+    due_at: Optional[datetime] = None
+    error_count: int = 0
+
+class ReviewQueue(BaseModel):
+    user_id: str
+    items: List[ReviewItem]
+    updated_at: Optional[datetime] = None
+
+class BulkWordsRequest(BaseModel):
+    words: List[Word] = Field(max_length=1000)
+
+class BulkWordsResponse(BaseModel):
+    created: List[Word]
+    skipped: List[str]  # words the user already had (or repeated in the request)
+
+class AcceptSuggestionsRequest(BaseModel):
+    suggestion: WordSuggestion
+    words: Optional[List[str]] = None  # subset of suggestion.new_words to keep; all when omitted
+    translations: Dict[str, str] = {}  # word -> translation; left empty for words not listed
+
 class DialogueMessage(BaseModel):
     message: str
     user_id: str
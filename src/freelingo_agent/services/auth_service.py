@@ -1,10 +1,17 @@
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
 import firebase_admin
 from firebase_admin import auth as firebase_auth, credentials
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from freelingo_agent.models.user import User
-from freelingo_agent.config import FIREBASE_SERVICE_ACCOUNT_PATH
+from freelingo_agent.config import FIREBASE_SERVICE_ACCOUNT_PATH, AUTH_TOKEN_CACHE_SIZE
+from freelingo_agent.services.metrics_service import record_auth_token_lookup
 
 bearer_scheme = HTTPBearer()
 
@@ -17,6 +24,53 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 
 
+class TokenCache:
+    """
+    Verified token claims by token hash, until the token's exp, bounded LRU.
+    Tokens themselves are not kept, only their SHA-256.
+    """
+
+    def __init__(self, max_entries: int = AUTH_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        expires_at = float(claims.get("exp", 0))
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[self._key(token)] = (expires_at, claims)
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
 def verify_token(token: str) -> dict:
     try:
         decoded_token = firebase_auth.verify_id_token(token)
@@ -25,7 +79,53 @@ def verify_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail=f"Invalid Firebase token: {str(e)}")
 
 
-def get_current_user(authorization=Depends(bearer_scheme)) -> User:
-    token = authorization.credentials
-    payload = verify_token(token)
+def certificate_request() -> Tuple[Callable[..., Any], str]:
+    """
+    The Firebase SDK's cache-control aware certificate transport and the URL
+    of the ID token certificates. Neither is public API (pyproject pins the
+    SDK's major version), so startup checks them with this: RuntimeError if
+    the installed SDK no longer has them.
+    """
+    try:
+        from firebase_admin._token_gen import ID_TOKEN_CERT_URI
+        request = firebase_auth._get_client(firebase_admin.get_app())._token_verifier.request
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(
+            f"firebase-admin {firebase_admin.__version__} does not expose the certificate cache "
+            f"refresh_certificates() relies on ({e}); set FIREBASE_CERT_REFRESH_SECONDS=0 to run without it"
+        ) from e
+    if not callable(request):
+        raise RuntimeError(f"firebase-admin {firebase_admin.__version__}: certificate transport is not callable")
+    return request, ID_TOKEN_CERT_URI
+
+
+def refresh_certificates() -> None:
+    """
+    Re-fetch Google's ID token signing certificates into the Firebase SDK's
+    HTTP cache, so a verification never waits for the fetch when they expire.
+    """
+    request, url = certificate_request()
+    # no-cache skips the cached copy but stores the new one
+    request(url=url, headers={"Cache-Control": "no-cache"})
+
+
+async def authenticate(token: str) -> User:
+    """User of a Firebase ID token (HTTPException 401 if it is invalid); also for WebSocket handshakes"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        record_auth_token_lookup("hit")
+    else:
+        # Signature checks (and the occasional certificate fetch) stay off the event loop
+        started = time.perf_counter()
+        try:
+            payload = await run_in_threadpool(verify_token, token)
+        except HTTPException:
+            record_auth_token_lookup("invalid", time.perf_counter() - started)
+            raise
+        record_auth_token_lookup("miss", time.perf_counter() - started)
+        token_cache.put(token, payload)
     return User(user_id=payload["uid"], email=payload.get("email", ""))
+
+
+async def get_current_user(authorization=Depends(bearer_scheme)) -> User:
+    return await authenticate(authorization.credentials)
@@ -1,10 +1,14 @@
 from freelingo_agent.services.user_session_service import (
-    get_session, update_dialogue_turn_in_session, 
-    store_agent_response_in_session, get_dialogue_history_from_session
+    update_dialogue_turn_in_session, 
+    store_agent_response_in_session, get_dialogue_history_from_session,
+    record_turn_in_transcript, user_session
 )
-from freelingo_agent.services.words_service import fetch_known_words
+from freelingo_agent.services.words_service import fetch_known_words_async
 from freelingo_agent.services.llm_service import get_dialogue_response
-from freelingo_agent.models.dialogue_model import DialogueResponse
+from freelingo_agent.services.dialogue_session_service import record_live_turn, queue_live_rows
+from freelingo_agent.models.dialogue_model import DialogueResponse, Rationale, VocabularyChallenge, RuleChecks, AiReply
+from freelingo_agent.models.transcript_model import AiTurn
+from pydantic import ValidationError
 from pydantic_ai.messages import ModelMessage, UserPromptPart, ModelResponse, TextPart
 from typing import List, Dict, Any, Tuple
 
@@ -13,39 +17,68 @@ async def run_dialogue_turn(user_id: str, student_response: str) -> Tuple[str, D
     Handles a single dialogue turn for the user.
     Fetches known words and dialogue history from session,
     calls LLM for the next AI message, and updates session.
+    Raises SessionConflictError if another request saved the session meanwhile.
 
     Returns:
         str: The AI's next French message (clean text for UI).
         Dict: Full agent response (for storage and feedback agent).
     """
 
-    session = get_session(user_id)
+    # One load and one (optimistic) save of the session when it lives in a shared store
+    async with user_session(user_id) as session:
+        # Ensure known_words are in session
+        if not session.known_words:
+            session.known_words = await fetch_known_words_async(user_id)
 
-    # Ensure known_words are in session
-    if not session.known_words:
-        session.known_words = fetch_known_words(user_id)
+        known_words = session.known_words
 
-    known_words = session.known_words
+        # Fetch history
+        dialogue_history = get_dialogue_history_from_session(user_id)
 
-    # Fetch history
-    dialogue_history = get_dialogue_history_from_session(user_id)
+        # Get next AI message
+        ai_message, new_dialogue_history, full_response = await get_dialogue_response(
+            user_id=user_id,
+            known_words=known_words,
+            student_response=student_response,
+            dialogue_history=dialogue_history,
+        )
 
-    # Get next AI message
-    ai_message, new_dialogue_history, full_response = await get_dialogue_response(
-        user_id=user_id,
-        known_words=known_words,
-        student_response=student_response,
-        dialogue_history=dialogue_history,
-    )
+        # Store the full agent response in session
+        store_agent_response_in_session(user_id, full_response)
 
-    # Store the full agent response in session
-    store_agent_response_in_session(user_id, full_response)
+        # Append message to history
+        update_dialogue_turn_in_session(user_id, new_dialogue_history)
 
-    # Append message to history
-    update_dialogue_turn_in_session(user_id, new_dialogue_history)
+        # Keep the transcript current so session end does not re-parse the message history
+        completed_turn = record_turn_in_transcript(user_id, student_response, ai_turn_from_response(ai_message, full_response))
+    
+        # Rows for write-behind persistence so a crash does not lose the live session
+        live_rows = record_live_turn(user_id, completed_turn)
 
+    # Queued only once the session is saved: after a conflict the turn never happened
+    await queue_live_rows(live_rows)
     return ai_message, full_response
 
+def ai_turn_from_response(ai_message: str, full_response: Dict[str, Any]) -> AiTurn:
+    """Transcript AI turn from the structured DialogueResponse (placeholder rationale if the output was unstructured)"""
+    try:
+        response = DialogueResponse.model_validate(full_response)
+        return AiTurn(rationale=response.rationale, ai_reply=response.ai_reply)
+    except ValidationError:
+        return AiTurn(
+            rationale=Rationale(
+                reasoning_summary="No rationale available",
+                vocabulary_challenge=VocabularyChallenge(description="No challenge description", tags=[]),
+                rule_checks=RuleChecks(
+                    used_only_allowed_vocabulary=False,
+                    one_sentence=False,
+                    max_eight_words=False,
+                    no_corrections_or_translations=False
+                )
+            ),
+            ai_reply=AiReply(text=ai_message, word_count=len(ai_message.split()))
+        )
+
 def extract_full_agent_response(result_output) -> Dict[str, Any]:
     """Extract the full agent response including rationale, rule_checks, etc."""
     if hasattr(result_output, '__dict__'):
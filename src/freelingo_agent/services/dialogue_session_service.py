@@ -1,31 +1,45 @@
-from freelingo_agent.db.dialogue_session import save_dialogue_session_db, list_dialogue_sessions_db, get_dialogue_session_db
-from freelingo_agent.services.user_session_service import get_dialogue_history_from_session, get_agent_response_from_session
+from freelingo_agent.db.dialogue_session import save_dialogue_session_db, list_dialogue_sessions_db, get_dialogue_session_db, upsert_dialogue_sessions_db, complete_dialogue_session_db
+from freelingo_agent.services.user_session_service import get_session, get_dialogue_history_from_session, get_agent_response_from_session, get_transcript_from_session, session_store
+from freelingo_agent.services.dialogue_turn_service import save_dialogue_turns, build_turn_row
+from freelingo_agent.services.turn_writer_service import turn_writer
+from freelingo_agent.db.pool import run_db
+from freelingo_agent.utils.pagination import encode_cursor, decode_cursor
 from freelingo_agent.models.transcript_model import Transcript, TranscriptTurn, AiTurn, UserTurn
+from freelingo_agent.models.user_session import UserSession
 from uuid import uuid4
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Set, Tuple
 
-def save_dialogue_session_service(user_id: str, messages: List[dict] = None, started_at: Optional[str] = None, ended_at: Optional[str] = None) -> str:
+def save_dialogue_session_service(user_id: str, messages: List[dict] = None, started_at: Optional[str] = None, ended_at: Optional[str] = None, transcript: Optional[Transcript] = None) -> str:
     from datetime import datetime
     from uuid import uuid4
     from freelingo_agent.services.user_session_service import clear_dialogue_in_session
     
-    # Construct the transcript from dialogue history
-    transcript = construct_transcript_from_dialogue_history(user_id)
+    # Use the caller's transcript when it already has one
+    if transcript is None:
+        transcript = construct_transcript_from_dialogue_history(user_id)
     
     # Convert to dict for storage
     transcript_dict = transcript.model_dump()
     
     session_id = str(uuid4())
     now = datetime.utcnow().isoformat() + 'Z'
+    turn_count = len(transcript.transcript)
     save_dialogue_session_db(
         session_id=session_id,
         user_id=user_id,
         messages=transcript_dict,  # Store the structured transcript
         started_at=started_at,
         ended_at=ended_at,
-        created_at=now
+        created_at=now,
+        # Summary columns so session listings never read the transcript blob
+        message_count=2 * turn_count + (1 if get_session(user_id).pending_ai_turn else 0),
+        turn_count=turn_count,
+        duration_seconds=session_duration_seconds(started_at, ended_at)
     )
+    # Per-turn rows for analytics, one batched insert
+    save_dialogue_turns(session_id, user_id, transcript)
     
     # Clear the dialogue history after saving the session
     # This ensures that the next dialogue session starts fresh
@@ -33,8 +47,136 @@ def save_dialogue_session_service(user_id: str, messages: List[dict] = None, sta
     
     return session_id
 
+def _live_session_row(session: UserSession) -> Dict[str, Any]:
+    return {
+        "id": session.session_id,
+        "user_id": session.user_id,
+        "messages": {"transcript": []},  # Filled in when the session ends; turns are in dialogue_turns meanwhile
+        "started_at": session.started_at.isoformat(),
+        "created_at": session.started_at.isoformat(),
+    }
+
+def record_live_turn(user_id: str, completed_turn: Optional[TranscriptTurn]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Open the live session on its first turn and return the rows to persist for
+    this turn: ("session", row) for a new session, ("turn", row) for a
+    completed turn. They are queued with queue_live_rows() once the session
+    is saved, so a turn lost to a session conflict writes nothing.
+    """
+    session = get_session(user_id)
+    rows = []
+    if session.session_id is None:
+        session.session_id = str(uuid4())
+        session.started_at = datetime.now(timezone.utc)
+        rows.append(("session", _live_session_row(session)))
+    if completed_turn is not None:
+        idx = len(session.transcript) - 1
+        rows.append(("turn", build_turn_row(session.session_id, user_id, idx, completed_turn)))
+    return rows
+
+async def queue_live_rows(rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Queue rows from record_live_turn() for write-behind persistence"""
+    for kind, row in rows:
+        if kind == "session":
+            await turn_writer.enqueue_session(row)
+        else:
+            await turn_writer.enqueue_turn(row)
+
+async def end_dialogue_session_service(user_id: str, started_at: Optional[str] = None, ended_at: Optional[str] = None, transcript: Optional[Transcript] = None) -> str:
+    """
+    Finish the user's dialogue session and return its id. Live sessions already have their
+    row and turns in the database, so this only flushes the tail and marks completion.
+    """
+    from freelingo_agent.services.user_session_service import clear_dialogue_in_session
+    
+    session = get_session(user_id)
+    if session.session_id is None:
+        # Dialogue that did not go through run_dialogue_turn: save it in one go
+        return await run_db(save_dialogue_session_service, user_id, started_at=started_at, ended_at=ended_at, transcript=transcript)
+    
+    if transcript is None:
+        transcript = construct_transcript_from_dialogue_history(user_id)
+    session_id = session.session_id
+    started_at = session.started_at.isoformat()
+    
+    if not await turn_writer.flush():
+        # Write-behind is failing: write the session row and all turns directly so nothing is lost
+        print(f"⚠️  Turn flush failed; writing session {session_id} directly")
+        await run_db(upsert_dialogue_sessions_db, [_live_session_row(session)])
+        await run_db(save_dialogue_turns, session_id, user_id, transcript)
+    
+    turn_count = len(transcript.transcript)
+    await run_db(
+        complete_dialogue_session_db,
+        session_id=session_id,
+        messages=transcript.model_dump(),
+        ended_at=ended_at,
+        message_count=2 * turn_count + (1 if session.pending_ai_turn else 0),
+        turn_count=turn_count,
+        duration_seconds=session_duration_seconds(started_at, ended_at)
+    )
+    clear_dialogue_in_session(user_id)
+    return session_id
+
+def save_evicted_session(session: UserSession) -> Optional[str]:
+    """
+    Persist a live session dropped from memory before it was ended, as ended
+    at its last activity. Everything is written with upserts, so rows the
+    turn writer already wrote (or still has queued) are not duplicated.
+    """
+    if session.session_id is None:
+        return None
+    transcript = Transcript(transcript=list(session.transcript))
+    started_at = session.started_at.isoformat()
+    ended_at = session.updated_at.isoformat()
+    turn_count = len(transcript.transcript)
+    upsert_dialogue_sessions_db([_live_session_row(session)])
+    save_dialogue_turns(session.session_id, session.user_id, transcript)
+    complete_dialogue_session_db(
+        session_id=session.session_id,
+        messages=transcript.model_dump(),
+        ended_at=ended_at,
+        message_count=2 * turn_count + (1 if session.pending_ai_turn else 0),
+        turn_count=turn_count,
+        duration_seconds=session_duration_seconds(started_at, ended_at)
+    )
+    return session.session_id
+
+def _save_evicted_session_logged(session: UserSession) -> None:
+    try:
+        save_evicted_session(session)
+    except Exception as e:
+        print(f"⚠️  Could not save evicted session {session.session_id} of {session.user_id}: {e}")
+
+# Saves started from the event loop, kept referenced until they finish
+_evicted_session_saves: Set["asyncio.Task"] = set()
+
+def persist_evicted_session(session: UserSession) -> None:
+    """Session store eviction hook: save the live dialogue of a dropped session in the background"""
+    if session.session_id is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Evicted on a worker thread, which may block on the database
+        _save_evicted_session_logged(session)
+        return
+    task = loop.create_task(run_db(_save_evicted_session_logged, session))
+    _evicted_session_saves.add(task)
+    task.add_done_callback(_evicted_session_saves.discard)
+
+session_store.add_eviction_hook(persist_evicted_session)
+
 def construct_transcript_from_dialogue_history(user_id: str) -> Transcript:
-    """Construct a Transcript model from the dialogue history and agent responses"""
+    """Transcript of the current dialogue, as recorded turn by turn by run_dialogue_turn"""
+    transcript = get_transcript_from_session(user_id)
+    if transcript.transcript or not get_dialogue_history_from_session(user_id):
+        return transcript
+    # History that did not come through run_dialogue_turn (e.g. set directly on the session)
+    return parse_transcript_from_dialogue_history(user_id)
+
+def parse_transcript_from_dialogue_history(user_id: str) -> Transcript:
+    """Reconstruct a Transcript by walking the pydantic-ai message history and agent responses"""
     from pydantic_ai.messages import UserPromptPart, TextPart, ModelResponse, ModelRequest, ToolCallPart, ToolReturnPart
     import json
     
@@ -199,8 +341,30 @@ def get_conversation_with_agent_responses(user_id: str) -> List[Dict[str, Any]]:
     
     return conversation
 
-def list_dialogue_sessions_service(user_id: str):
-    return list_dialogue_sessions_db(user_id)
+def session_duration_seconds(started_at: Optional[str], ended_at: Optional[str]) -> Optional[float]:
+    """Seconds between two ISO timestamps (naive ones are taken as UTC)"""
+    if not started_at or not ended_at:
+        return None
+    try:
+        start, end = (datetime.fromisoformat(value.replace("Z", "+00:00")) for value in (started_at, ended_at))
+    except ValueError:
+        return None
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return round((end - start).total_seconds(), 3)
+
+def list_dialogue_sessions_service(user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One newest-first page of session summaries plus the cursor for the next page (None on the last page)"""
+    before = tuple(decode_cursor(cursor, 2)) if cursor else None
+    # One extra row tells whether another page follows
+    sessions = list_dialogue_sessions_db(user_id, limit + 1, before)
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        next_cursor = encode_cursor(sessions[-1]["started_at"], sessions[-1]["session_id"])
+    return {"sessions": sessions, "next_cursor": next_cursor}
 
 def get_dialogue_session_service(session_id: str):
     session = get_dialogue_session_db(session_id)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from freelingo_agent.db.dialogue_turns import (
+    upsert_dialogue_turns_db, get_learner_turn_summary_db, get_learner_challenge_tag_counts_db,
+)
+from freelingo_agent.models.transcript_model import Transcript, TranscriptTurn, LearnerHistory
+
+# Window of past sessions the agents see as learner history
+LEARNER_HISTORY_DAYS = 30
+
+
+def build_turn_row(session_id: str, user_id: str, idx: int, turn: TranscriptTurn) -> Dict[str, Any]:
+    """dialogue_turns row for one transcript turn"""
+    rationale = turn.ai_turn.rationale
+    return {
+        "session_id": session_id,
+        "idx": idx,
+        "user_id": user_id,
+        "ai_text": turn.ai_turn.ai_reply.text,
+        "user_text": turn.user_turn.text,
+        "user_word_count": len(turn.user_turn.text.split()),
+        "tags": list(rationale.vocabulary_challenge.tags),
+        **rationale.rule_checks.model_dump(),
+    }
+
+
+def build_turn_rows(session_id: str, user_id: str, transcript: Transcript) -> List[Dict[str, Any]]:
+    """dialogue_turns rows for a session transcript"""
+    return [build_turn_row(session_id, user_id, idx, turn) for idx, turn in enumerate(transcript.transcript)]
+
+
+def save_dialogue_turns(session_id: str, user_id: str, transcript: Transcript) -> int:
+    """Write a saved session's turns in one batched insert; the session's messages blob stays the source of truth"""
+    try:
+        return upsert_dialogue_turns_db(build_turn_rows(session_id, user_id, transcript))
+    except Exception as e:
+        print(f"⚠️  Could not save dialogue turns for session {session_id}: {e}")
+        return 0
+
+
+def get_learner_history(user_id: str, exclude_session_id: Optional[str] = None, days: int = LEARNER_HISTORY_DAYS) -> Optional[LearnerHistory]:
+    """Turn analytics of the learner's recent sessions, or None when there are none (or they cannot be read)"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    try:
+        summary = get_learner_turn_summary_db(user_id, since, exclude_session_id)
+        if not summary or not summary["turns"]:
+            return None
+        tags = get_learner_challenge_tag_counts_db(user_id, since, exclude_session_id)
+    except Exception as e:
+        print(f"⚠️  Could not load learner history for {user_id}: {e}")
+        return None
+
+    rule_check_failures = {
+        "used_only_allowed_vocabulary": summary["not_allowed_vocabulary"],
+        "one_sentence": summary["not_one_sentence"],
+        "max_eight_words": summary["over_eight_words"],
+        "no_corrections_or_translations": summary["corrections_or_translations"],
+    }
+    return LearnerHistory(
+        sessions=summary["sessions"],
+        turns=summary["turns"],
+        avg_user_words_per_turn=round(summary["avg_user_words"], 2),
+        challenge_tags=tags,
+        rule_check_failures={rule: count for rule, count in rule_check_failures.items() if count},
+    )
@@ -1,28 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 from google.cloud import speech_v1p1beta1 as speech
-from typing import AsyncGenerator
+from typing import AsyncIterator, Iterator, Optional
+from freelingo_agent.config import STT_MAX_STREAMS, STT_LANGUAGE_CODE
+
+
+class AudioBridge:
+    """
+    Sync request iterator for the gRPC stream, pulling audio chunks from an
+    async stream on the event loop one at a time. The gRPC thread waits for
+    each chunk; the loop is never blocked. close() ends the iterator.
+    """
+
+    def __init__(self, audio_stream: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        self._stream = audio_stream
+        self._loop = loop
+        self._pending: Optional[Future] = None
+        self._closed = threading.Event()
+
+    async def _next(self) -> Optional[bytes]:
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def chunks(self) -> Iterator[bytes]:
+        while not self._closed.is_set():
+            self._pending = asyncio.run_coroutine_threadsafe(self._next(), self._loop)
+            if self._closed.is_set():
+                self._pending.cancel()
+            try:
+                chunk = self._pending.result()
+            except CancelledError:
+                return
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._pending is not None:
+            self._pending.cancel()
+
 
 class GoogleSTTService:
-    def __init__(self):
+    def __init__(self, max_streams: int = STT_MAX_STREAMS, language_code: str = STT_LANGUAGE_CODE):
         self.client = speech.SpeechClient()
         self.streaming_config = speech.StreamingRecognitionConfig(
             config=speech.RecognitionConfig(
                 encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
                 sample_rate_hertz=44100,
-                language_code="en-US"
+                language_code=language_code
             ),
             interim_results=False,
             single_utterance=True
         )
+        # The sync client blocks for the whole utterance: each stream gets its own thread
+        self._executor = ThreadPoolExecutor(max_workers=max_streams, thread_name_prefix="stt")
 
-    async def stream_transcribe(self, audio_stream: AsyncGenerator[bytes, None]) -> str:
-        """
-        Takes an async generator of raw PCM audio chunks and returns the final transcript.
-        """
-        requests = (
-            speech.StreamingRecognizeRequest(audio_content=chunk)
-            async for chunk in audio_stream
-        )
-
+    def _recognize(self, bridge: AudioBridge) -> str:
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in bridge.chunks())
         responses = self.client.streaming_recognize(self.streaming_config, requests)
 
         transcript = ""
@@ -30,5 +68,18 @@ class GoogleSTTService:
             for result in response.results:
                 if result.is_final:
                     transcript += result.alternatives[0].transcript
-
         return transcript
+
+    async def stream_transcribe(self, audio_stream: AsyncIterator[bytes]) -> str:
+        """
+        Takes an async generator of raw PCM audio chunks and returns the final transcript.
+        Recognition runs on a worker thread; chunks are pulled as gRPC sends them,
+        so a slow stream holds back the producer instead of buffering.
+        """
+        loop = asyncio.get_running_loop()
+        bridge = AudioBridge(audio_stream, loop)
+        try:
+            return await loop.run_in_executor(self._executor, self._recognize, bridge)
+        finally:
+            # On cancellation the worker thread stops waiting for audio and finishes the call
+            bridge.close()
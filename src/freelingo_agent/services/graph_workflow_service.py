@@ -1,9 +1,13 @@
 import uuid
-from typing import Dict, Any, List
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from datetime import datetime
 import logging
+import aiosqlite
 import logfire
 from langgraph.graph import StateGraph, END, START
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
 from freelingo_agent.models.graph_state import GraphState
 from freelingo_agent.models.dialogue_model import DialogueResponse
@@ -12,6 +16,12 @@ from freelingo_agent.models.planner_model import PlannerAgentOutput
 from freelingo_agent.models.words_model import WordSuggestion
 from freelingo_agent.models.referee_model import RefereeAgentOutput
 from freelingo_agent.models.user_session import UserSession
+from freelingo_agent.config import (
+    WORKFLOW_CHECKPOINT_DB,
+    WORKFLOW_TIME_BUDGET_SECONDS,
+    WORKFLOW_TOKEN_BUDGET,
+    WORKFLOW_TRACE_ENABLED,
+)
 
 # Import your existing services
 from freelingo_agent.services.user_session_service import get_session
@@ -20,20 +30,62 @@ from freelingo_agent.services.llm_service import (
     get_plan,
     suggest_new_words,
     validate_agent_chain,
+    track_llm_usage,
+)
+from freelingo_agent.services.metrics_service import (
+    record_node,
+    record_fallback,
+    record_referee_violations,
+    record_workflow_run,
 )
+from freelingo_agent.services.trace_service import WorkflowTrace, recording, save_trace, trace_instant, trace_span
 from freelingo_agent.services.dialogue_session_service import construct_transcript_from_dialogue_history
 
 # Configure logging
 logfire.configure(send_to_logfire="if-token-present")
 logger = logging.getLogger(__name__)
 
+# Order of one feedback round; a referee retry re-runs the chain from the routed agent
+AGENT_ORDER = ["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE"]
+
 
 class GraphWorkflowService:
     """Service for managing the LangGraph learning workflow - integrates with existing system"""
     
-    def __init__(self):
+    def __init__(self, checkpoint_path: Optional[str] = WORKFLOW_CHECKPOINT_DB, trace_enabled: bool = WORKFLOW_TRACE_ENABLED):
         self.graph = self._build_graph()
         self.app = self.graph.compile()
+        self.trace_enabled = trace_enabled
+        
+        # Checkpointed app is compiled lazily: the SQLite saver binds to the running event loop
+        self.checkpoint_path = checkpoint_path or None
+        self.checkpointer: Optional[AsyncSqliteSaver] = None
+        self._checkpointed_app = None
+        self._checkpointer_lock = asyncio.Lock()
+    
+    async def _get_checkpointed_app(self):
+        """Compile the graph with the persistent SQLite checkpointer on first use"""
+        async with self._checkpointer_lock:
+            if self._checkpointed_app is None:
+                conn = aiosqlite.connect(self.checkpoint_path)
+                # Daemon worker thread so an unclosed service never blocks interpreter exit
+                conn.daemon = True
+                await conn
+                self.checkpointer = AsyncSqliteSaver(conn)
+                await self.checkpointer.setup()
+                self._checkpointed_app = self.graph.compile(checkpointer=self.checkpointer)
+        return self._checkpointed_app
+    
+    async def close(self) -> None:
+        """Close the checkpoint database connection"""
+        if self.checkpointer is not None:
+            await self.checkpointer.conn.close()
+            self.checkpointer = None
+            self._checkpointed_app = None
+    
+    def _thread_config(self, session_id: str) -> Dict[str, Any]:
+        """Checkpoint config for a run - one thread per dialogue session"""
+        return {"configurable": {"thread_id": session_id}}
     
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow"""
@@ -42,10 +94,10 @@ class GraphWorkflowService:
         workflow = StateGraph(GraphState)
         
         # Add nodes for each agent
-        workflow.add_node("FEEDBACK", self._feedback_node)
-        workflow.add_node("PLANNER", self._planner_node)
-        workflow.add_node("NEW_WORDS", self._new_words_node)
-        workflow.add_node("REFEREE", self._referee_node)
+        workflow.add_node("FEEDBACK", self._budgeted_node("FEEDBACK", self._feedback_node))
+        workflow.add_node("PLANNER", self._budgeted_node("PLANNER", self._planner_node))
+        workflow.add_node("NEW_WORDS", self._budgeted_node("NEW_WORDS", self._new_words_node))
+        workflow.add_node("REFEREE", self._budgeted_node("REFEREE", self._referee_node))
         
         # Set entry point
         workflow.set_entry_point("FEEDBACK")
@@ -70,6 +122,98 @@ class GraphWorkflowService:
         
         return workflow
     
+    def _budgeted_node(
+        self, name: str, node: Callable[[GraphState], Awaitable[GraphState]]
+    ) -> Callable[[GraphState], Awaitable[GraphState]]:
+        """Wrap a node so it is skipped once the run budget is spent and its cost is recorded"""
+        async def run_node(state: GraphState) -> GraphState:
+            if state.budget_exhausted or not self._budget_covers(state, [name]):
+                if not state.budget_exhausted:
+                    logger.warning(f"Workflow budget exhausted before {name}; returning best outputs so far")
+                    trace_instant("budget_exhausted", "budget", before_node=name, tokens_used=state.tokens_used)
+                state.budget_exhausted = True
+                return state
+            
+            started = time.monotonic()
+            with trace_span(name, "node") as span_args, track_llm_usage() as usage:
+                state = await node(state)
+                span_args["llm_requests"] = usage.requests
+                span_args["total_tokens"] = usage.total_tokens
+            duration = time.monotonic() - started
+            state.node_durations.setdefault(name, []).append(duration)
+            state.node_tokens.setdefault(name, []).append(usage.total_tokens)
+            state.tokens_used += usage.total_tokens
+            record_node(name, duration, usage.total_tokens)
+            return state
+        
+        return run_node
+    
+    def _start_budget(self, state: GraphState) -> None:
+        """Fill in budget defaults and start the run deadline"""
+        if state.time_budget_seconds is None:
+            state.time_budget_seconds = WORKFLOW_TIME_BUDGET_SECONDS
+        if state.token_budget is None:
+            state.token_budget = WORKFLOW_TOKEN_BUDGET or None
+        if state.deadline_at is None:
+            state.deadline_at = time.time() + state.time_budget_seconds
+    
+    def _budget_covers(self, state: GraphState, nodes: List[str]) -> bool:
+        """Check whether the remaining budget can pay for running `nodes`, estimated from this run's averages"""
+        estimated_seconds = 0.0
+        estimated_tokens = 0
+        for node in nodes:
+            durations = state.node_durations.get(node)
+            if durations:
+                estimated_seconds += sum(durations) / len(durations)
+            tokens = state.node_tokens.get(node)
+            if tokens:
+                estimated_tokens += sum(tokens) // len(tokens)
+        
+        if state.deadline_at is not None and time.time() + estimated_seconds > state.deadline_at:
+            return False
+        if state.token_budget and state.tokens_used + estimated_tokens > state.token_budget:
+            return False
+        return True
+    
+    def _score_referee_decision(self, referee_decision: Optional[RefereeAgentOutput]) -> int:
+        """Score a chain by its passing referee checks; a valid chain always outranks an invalid one"""
+        if not referee_decision:
+            return 0
+        chain_checks = referee_decision.rationale.chain_checks.model_dump()
+        return sum(1 for passed in chain_checks.values() if passed) + (len(chain_checks) + 1 if referee_decision.is_valid else 0)
+    
+    def _track_best_outputs(self, state: GraphState) -> None:
+        """Remember the agent outputs of the best-scoring round so far"""
+        score = self._score_referee_decision(state.last_referee_decision)
+        if score > state.best_score:
+            state.best_score = score
+            state.best_feedback = state.last_feedback
+            state.best_plan = state.last_plan
+            state.best_words = state.last_words
+    
+    def _restore_best_outputs(self, state: GraphState) -> GraphState:
+        """Return the best-scoring round's outputs when the run ended on a worse one"""
+        if state.best_score > self._score_referee_decision(state.last_referee_decision):
+            logger.info(f"Returning best-scoring outputs (score {state.best_score}) instead of the last round")
+            state.last_feedback = state.best_feedback
+            state.last_plan = state.best_plan
+            state.last_words = state.best_words
+        return state
+    
+    def budget_summary(self, state: GraphState) -> Dict[str, Any]:
+        """Per-run budget consumption metrics"""
+        time_spent = sum(sum(durations) for durations in state.node_durations.values())
+        return {
+            "time_budget_seconds": state.time_budget_seconds,
+            "time_spent_seconds": round(time_spent, 3),
+            "token_budget": state.token_budget,
+            "tokens_used": state.tokens_used,
+            "budget_exhausted": state.budget_exhausted,
+            "node_runs": {node: len(durations) for node, durations in state.node_durations.items()},
+            "node_seconds": {node: round(sum(durations), 3) for node, durations in state.node_durations.items()},
+            "node_tokens": {node: sum(tokens) for node, tokens in state.node_tokens.items()},
+        }
+    
     async def _feedback_node(self, state: GraphState) -> GraphState:
         """Generate feedback after dialogue session ends - uses existing session data"""
         logger.info(f"Feedback node activated for user {state.user_id}")
@@ -83,7 +227,7 @@ class GraphWorkflowService:
             transcript = state.transcript
             
             # Call feedback agent; on failure, fall back to placeholder
-            known_words = state.user_session.known_words or []
+            known_words = state.known_words
             new_words = state.last_words
             try:
                 # Pass referee feedback history if this is a retry
@@ -93,23 +237,24 @@ class GraphWorkflowService:
                     known_words=known_words,
                     new_words=new_words,
                     referee_feedback=referee_feedback,
+                    learner_history=state.learner_history,
                 )
             except Exception as agent_err:
                 logger.error(f"feedback_agent failed, using fallback: {agent_err}")
+                record_fallback("FEEDBACK", "agent_error")
                 state.last_feedback = FeedbackAgentOutput(
-                    strengths=[f"Completed session with {len(state.user_session.dialogue_history)} exchanges"],
-                    issues=[],
-                    next_focus_areas=["Continue practicing"],
-                    vocab_usage={},
+                    strengths=[f"Completed session with {len(state.transcript.transcript) if state.transcript else 0} exchanges"],
+                    mistakes=[],
+                    conversation_examples=["Continue practicing"],
                 )
             
         except Exception as e:
             logger.error(f"Error in feedback node: {e}")
+            record_fallback("FEEDBACK", "node_error")
             state.last_feedback = FeedbackAgentOutput(
                 strengths=["Completed the session"],
-                issues=[],
-                next_focus_areas=["Continue practicing"],
-                vocab_usage={}
+                mistakes=[],
+                conversation_examples=["Continue practicing"]
             )
         
         return state
@@ -124,7 +269,7 @@ class GraphWorkflowService:
         
         try:
             # Call planner agent; on failure, fall back to placeholder
-            known_words = state.user_session.known_words or []
+            known_words = state.known_words
             new_words = state.last_words
             # Use transcript from GraphState (constructed once at workflow start)
             transcript = state.transcript
@@ -136,9 +281,12 @@ class GraphWorkflowService:
                     feedback=state.last_feedback,
                     new_words=new_words,
                     referee_feedback=referee_feedback,
+                    learner_history=state.learner_history,
+                    review_words=state.review_words or None,
                 )
             except Exception as agent_err:
                 logger.warning(f"planner_agent failed, using fallback: {agent_err}")
+                record_fallback("PLANNER", "agent_error")
                 state.last_plan = PlannerAgentOutput(
                     session_objectives=["Expand vocabulary", "Practice conversation"],
                     vocab_gaps=["Common conversation starters"],
@@ -146,6 +294,7 @@ class GraphWorkflowService:
             
         except Exception as e:
             logger.error(f"Error in planner node: {e}")
+            record_fallback("PLANNER", "node_error")
             state.last_plan = PlannerAgentOutput(
                 session_objectives=["Continue learning"],
                 vocab_gaps=["Basic conversation skills"]
@@ -163,7 +312,7 @@ class GraphWorkflowService:
         
         try:
             # Call words agent; on failure, fall back to placeholder
-            known_words = state.user_session.known_words or []
+            known_words = state.known_words
             try:
                 # Pass referee feedback history if this is a retry
                 referee_feedback = state.referee_feedback_history if state.referee_feedback_history else None
@@ -172,9 +321,11 @@ class GraphWorkflowService:
                     plan=state.last_plan,
                     feedback=state.last_feedback,
                     referee_feedback=referee_feedback,
+                    review_words=state.review_words or None,
                 )
             except Exception as agent_err:
                 logger.warning(f"words_agent failed, using fallback: {agent_err}")
+                record_fallback("NEW_WORDS", "agent_error")
                 state.last_words = WordSuggestion(
                     new_words=["bonjour", "merci", "s'il vous plaît"],
                     usages={
@@ -186,6 +337,7 @@ class GraphWorkflowService:
             
         except Exception as e:
             logger.error(f"Error in new words node: {e}")
+            record_fallback("NEW_WORDS", "node_error")
             state.last_words = WordSuggestion(
                 new_words=[],
                 usages={}
@@ -210,7 +362,7 @@ class GraphWorkflowService:
             transcript = state.transcript
             
             # Call referee agent; on failure, fall back to permissive decision
-            known_words = state.user_session.known_words or []
+            known_words = state.known_words
             new_words = state.last_words
             try:
                 state.last_referee_decision = await validate_agent_chain(
@@ -222,12 +374,13 @@ class GraphWorkflowService:
                 )
             except Exception as agent_err:
                 logger.warning(f"referee_agent failed, using conservative fallback: {agent_err}")
+                record_fallback("REFEREE", "agent_error")
                 state.last_referee_decision = RefereeAgentOutput(
                     is_valid=False,
                     violations=["referee_agent_failed"],
                     rationale={
-                        "reasoning_summary": f"Referee agent failed to evaluate chain quality",
-                        "rule_checks": {
+                        "reasoning_summary": "Referee agent failed to evaluate chain quality",
+                        "chain_checks": {
                             "feedback_transcript_alignment": False,
                             "planner_feedback_incorporation": False,
                             "new_words_plan_alignment": False,
@@ -238,34 +391,46 @@ class GraphWorkflowService:
 
             # Store referee decision in feedback history
             state.referee_feedback_history.append(state.last_referee_decision)
+            record_referee_violations(state.last_referee_decision.violations)
+            self._track_best_outputs(state)
             
             # Set next agent based on referee evaluation
             state.next_agent = self._determine_next_agent_from_referee(state.last_referee_decision, state)
             
         except Exception as e:
             logger.error(f"Error in referee node: {e}")
+            record_fallback("REFEREE", "node_error")
             state.last_referee_decision = RefereeAgentOutput(
                 is_valid=False,
                 violations=["Error occurred"],
                 rationale={
                     "reasoning_summary": "Error in evaluation",
-                    "rule_checks": {
-                        "used_only_allowed_vocabulary": False,
-                        "one_sentence": False,
-                        "max_eight_words": False,
-                        "no_corrections_or_translations": False
+                    "chain_checks": {
+                        "feedback_transcript_alignment": False,
+                        "planner_feedback_incorporation": False,
+                        "new_words_plan_alignment": False,
+                        "overall_chain_coherence": False
                     }
                 }
             )
             # Store referee decision in feedback history
             state.referee_feedback_history.append(state.last_referee_decision)
+            record_referee_violations(state.last_referee_decision.violations)
+            self._track_best_outputs(state)
             
             state.next_agent = self._determine_next_agent_from_referee(state.last_referee_decision, state)
         
+        trace_instant(
+            "referee_decision",
+            "referee",
+            is_valid=state.last_referee_decision.is_valid,
+            violations=state.last_referee_decision.violations,
+            next_agent=state.next_agent,
+        )
         return state
     
     def _determine_next_agent_from_referee(self, referee_decision: RefereeAgentOutput, state: GraphState) -> str:
-        """Determine next agent based on referee evaluation with circuit breaker"""
+        """Determine next agent based on referee evaluation, retry limits and the remaining run budget"""
         if not referee_decision or not referee_decision.is_valid:
             # If invalid, check violations to determine where to route
             violations = referee_decision.violations if referee_decision else []
@@ -290,6 +455,15 @@ class GraphWorkflowService:
                 logger.warning(f"Circuit breaker triggered: {target_agent} has been retried {retry_count} times. Ending workflow.")
                 return "END"
             
+            # Only start another round if the budget can pay for all of it
+            retry_round = AGENT_ORDER[AGENT_ORDER.index(target_agent):]
+            if not self._budget_covers(state, retry_round):
+                logger.warning(f"Workflow budget cannot cover another round from {target_agent}. Ending workflow.")
+                state.budget_exhausted = True
+                return "END"
+            
+            # Count the retry here - router mutations are not written back to the graph state
+            state.agent_retry_count[target_agent] = retry_count + 1
             return target_agent
         else:
             # Chain is valid, end the workflow
@@ -297,19 +471,10 @@ class GraphWorkflowService:
     
     def _referee_router(self, state: GraphState) -> str:
         """Route to next agent based on referee decision"""
-        if not state.next_agent or state.next_agent == "END":
-            return "END"
-        
-        # Check if we've been to referee 5 times - circuit breaker
-        referee_count = state.state_transitions.count("REFEREE")
-        if referee_count >= 5:
-            logger.warning(f"Circuit breaker triggered: Referee has been called {referee_count} times. Ending workflow.")
+        if state.budget_exhausted or not state.next_agent or state.next_agent == "END":
             return "END"
         
-        # Increment retry count for the target agent
         target_agent = state.next_agent
-        state.agent_retry_count[target_agent] = state.agent_retry_count.get(target_agent, 0) + 1
-        
         logger.info(f"Routing to {target_agent} (retry #{state.agent_retry_count[target_agent]})")
         self._log_state_transitions(state)
         return target_agent
@@ -366,8 +531,29 @@ class GraphWorkflowService:
             total_retries = sum(final_state.agent_retry_count.values())
             print(f"   🔄 Retry Summary: {total_retries} total retries across {len(final_state.agent_retry_count)} agents")
         
+        # Log budget consumption
+        budget = self.budget_summary(final_state)
+        print(f"   ⏱️ Budget: {budget['time_spent_seconds']}s of {budget['time_budget_seconds']}s, "
+              f"{budget['tokens_used']} tokens of {budget['token_budget'] or 'unlimited'}"
+              f"{' (exhausted)' if budget['budget_exhausted'] else ''}")
+        logger.info(f"Workflow budget consumption: {budget}")
+        
         print(f"   ✅ Workflow completed successfully\n")
     
+    def _record_run_metrics(self, final_state: GraphState) -> None:
+        """Export run outcome, referee loop depth and total node time to Prometheus"""
+        if final_state.last_referee_decision and final_state.last_referee_decision.is_valid:
+            outcome = "valid"
+        elif final_state.budget_exhausted:
+            outcome = "budget_exhausted"
+        else:
+            outcome = "invalid"
+        record_workflow_run(
+            outcome=outcome,
+            referee_rounds=final_state.state_transitions.count("REFEREE"),
+            duration_seconds=sum(sum(durations) for durations in final_state.node_durations.values()),
+        )
+    
     async def trigger_feedback_loop(self, state: GraphState) -> GraphState:
         """Trigger the post-session learning workflow: feedback → planner → words → referee"""
         logger.info(f"Triggering feedback loop for user {state.user_id}")
@@ -376,7 +562,7 @@ class GraphWorkflowService:
         print(f"\n🚀 GRAPH WORKFLOW STARTING")
         print(f"   User ID: {state.user_id}")
         print(f"   Transcript turns: {len(state.transcript.transcript) if state.transcript and state.transcript.transcript else 0}")
-        print(f"   Known words: {len(state.user_session.known_words) if state.user_session.known_words else 0}")
+        print(f"   Known words: {len(state.known_words)}")
         print(f"   Starting agent: FEEDBACK")
         
         # Transition to feedback flow
@@ -407,22 +593,103 @@ class GraphWorkflowService:
         """Run the complete workflow from current state"""
         logger.info(f"Running workflow for user {state.user_id}")
         
+        self._start_budget(state)
+        session_id = state.session_id or str(uuid.uuid4())
+        trace = WorkflowTrace(run_id=session_id, user_id=state.user_id) if self.trace_enabled else None
         try:
-            result = await self.app.ainvoke(state)
+            with recording(trace):
+                if self.checkpoint_path:
+                    # Save state after every node so a crashed run can be resumed by session id
+                    app = await self._get_checkpointed_app()
+                    result = await app.ainvoke(state, config=self._thread_config(session_id), durability="sync")
+                    await self.checkpointer.adelete_thread(session_id)
+                else:
+                    result = await self.app.ainvoke(state)
             # Convert dict result back to GraphState if needed
             if isinstance(result, dict):
                 final_state = GraphState(**result)
             else:
                 final_state = result
+            final_state = self._restore_best_outputs(final_state)
             
             # Log final state transitions
             self._log_state_transitions(final_state)
             
             # Log workflow completion with GraphState summary
             self._log_workflow_completion(final_state)
+            self._record_run_metrics(final_state)
             
             return final_state
         except Exception as e:
             logger.error(f"Error running workflow: {e}")
             return state
+        finally:
+            if trace is not None:
+                save_trace(trace)
+    
+    async def get_interrupted_run(self, session_id: str) -> Optional[GraphState]:
+        """Return the last checkpointed state of an unfinished run, or None if there is nothing to resume"""
+        if not self.checkpoint_path:
+            return None
+        
+        app = await self._get_checkpointed_app()
+        snapshot = await app.aget_state(self._thread_config(session_id))
+        if not snapshot.next:
+            return None
+        return GraphState(**snapshot.values)
+    
+    async def list_interrupted_runs(self) -> List[str]:
+        """List session ids whose workflow run stopped before reaching END"""
+        if not self.checkpoint_path:
+            return []
+        
+        await self._get_checkpointed_app()
+        # Completed runs delete their thread, so every remaining thread is a candidate
+        session_ids: List[str] = []
+        async for checkpoint in self.checkpointer.alist(None):
+            session_id = checkpoint.config["configurable"]["thread_id"]
+            if session_id not in session_ids:
+                session_ids.append(session_id)
+        
+        interrupted = []
+        for session_id in session_ids:
+            if await self.get_interrupted_run(session_id) is not None:
+                interrupted.append(session_id)
+        return interrupted
+    
+    async def resume_workflow(self, session_id: str) -> Optional[GraphState]:
+        """Finish an interrupted run from its last completed node.
+        
+        Must not be called while another worker is still executing the same session.
+        Returns None when the session has no unfinished run.
+        """
+        if not self.checkpoint_path:
+            return None
 
+        app = await self._get_checkpointed_app()
+        config = self._thread_config(session_id)
+        snapshot = await app.aget_state(config)
+        if not snapshot.next:
+            return None
+        logger.info(f"Resuming workflow for session {session_id} at {', '.join(snapshot.next)}")
+        
+        # The original deadline passed with the crashed process - give the remainder a fresh one
+        time_budget_seconds = snapshot.values.get("time_budget_seconds") or WORKFLOW_TIME_BUDGET_SECONDS
+        await app.aupdate_state(config, {"deadline_at": time.time() + time_budget_seconds})
+        
+        # A None input continues from the saved checkpoint instead of starting over
+        trace = WorkflowTrace(run_id=session_id, user_id=snapshot.values.get("user_id", "")) if self.trace_enabled else None
+        try:
+            with recording(trace):
+                result = await app.ainvoke(None, config=config, durability="sync")
+        finally:
+            if trace is not None:
+                save_trace(trace)
+        await self.checkpointer.adelete_thread(session_id)
+        final_state = GraphState(**result) if isinstance(result, dict) else result
+        final_state = self._restore_best_outputs(final_state)
+        
+        self._log_state_transitions(final_state)
+        self._log_workflow_completion(final_state)
+        self._record_run_metrics(final_state)
+        return final_state
@@ -1,13 +1,17 @@
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 from openai import AsyncOpenAI
 from freelingo_agent.models.words_model import WordSuggestion, Word
 from freelingo_agent.models.feedback_model import FeedbackAgentOutput
 from freelingo_agent.models.planner_model import PlannerAgentOutput
 from freelingo_agent.models.referee_model import RefereeAgentOutput
-from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.transcript_model import Transcript, LearnerHistory
 from freelingo_agent.services.user_session_service import get_session
+from freelingo_agent.services.trace_service import trace_span
 from freelingo_agent.agents.words_agent import words_agent
 from freelingo_agent.agents.agents_config import DIALOGUE_AGENT_PROMPT
 from freelingo_agent.agents.dialogue_agent import create_dialogue_agent
@@ -16,17 +20,65 @@ from freelingo_agent.agents.planner_agent import planner_agent
 from freelingo_agent.agents.referee_agent import referee_agent
 from pydantic_ai.messages import ModelMessage, UserPromptPart, ModelResponse, TextPart
 
+
+@dataclass
+class LLMUsage:
+    """Token usage accumulated across agent calls"""
+    requests: int = 0
+    total_tokens: int = 0
+
+
+_active_usage: ContextVar[Optional[LLMUsage]] = ContextVar("active_llm_usage", default=None)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[LLMUsage]:
+    """Collect token usage of every agent run awaited inside the block"""
+    usage = LLMUsage()
+    token = _active_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _active_usage.reset(token)
+
+
+def _word_strings(known_words: List[Union[Word, str]]) -> List[str]:
+    """Known words as plain strings; the workflow state already stores them that way"""
+    return [word if isinstance(word, str) else word.word for word in known_words]
+
+
+def _record_usage(result) -> int:
+    """Add an agent run's usage to the active tracker, if any, and return its total tokens"""
+    run_usage = result.usage() if callable(getattr(result, "usage", None)) else None
+    total_tokens = getattr(run_usage, "total_tokens", None)
+    total_tokens = total_tokens if isinstance(total_tokens, int) else 0
+    
+    usage = _active_usage.get()
+    if usage is not None:
+        usage.requests += 1
+        usage.total_tokens += total_tokens
+    return total_tokens
+
+
+async def _run_agent(agent, agent_name: str, user_prompt: str, **kwargs):
+    """Run an agent, recording token usage and (when the run is traced) a timeline span"""
+    with trace_span(agent_name, "llm", prompt_chars=len(user_prompt)) as span_args:
+        result = await agent.run(user_prompt=user_prompt, **kwargs)
+        span_args["total_tokens"] = _record_usage(result)
+    return result
+
 async def suggest_new_words(
-    known_words: List[Word],
+    known_words: List[Union[Word, str]],
     plan: Optional[PlannerAgentOutput] = None,
     feedback: Optional[FeedbackAgentOutput] = None,
     referee_feedback: Optional[List[RefereeAgentOutput]] = None,
+    review_words: Optional[List[str]] = None,
 ) -> WordSuggestion:
     """
     Calls the words_agent to suggest 3 new words that pair well with known words.
 
     Args:
-        known_words (List[Word]): The user's known French words.
+        known_words (List[Word | str]): The user's known French words.
 
     Returns:
         WordSuggestion: new words + example sentences
@@ -34,9 +86,11 @@ async def suggest_new_words(
 
     try:
         # Build INPUT block with complete plan and feedback outputs
-        word_strings = [word.word for word in known_words]
+        word_strings = _word_strings(known_words)
         parts: List[str] = []
         parts.append(f"known_words: {json.dumps(word_strings, ensure_ascii=False)}")
+        if review_words:
+            parts.append(f"review_words: {json.dumps(review_words, ensure_ascii=False)}")
         if plan is not None:
             # Pass complete plan output
             plan_json = json.dumps(plan.model_dump(), indent=2, ensure_ascii=False)
@@ -60,7 +114,7 @@ async def suggest_new_words(
         parts.append("END")
         user_prompt = "\n".join(parts)
 
-        result = await words_agent.run(user_prompt=user_prompt)
+        result = await _run_agent(words_agent, "words_agent", user_prompt)
         parsed_output = json.loads(result.output)
         
         return WordSuggestion(**parsed_output)
@@ -101,8 +155,10 @@ async def get_dialogue_response(
             dialogue_agent = create_dialogue_agent(updated_dialogue_agent_prompt)
             session.dialogue_agent = dialogue_agent
       
-        result = await dialogue_agent.run(
-            user_prompt=student_response,
+        result = await _run_agent(
+            dialogue_agent,
+            "dialogue_agent",
+            student_response,
             message_history=dialogue_history
         )
         
@@ -145,9 +201,10 @@ def truncate_transcript_for_logging(transcript_text: str, max_lines: int = 3) ->
 
 async def get_feedback(
     transcript: Transcript,
-    known_words: List[Word],
+    known_words: List[Union[Word, str]],
     new_words: Optional[WordSuggestion] = None,
     referee_feedback: Optional[List[RefereeAgentOutput]] = None,
+    learner_history: Optional[LearnerHistory] = None,
 ) -> FeedbackAgentOutput:
     """
     Calls the feedback_agent with the provided transcript and vocabulary context.
@@ -161,12 +218,15 @@ async def get_feedback(
         # Build INPUT block as per few-shots
         parts = []
         # Extract just the word strings for the agent
-        word_strings = [word.word for word in known_words]
+        word_strings = _word_strings(known_words)
         parts.append(f"known_words: {json.dumps(word_strings, ensure_ascii=False)}")
         if new_words and new_words.new_words:
             parts.append(f"new_words: {json.dumps(new_words.new_words, ensure_ascii=False)}")
         parts.append("Transcript:")
         parts.append(transcript_text)
+        if learner_history is not None:
+            parts.append("Learner history (earlier sessions):")
+            parts.append(json.dumps(learner_history.model_dump(), ensure_ascii=False))
         
         # Add referee feedback if this is a retry
         if referee_feedback:
@@ -180,7 +240,7 @@ async def get_feedback(
         parts.append("END")
         user_prompt = "\n".join(parts)
 
-        result = await feedback_agent.run(user_prompt=user_prompt)
+        result = await _run_agent(feedback_agent, "feedback_agent", user_prompt)
         
         # The agent now returns FeedbackAgentOutput directly
         if isinstance(result.output, FeedbackAgentOutput):
@@ -194,21 +254,29 @@ async def get_feedback(
 
 
 async def get_plan(
-    known_words: List[Word],
+    known_words: List[Union[Word, str]],
     feedback: Optional[FeedbackAgentOutput] = None,
     new_words: Optional[WordSuggestion] = None,
     referee_feedback: Optional[List[RefereeAgentOutput]] = None,
+    learner_history: Optional[LearnerHistory] = None,
+    review_words: Optional[List[str]] = None,
 ) -> PlannerAgentOutput:
     """
     Calls the planner_agent to create a practice plan for the next session.
+    With review_words the planner gets that short prioritized list and the
+    vocabulary size instead of the full known_words.
     Returns a validated PlannerAgentOutput.
     """
 
     try:
         # Build INPUT block with complete feedback output
         parts: List[str] = []
-        word_strings = [word.word for word in known_words]
-        parts.append(f"known_words: {json.dumps(word_strings, ensure_ascii=False)}")
+        word_strings = _word_strings(known_words)
+        if review_words:
+            parts.append(f"review_words: {json.dumps(review_words, ensure_ascii=False)}")
+            parts.append(f"known_word_count: {len(word_strings)}")
+        else:
+            parts.append(f"known_words: {json.dumps(word_strings, ensure_ascii=False)}")
         if new_words and new_words.new_words:
             parts.append(f"new_words: {json.dumps(new_words.new_words, ensure_ascii=False)}")
         if feedback is not None:
@@ -216,6 +284,9 @@ async def get_plan(
             feedback_json = json.dumps(feedback.model_dump(), indent=2, ensure_ascii=False)
             parts.append("Feedback:")
             parts.append(feedback_json)
+        if learner_history is not None:
+            parts.append("Learner history (earlier sessions):")
+            parts.append(json.dumps(learner_history.model_dump(), ensure_ascii=False))
         
         # Add referee feedback if this is a retry
         if referee_feedback:
@@ -229,7 +300,7 @@ async def get_plan(
         parts.append("END")
         user_prompt = "\n".join(parts)
         
-        result = await planner_agent.run(user_prompt=user_prompt)
+        result = await _run_agent(planner_agent, "planner_agent", user_prompt)
         return result.output
     except Exception as e:
         raise RuntimeError(f"planner_agent failed: {e}")
@@ -237,7 +308,7 @@ async def get_plan(
 
 async def validate_agent_chain(
     transcript: Transcript,
-    known_words: List[Word],
+    known_words: List[Union[Word, str]],
     feedback: Optional[FeedbackAgentOutput] = None,
     plan: Optional[PlannerAgentOutput] = None,
     new_words: Optional[WordSuggestion] = None,
@@ -249,7 +320,7 @@ async def validate_agent_chain(
 
     try:
         # Build allowed vocabulary list
-        allowed_words = [word.word for word in known_words]
+        allowed_words = _word_strings(known_words)
         if new_words and new_words.new_words:
             allowed_words.extend(new_words.new_words)
         
@@ -272,7 +343,7 @@ async def validate_agent_chain(
         parts.append("END")
         user_prompt = "\n".join(parts)
 
-        result = await referee_agent.run(user_prompt=user_prompt)
+        result = await _run_agent(referee_agent, "referee_agent", user_prompt)
         
         # The agent now returns RefereeAgentOutput directly
         if isinstance(result.output, RefereeAgentOutput):
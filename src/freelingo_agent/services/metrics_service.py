@@ -0,0 +1,183 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from typing import Iterable, Tuple
+
+# Workflow nodes can take many seconds when the LLM is slow
+NODE_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+WORKFLOW_NODE_SECONDS = Histogram(
+    "freelingo_workflow_node_duration_seconds",
+    "Wall-clock time of one workflow node execution",
+    ["node"],
+    buckets=NODE_LATENCY_BUCKETS,
+)
+WORKFLOW_RUN_SECONDS = Histogram(
+    "freelingo_workflow_run_duration_seconds",
+    "Wall-clock time of a complete post-session workflow run",
+    buckets=NODE_LATENCY_BUCKETS + (240, 480),
+)
+LLM_TOKENS = Counter(
+    "freelingo_llm_tokens_total",
+    "LLM tokens consumed by workflow nodes",
+    ["node"],
+)
+WORKFLOW_FALLBACKS = Counter(
+    "freelingo_workflow_fallbacks_total",
+    "Node outputs replaced by a placeholder because the agent or the node failed",
+    ["node", "reason"],
+)
+REFEREE_VIOLATIONS = Counter(
+    "freelingo_referee_violations_total",
+    "Violations reported by the referee agent",
+    ["violation"],
+)
+REFEREE_ROUNDS = Histogram(
+    "freelingo_workflow_referee_rounds",
+    "Referee evaluations per workflow run (loop depth)",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+)
+WORKFLOW_RUNS = Counter(
+    "freelingo_workflow_runs_total",
+    "Completed workflow runs by outcome",
+    ["outcome"],
+)
+HTTP_REQUESTS = Counter(
+    "freelingo_http_requests_total",
+    "HTTP requests handled by the API",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "freelingo_http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+)
+
+TURN_FLUSHES = Counter(
+    "freelingo_turn_flushes_total",
+    "Write-behind flushes of live dialogue turns by outcome",
+    ["outcome"],
+)
+TURNS_WRITTEN = Counter(
+    "freelingo_turns_written_total",
+    "Dialogue turns written to the database by the write-behind writer",
+)
+TURN_WRITE_BACKLOG = Gauge(
+    "freelingo_turn_write_backlog",
+    "Dialogue turn writes queued and not yet flushed",
+)
+WORD_CACHE_LOOKUPS = Counter(
+    "freelingo_word_cache_lookups_total",
+    "Word list cache lookups by result (hit rate = hit / all)",
+    ["result"],
+)
+WORD_CACHE_EVICTIONS = Counter(
+    "freelingo_word_cache_evictions_total",
+    "Users' word lists evicted from the word cache to stay within its bounds",
+)
+WORD_CACHE_SIZE = Gauge(
+    "freelingo_word_cache_size",
+    "Entries held by the word cache",
+    ["unit"],
+)
+
+SESSION_STORE_EVICTIONS = Counter(
+    "freelingo_session_store_evictions_total",
+    "Dialogue sessions dropped from memory, by reason (idle, sessions or bytes limit)",
+    ["reason"],
+)
+SESSION_STORE_SIZE = Gauge(
+    "freelingo_session_store_size",
+    "Dialogue sessions held in memory and their approximate size",
+    ["unit"],
+)
+
+AUTH_TOKEN_LOOKUPS = Counter(
+    "freelingo_auth_token_lookups_total",
+    "Bearer token checks by result: hit (verified claims cached), miss (verified now) or invalid",
+    ["result"],
+)
+CERTIFICATE_REFRESHES = Counter(
+    "freelingo_firebase_certificate_refreshes_total",
+    "Background refreshes of Firebase token signing certificates by outcome: ok or failed",
+    ["outcome"],
+)
+AUTH_VERIFY_SECONDS = Histogram(
+    "freelingo_auth_verify_duration_seconds",
+    "Firebase ID token verification time on a cache miss",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def record_node(node: str, duration_seconds: float, tokens: int) -> None:
+    WORKFLOW_NODE_SECONDS.labels(node=node).observe(duration_seconds)
+    if tokens:
+        LLM_TOKENS.labels(node=node).inc(tokens)
+
+
+def record_fallback(node: str, reason: str) -> None:
+    """reason is "agent_error" (agent call failed) or "node_error" (the node itself failed)"""
+    WORKFLOW_FALLBACKS.labels(node=node, reason=reason).inc()
+
+
+def record_referee_violations(violations: Iterable[str]) -> None:
+    for violation in violations:
+        REFEREE_VIOLATIONS.labels(violation=violation).inc()
+
+
+def record_workflow_run(outcome: str, referee_rounds: int, duration_seconds: float) -> None:
+    WORKFLOW_RUNS.labels(outcome=outcome).inc()
+    REFEREE_ROUNDS.observe(referee_rounds)
+    WORKFLOW_RUN_SECONDS.observe(duration_seconds)
+
+
+def record_http_request(method: str, route: str, status: int, duration_seconds: float) -> None:
+    HTTP_REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+    HTTP_REQUEST_SECONDS.labels(method=method, route=route).observe(duration_seconds)
+
+
+def record_turn_flush(outcome: str, turns: int) -> None:
+    TURN_FLUSHES.labels(outcome=outcome).inc()
+    if outcome == "ok":
+        TURNS_WRITTEN.inc(turns)
+
+
+def set_turn_write_backlog(pending: int) -> None:
+    TURN_WRITE_BACKLOG.set(pending)
+
+
+def record_word_cache_lookup(hit: bool) -> None:
+    WORD_CACHE_LOOKUPS.labels(result="hit" if hit else "miss").inc()
+
+
+def record_word_cache_eviction() -> None:
+    WORD_CACHE_EVICTIONS.inc()
+
+
+def set_word_cache_size(users: int, words: int) -> None:
+    WORD_CACHE_SIZE.labels(unit="users").set(users)
+    WORD_CACHE_SIZE.labels(unit="words").set(words)
+
+
+def record_session_eviction(reason: str) -> None:
+    """reason is "idle" (past the TTL), "sessions" or "bytes" (over a store limit)"""
+    SESSION_STORE_EVICTIONS.labels(reason=reason).inc()
+
+
+def set_session_store_size(sessions: int, size_bytes: int) -> None:
+    SESSION_STORE_SIZE.labels(unit="sessions").set(sessions)
+    SESSION_STORE_SIZE.labels(unit="bytes").set(size_bytes)
+
+
+def record_auth_token_lookup(result: str, verify_seconds: float = 0.0) -> None:
+    """result is "hit", "miss" or "invalid"; verify_seconds is the verification time of a miss or invalid token"""
+    AUTH_TOKEN_LOOKUPS.labels(result=result).inc()
+    if result != "hit":
+        AUTH_VERIFY_SECONDS.observe(verify_seconds)
+
+
+def record_certificate_refresh(outcome: str) -> None:
+    CERTIFICATE_REFRESHES.labels(outcome=outcome).inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of all metrics and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from freelingo_agent.agents import agents_config
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.transcript_model import Transcript, TranscriptTurn, UserTurn, AiTurn
+from freelingo_agent.models.dialogue_model import Rationale, VocabularyChallenge, RuleChecks, AiReply
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.db.pool import run_db
+
+# Report throughput after this many finished sessions
+PROGRESS_EVERY = 25
+
+FetchPage = Callable[[int, Optional[str]], List[Dict[str, Any]]]
+
+
+def prompt_version() -> str:
+    """Short hash of the agent prompts, stored with each result so runs across prompt changes can be compared"""
+    prompts = [getattr(agents_config, name) for name in sorted(dir(agents_config)) if name.endswith("_PROMPT")]
+    return hashlib.sha256("\n".join(prompts).encode("utf-8")).hexdigest()[:12]
+
+
+def _fallback_ai_turn(text: str) -> AiTurn:
+    return AiTurn(
+        rationale=Rationale(
+            reasoning_summary="No rationale available",
+            vocabulary_challenge=VocabularyChallenge(description="No challenge description", tags=[]),
+            rule_checks=RuleChecks(
+                used_only_allowed_vocabulary=False,
+                one_sentence=False,
+                max_eight_words=False,
+                no_corrections_or_translations=False,
+            ),
+        ),
+        ai_reply=AiReply(text=text, word_count=len(text.split())),
+    )
+
+
+def transcript_from_messages(messages: Any) -> Transcript:
+    """
+    Rebuild a Transcript from the `messages` jsonb of a stored session.
+
+    Current rows hold a dumped Transcript; older rows hold a flat list of
+    {"sender", "text", "agent_response"} chat messages, which are paired up
+    into AI/user turns.
+    """
+    if isinstance(messages, dict) and "transcript" in messages:
+        return Transcript.model_validate(messages)
+    if not isinstance(messages, list):
+        raise ValueError(f"Unsupported messages format: {type(messages).__name__}")
+
+    turns: List[TranscriptTurn] = []
+    ai_turn: Optional[AiTurn] = None
+    for message in messages:
+        if message.get("sender") == "ai":
+            agent_response = message.get("agent_response")
+            if agent_response and "rationale" in agent_response and "ai_reply" in agent_response:
+                ai_turn = AiTurn.model_validate(agent_response)
+            else:
+                ai_turn = _fallback_ai_turn(message.get("text") or "")
+        elif message.get("sender") == "user" and ai_turn is not None:
+            turns.append(TranscriptTurn(ai_turn=ai_turn, user_turn=UserTurn(text=message.get("text") or "")))
+            ai_turn = None
+    return Transcript(transcript=turns)
+
+
+async def iter_stored_sessions(fetch_page: FetchPage, page_size: int, limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream stored sessions page by page so only one page is held in memory"""
+    after_id = None
+    yielded = 0
+    while True:
+        # The Supabase client is blocking; keep the workers running while a page loads
+        page = await run_db(fetch_page, page_size, after_id)
+        for row in page:
+            if limit is not None and yielded >= limit:
+                return
+            yield row
+            yielded += 1
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def load_completed_session_ids(output_path: str) -> Set[str]:
+    """
+    Session ids already analysed successfully in the NDJSON output (the output
+    file doubles as the progress log). Sessions whose record has an error are
+    redone on the next run, and the new record supersedes the failed one.
+    """
+    completed: Set[str] = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if not record.get("error"):
+                    completed.add(record["session_id"])
+            except (json.JSONDecodeError, KeyError):
+                # A line cut short by an interrupted run; that session is simply redone
+                continue
+    return completed
+
+
+class RateLimiter:
+    """Space workflow starts at least 1/rate seconds apart (rate <= 0 disables the limit)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ThroughputReporter:
+    """Running totals printed every PROGRESS_EVERY sessions and at the end"""
+
+    def __init__(self, skipped: int):
+        self.started = time.monotonic()
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.tokens = 0
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.done += 1
+        if result.get("error"):
+            self.failed += 1
+        self.tokens += result.get("tokens_used") or 0
+        if self.done % PROGRESS_EVERY == 0:
+            self.report()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "processed": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "tokens_used": self.tokens,
+            "elapsed_seconds": round(elapsed, 1),
+            "sessions_per_minute": round(self.done / elapsed * 60, 1) if elapsed else 0.0,
+            "tokens_per_second": round(self.tokens / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def report(self) -> None:
+        s = self.summary()
+        print(f"📊 {s['processed']} sessions ({s['failed']} failed, {s['skipped']} skipped) in {s['elapsed_seconds']}s — "
+              f"{s['sessions_per_minute']} sessions/min, {s['tokens_per_second']} tokens/s")
+
+
+async def reanalyze_session(
+    service: GraphWorkflowService,
+    row: Dict[str, Any],
+    known_words: List[str],
+    version: str,
+) -> Dict[str, Any]:
+    """Run the post-session workflow on one stored session and flatten the outputs into a result record"""
+    result: Dict[str, Any] = {
+        "session_id": row["id"],
+        "user_id": row["user_id"],
+        "started_at": row.get("started_at"),
+        "prompt_version": version,
+    }
+    started = time.monotonic()
+    try:
+        transcript = transcript_from_messages(row.get("messages"))
+        final_state = await service.run_workflow(GraphState(
+            user_id=row["user_id"],
+            session_id=row["id"],
+            known_words=known_words,
+            transcript=transcript,
+        ))
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    decision = final_state.last_referee_decision
+    result.update({
+        "turns": len(transcript.transcript),
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "tokens_used": final_state.tokens_used,
+        "budget_exhausted": final_state.budget_exhausted,
+        "referee_rounds": final_state.state_transitions.count("REFEREE"),
+        "is_valid": decision.is_valid if decision else None,
+        "violations": decision.violations if decision else [],
+        "feedback": final_state.last_feedback.model_dump() if final_state.last_feedback else None,
+        "plan": final_state.last_plan.model_dump() if final_state.last_plan else None,
+        "new_words": final_state.last_words.model_dump() if final_state.last_words else None,
+    })
+    if decision is None:
+        # run_workflow swallows graph errors and hands back the input state
+        result["error"] = "workflow did not complete"
+    return result
+
+
+async def reanalyze_sessions(
+    output_path: str,
+    fetch_page: FetchPage,
+    fetch_known_words: Callable[[str], List[str]],
+    service: Optional[GraphWorkflowService] = None,
+    concurrency: int = 4,
+    rate: float = 0.0,
+    page_size: int = 100,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Re-run the workflow over stored sessions and append one NDJSON record per session to output_path.
+
+    Sessions already present in output_path are skipped, so an interrupted run
+    continues where it stopped when started again with the same output file.
+    limit counts the sessions re-analysed by this run, not the skipped ones.
+    """
+    # Stored session ids must not collide with live checkpoint threads
+    service = service or GraphWorkflowService(checkpoint_path=None)
+    completed = load_completed_session_ids(output_path)
+    reporter = ThroughputReporter(skipped=0)
+    limiter = RateLimiter(rate)
+    version = prompt_version()
+    known_words_by_user: Dict[str, List[str]] = {}
+    if completed:
+        print(f"Resuming: {len(completed)} session(s) already in {output_path}")
+
+    # Bounded queue: the DB is read only as fast as the workers drain it
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce() -> None:
+        queued = 0
+        async for row in iter_stored_sessions(fetch_page, page_size):
+            if row["id"] in completed:
+                reporter.skipped += 1
+                continue
+            if limit is not None and queued >= limit:
+                break
+            await queue.put(row)
+            queued += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def work() -> None:
+            while True:
+                row = await queue.get()
+                if row is None:
+                    return
+                user_id = row["user_id"]
+                try:
+                    if user_id not in known_words_by_user:
+                        known_words_by_user[user_id] = await run_db(fetch_known_words, user_id)
+                except Exception as e:
+                    result = {"session_id": row["id"], "user_id": user_id, "prompt_version": version, "error": f"known words: {e}"}
+                else:
+                    await limiter.wait()
+                    result = await reanalyze_session(service, row, known_words_by_user[user_id], version)
+                # Flush per record so a crash loses at most the sessions in flight
+                output.write(json.dumps(result, default=str) + "\n")
+                output.flush()
+                reporter.add(result)
+
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+
+    reporter.report()
+    return reporter.summary()
+
+
+def convert_ndjson_to_parquet(ndjson_path: str, parquet_path: str) -> int:
+    """Write the NDJSON results as Parquet (needs the optional `reanalysis` extra: pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow: pip install 'freelingo-agent[reanalysis]'")
+
+    with open(ndjson_path, encoding="utf-8") as f:
+        # A session retried after a failure has several records; the last one wins
+        by_session = {}
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                by_session.pop(record["session_id"], None)
+                by_session[record["session_id"]] = record
+    records = list(by_session.values())
+    # Nested outputs stay JSON strings so the schema does not depend on which fields the agents filled
+    for record in records:
+        for key in ("feedback", "plan", "new_words", "violations"):
+            record[key] = json.dumps(record.get(key))
+    pq.write_table(pa.Table.from_pylist(records), parquet_path)
+    return len(records)
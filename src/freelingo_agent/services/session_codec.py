@@ -0,0 +1,102 @@
+import hashlib
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+import msgpack
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+from freelingo_agent.models.user_session import UserSession
+
+# First byte of an encoded session: how the msgpack body is compressed
+RAW, ZLIB, ZSTD = 0, 1, 2
+
+# Bodies smaller than this are stored uncompressed (compression would not pay off)
+COMPRESS_MIN_BYTES = 512
+
+# Codec format version, stored in the body
+CODEC_VERSION = 1
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used without it
+    zstandard = None
+
+
+def prompt_ref(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _pack_default(value: Any) -> Any:
+    # msgpack stores aware datetimes natively; naive ones go as ISO strings, which pydantic parses back
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def dump_messages(messages: List[ModelMessage], prompts: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Messages in pydantic-ai's own python form, with each system prompt
+    replaced by a reference into prompts (every run resends the same prompt,
+    which embeds the learner's known words).
+    """
+    dumped = ModelMessagesTypeAdapter.dump_python(messages)
+    for message in dumped:
+        for part in message["parts"]:
+            if part.get("part_kind") == "system-prompt":
+                ref = prompt_ref(part["content"])
+                prompts.setdefault(ref, part["content"])
+                part["content"] = ref
+    return dumped
+
+
+def load_messages(dumped: List[Dict[str, Any]], prompts: Dict[str, str]) -> List[ModelMessage]:
+    for message in dumped:
+        for part in message["parts"]:
+            if part.get("part_kind") == "system-prompt":
+                part["content"] = prompts[part["content"]]
+    return ModelMessagesTypeAdapter.validate_python(dumped)
+
+
+def encode_session(session: UserSession, exclude: Set[str] = frozenset(), compression: str = "auto") -> bytes:
+    """
+    UserSession (without its agent) as msgpack, compressed with zstd when
+    installed, else zlib. compression is "auto", "zstd", "zlib" or "none".
+    """
+    prompts: Dict[str, str] = {}
+    # The agent is a live object, rebuilt on the next turn
+    body = session.model_dump(exclude=set(exclude) | {"dialogue_history", "dialogue_agent"})
+    if "dialogue_history" not in exclude:
+        body["dialogue_history"] = dump_messages(session.dialogue_history, prompts)
+    packed = msgpack.packb({"v": CODEC_VERSION, "prompts": prompts, "session": body}, datetime=True, default=_pack_default)
+
+    if compression == "auto":
+        compression = "none" if len(packed) < COMPRESS_MIN_BYTES else ("zstd" if zstandard else "zlib")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs zstandard: pip install zstandard")
+        return bytes([ZSTD]) + zstandard.ZstdCompressor(level=3).compress(packed)
+    if compression == "zlib":
+        return bytes([ZLIB]) + zlib.compress(packed, 6)
+    if compression == "none":
+        return bytes([RAW]) + packed
+    raise ValueError(f"Unknown compression: {compression!r}")
+
+
+def decode_session(payload: bytes) -> UserSession:
+    kind, packed = payload[0], payload[1:]
+    if kind == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Session was stored with zstd: pip install zstandard")
+        packed = zstandard.ZstdDecompressor().decompress(packed)
+    elif kind == ZLIB:
+        packed = zlib.decompress(packed)
+    elif kind != RAW:
+        raise ValueError(f"Unknown session encoding: {kind}")
+    body = msgpack.unpackb(packed, timestamp=3)
+    if body.get("v") != CODEC_VERSION:
+        raise ValueError(f"Unsupported session codec version: {body.get('v')}")
+    session = body["session"]
+    if "dialogue_history" in session:
+        session["dialogue_history"] = load_messages(session["dialogue_history"], body["prompts"])
+    return UserSession.model_validate(session)
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from freelingo_agent.config import WORKFLOW_TRACE_DIR
+
+# Recent traces kept in memory for the API; older ones are only on disk
+MAX_TRACES_IN_MEMORY = 50
+
+_active_trace: ContextVar[Optional["WorkflowTrace"]] = ContextVar("active_workflow_trace", default=None)
+_recent_traces: "OrderedDict[str, WorkflowTrace]" = OrderedDict()
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class WorkflowTrace:
+    """Timeline of one workflow run in Chrome trace event format (viewable in Perfetto / chrome://tracing)"""
+
+    def __init__(self, run_id: str, user_id: str):
+        self.run_id = run_id
+        self.user_id = user_id
+        self.started_at_us = _now_us()
+        self.events: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Record a complete event; callers may add result fields to the yielded args"""
+        start = _now_us()
+        try:
+            yield args
+        finally:
+            self.events.append({
+                "name": name, "cat": category, "ph": "X",
+                "ts": start, "dur": _now_us() - start,
+                "pid": 1, "tid": 1, "args": args,
+            })
+
+    def instant(self, name: str, category: str, **args: Any) -> None:
+        self.events.append({
+            "name": name, "cat": category, "ph": "i", "s": "t",
+            "ts": _now_us(), "pid": 1, "tid": 1, "args": args,
+        })
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        process_name = {
+            "name": "process_name", "ph": "M", "pid": 1, "tid": 1,
+            "args": {"name": f"workflow {self.run_id}"},
+        }
+        return {
+            "traceEvents": [process_name] + sorted(self.events, key=lambda event: event["ts"]),
+            "displayTimeUnit": "ms",
+            "metadata": {"run_id": self.run_id, "user_id": self.user_id, "started_at_us": self.started_at_us},
+        }
+
+
+@contextmanager
+def recording(trace: Optional[WorkflowTrace]) -> Iterator[None]:
+    """Make `trace` the active trace for everything awaited inside the block (no-op for None)"""
+    if trace is None:
+        yield
+        return
+    token = _active_trace.set(trace)
+    try:
+        yield
+    finally:
+        _active_trace.reset(token)
+
+
+@contextmanager
+def trace_span(name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+    """Span on the active trace; yields a plain dict when no run is being traced"""
+    trace = _active_trace.get()
+    if trace is None:
+        yield args
+        return
+    with trace.span(name, category, **args) as span_args:
+        yield span_args
+
+
+def trace_instant(name: str, category: str, **args: Any) -> None:
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.instant(name, category, **args)
+
+
+def _trace_path(run_id: str) -> str:
+    return os.path.join(WORKFLOW_TRACE_DIR, f"{os.path.basename(run_id)}.json")
+
+
+def save_trace(trace: WorkflowTrace) -> None:
+    """Keep the trace for the API and write it to WORKFLOW_TRACE_DIR (if set)"""
+    _recent_traces[trace.run_id] = trace
+    _recent_traces.move_to_end(trace.run_id)
+    while len(_recent_traces) > MAX_TRACES_IN_MEMORY:
+        _recent_traces.popitem(last=False)
+
+    if WORKFLOW_TRACE_DIR:
+        os.makedirs(WORKFLOW_TRACE_DIR, exist_ok=True)
+        with open(_trace_path(trace.run_id), "w", encoding="utf-8") as f:
+            json.dump(trace.to_chrome_trace(), f)
+
+
+def load_trace(run_id: str) -> Optional[Dict[str, Any]]:
+    """Chrome trace JSON for a run, from memory or WORKFLOW_TRACE_DIR"""
+    trace = _recent_traces.get(run_id)
+    if trace is not None:
+        return trace.to_chrome_trace()
+    if WORKFLOW_TRACE_DIR and os.path.exists(_trace_path(run_id)):
+        with open(_trace_path(run_id), encoding="utf-8") as f:
+            return json.load(f)
+    return None
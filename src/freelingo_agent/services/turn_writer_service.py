@@ -0,0 +1,153 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from freelingo_agent.config import TURN_FLUSH_BATCH_SIZE, TURN_FLUSH_INTERVAL_SECONDS, TURN_WRITE_QUEUE_SIZE
+from freelingo_agent.db.dialogue_session import upsert_dialogue_sessions_db
+from freelingo_agent.db.dialogue_turns import upsert_dialogue_turns_db
+from freelingo_agent.db.pool import run_db
+from freelingo_agent.services.metrics_service import record_turn_flush, set_turn_write_backlog
+
+# Attempts per batch before its rows are carried over to the next flush
+WRITE_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 0.5
+
+# Queue items: ("session", row), ("turn", row) or ("flush", future resolved once everything before it is written)
+WriteItem = Tuple[str, Any]
+
+
+class TurnWriter:
+    """
+    Background writer for live dialogue sessions.
+
+    Session rows and completed turns are queued as the dialogue runs and
+    written in batches every `batch_size` turns or `flush_interval` seconds,
+    whichever comes first. The queue is bounded, so when the database falls
+    behind, dialogue turns wait on enqueue instead of piling up in memory.
+    Writes are upserts, so retried batches are safe.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = TURN_FLUSH_BATCH_SIZE,
+        flush_interval: float = TURN_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = TURN_WRITE_QUEUE_SIZE,
+        write_sessions: Callable[[List[Dict[str, Any]]], Any] = upsert_dialogue_sessions_db,
+        write_turns: Callable[[List[Dict[str, Any]]], Any] = upsert_dialogue_turns_db,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.write_sessions = write_sessions
+        self.write_turns = write_turns
+        self._queue: Optional["asyncio.Queue[WriteItem]"] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Rows of a batch that kept failing; retried with the next one
+        self._carry_sessions: List[Dict[str, Any]] = []
+        self._carry_turns: List[Dict[str, Any]] = []
+
+    def _ensure_started(self) -> "asyncio.Queue[WriteItem]":
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            if self._loop is not loop:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._loop = loop
+            self._task = loop.create_task(self._run())
+        return self._queue
+
+    async def enqueue_session(self, row: Dict[str, Any]) -> None:
+        await self._ensure_started().put(("session", row))
+
+    async def enqueue_turn(self, row: Dict[str, Any]) -> None:
+        """Queue a turn row; waits while the backlog is full (backpressure)"""
+        queue = self._ensure_started()
+        await queue.put(("turn", row))
+        set_turn_write_backlog(queue.qsize())
+
+    async def flush(self, timeout: float = 10.0) -> bool:
+        """Write everything queued so far; False if that failed or did not finish within timeout"""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return not (self._carry_sessions or self._carry_turns)
+        done = self._loop.create_future()
+        await self._ensure_started().put(("flush", done))
+        try:
+            return await asyncio.wait_for(asyncio.shield(done), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, timeout: float = 10.0) -> bool:
+        """Final flush on shutdown, then stop the background task"""
+        flushed = await self.flush(timeout)
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if not flushed:
+            print(f"⚠️  Turn writer stopped with unwritten rows ({len(self._carry_turns)} turns)")
+        return flushed
+
+    async def _next_batch(self) -> List[WriteItem]:
+        """Wait for one item, then collect more until batch_size turns, a flush request or flush_interval"""
+        batch = [await self._queue.get()]
+        turns = 1 if batch[0][0] == "turn" else 0
+        deadline = self._loop.time() + self.flush_interval
+        while batch[-1][0] != "flush" and turns < self.batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            turns += item[0] == "turn"
+        return batch
+
+    async def _drain_carry_over(self) -> None:
+        """
+        While a full queue's worth of rows is carried over, retry them alone
+        instead of taking more from the queue. The carry-over stays bounded and
+        a long outage fills the queue, so dialogue turns wait on enqueue.
+        """
+        while len(self._carry_sessions) + len(self._carry_turns) >= self.max_pending:
+            await asyncio.sleep(self.flush_interval)
+            if await self._write(self._carry_sessions, self._carry_turns):
+                self._carry_sessions, self._carry_turns = [], []
+
+    async def _run(self) -> None:
+        while True:
+            await self._drain_carry_over()
+            batch = await self._next_batch()
+            set_turn_write_backlog(self._queue.qsize())
+            sessions = self._carry_sessions + [row for kind, row in batch if kind == "session"]
+            turns = self._carry_turns + [row for kind, row in batch if kind == "turn"]
+            written = await self._write(sessions, turns)
+            self._carry_sessions, self._carry_turns = ([], []) if written else (sessions, turns)
+            for kind, done in batch:
+                if kind == "flush" and not done.done():
+                    done.set_result(written)
+
+    async def _write(self, sessions: List[Dict[str, Any]], turns: List[Dict[str, Any]]) -> bool:
+        if not sessions and not turns:
+            return True
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                # Sessions first: turns reference them
+                if sessions:
+                    await run_db(self.write_sessions, sessions)
+                if turns:
+                    await run_db(self.write_turns, turns)
+                record_turn_flush("ok", len(turns))
+                return True
+            except Exception as e:
+                print(f"⚠️  Turn flush failed (attempt {attempt}/{WRITE_ATTEMPTS}): {e}")
+                if attempt < WRITE_ATTEMPTS:
+                    await asyncio.sleep(RETRY_DELAY_SECONDS * attempt)
+        record_turn_flush("failed", len(turns))
+        return False
+
+
+turn_writer = TurnWriter()
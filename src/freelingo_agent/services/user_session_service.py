@@ -1,39 +1,572 @@
-from typing import List, Dict
-from dataclasses import dataclass, field
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Protocol, Tuple
 from datetime import datetime, timezone
+from freelingo_agent.config import SESSION_IDLE_TTL_SECONDS, SESSION_STORE_MAX_SESSIONS, SESSION_STORE_MAX_BYTES, SESSION_STORE_REDIS_URL, SESSION_SNAPSHOT_DIR
+from freelingo_agent.db.pool import run_db
 from freelingo_agent.models.user_session import UserSession
 from freelingo_agent.models.words_model import Word
+from freelingo_agent.models.transcript_model import Transcript, TranscriptTurn, AiTurn, UserTurn
+from freelingo_agent.services.metrics_service import record_session_eviction, set_session_store_size
+from freelingo_agent.services.session_codec import encode_session, decode_session
 from pydantic_ai.messages import ModelMessage
 
-# In-memory store (replace with Redis or Supabase later)
-SESSION_STORE: Dict[str, "UserSession"] = {}
+# Rough per-object costs for the size estimate (model instances, dicts and list slots)
+SESSION_BASE_BYTES = 2048
+MESSAGE_PART_BYTES = 300
+TURN_BYTES = 800
+# Known words are the word cache's own objects; a session only holds references to them
+WORD_REFERENCE_BYTES = 8
+
+
+def estimate_session_bytes(session: UserSession) -> int:
+    """Approximate memory held by a session: its texts plus a fixed cost per message, turn and word"""
+    size = SESSION_BASE_BYTES + WORD_REFERENCE_BYTES * len(session.known_words)
+    for message in session.dialogue_history:
+        for part in getattr(message, "parts", None) or [message]:
+            content = getattr(part, "content", None) or getattr(part, "args", None) or part
+            size += MESSAGE_PART_BYTES + (len(content) if isinstance(content, str) else len(str(content)))
+    for turn in session.transcript:
+        size += TURN_BYTES + len(turn.user_turn.text) + len(turn.ai_turn.ai_reply.text) + len(turn.ai_turn.rationale.reasoning_summary)
+    if session.last_agent_response:
+        size += len(str(session.last_agent_response))
+    return size
+
+
+# Not stored outside the process: the agent is rebuilt per process, known words come from the word cache
+SHARED_SESSION_EXCLUDE = {"dialogue_agent", "known_words"}
+
+
+def dump_session(session: UserSession) -> bytes:
+    """Session state for the shared store and snapshots (message history, transcript and live session fields)"""
+    return encode_session(session, exclude=SHARED_SESSION_EXCLUDE)
+
+
+def load_session(payload: bytes) -> UserSession:
+    return decode_session(payload)
+
+
+class SessionConflictError(Exception):
+    """The user's session was saved by another request after this one loaded it"""
+
+
+class SessionStoreBackend(Protocol):
+    """Shared session state, versioned per user, so any API worker can serve any turn"""
+
+    def version(self, user_id: str) -> int: ...
+
+    def load(self, user_id: str) -> Optional[Tuple[int, bytes]]: ...
+
+    def save(self, user_id: str, payload: bytes, expected_version: int) -> int: ...
+
+    def delete(self, user_id: str) -> None: ...
+
+    def idle_users(self, max_idle_seconds: float) -> List[str]: ...
+
+    def take(self, user_id: str, max_idle_seconds: float) -> Optional[bytes]: ...
+
+
+class RedisSessionBackend:
+    """
+    Sessions as hashes {version, data} under freelingo:session:<user_id>
+    (needs the optional `redis` extra). save() is a compare-and-set on the
+    version with WATCH/MULTI.
+
+    Saves are also scored by time in freelingo:sessions:saved, so sessions
+    idle past the TTL can be taken (read and deleted by one worker) and their
+    live dialogue saved as ended. Keys only expire at twice the TTL, as a
+    fallback for when no worker sweeps.
+    """
+
+    SAVED_KEY = "freelingo:sessions:saved"
+
+    def __init__(self, url: str = "", ttl_seconds: float = SESSION_IDLE_TTL_SECONDS, client: Any = None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("SESSION_STORE_REDIS_URL needs redis: pip install 'freelingo-agent[redis]'")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, user_id: str) -> str:
+        return f"freelingo:session:{user_id}"
+
+    def version(self, user_id: str) -> int:
+        return int(self.client.hget(self._key(user_id), "version") or 0)
+
+    def load(self, user_id: str) -> Optional[Tuple[int, bytes]]:
+        version, data = self.client.hmget(self._key(user_id), "version", "data")
+        return (int(version), data) if data is not None else None
+
+    def save(self, user_id: str, payload: bytes, expected_version: int) -> int:
+        from redis.exceptions import WatchError
+        key = self._key(user_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if int(pipe.hget(key, "version") or 0) != expected_version:
+                    raise SessionConflictError(user_id)
+                pipe.multi()
+                pipe.hset(key, mapping={"version": expected_version + 1, "data": payload})
+                pipe.expire(key, max(1, int(2 * self.ttl_seconds)))
+                pipe.zadd(self.SAVED_KEY, {user_id: time.time()})
+                pipe.execute()
+            except WatchError:
+                raise SessionConflictError(user_id)
+        return expected_version + 1
+
+    def delete(self, user_id: str) -> None:
+        with self.client.pipeline() as pipe:
+            pipe.delete(self._key(user_id))
+            pipe.zrem(self.SAVED_KEY, user_id)
+            pipe.execute()
+
+    def idle_users(self, max_idle_seconds: float) -> List[str]:
+        """Users whose session was last saved more than max_idle_seconds ago"""
+        users = self.client.zrangebyscore(self.SAVED_KEY, "-inf", time.time() - max_idle_seconds)
+        return [user.decode() if isinstance(user, bytes) else user for user in users]
+
+    def take(self, user_id: str, max_idle_seconds: float) -> Optional[bytes]:
+        """
+        Delete the user's session and return it if it is still idle past
+        max_idle_seconds; None if it was saved meanwhile or is already gone
+        (taken by another worker, or expired).
+        """
+        from redis.exceptions import WatchError
+        key = self._key(user_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key, self.SAVED_KEY)
+                saved_at = pipe.zscore(self.SAVED_KEY, user_id)
+                if saved_at is not None and saved_at > time.time() - max_idle_seconds:
+                    return None
+                data = pipe.hget(key, "data")
+                pipe.multi()
+                pipe.delete(key)
+                pipe.zrem(self.SAVED_KEY, user_id)
+                pipe.execute()
+            except WatchError:
+                return None
+        return data
+
+
+class SessionSnapshots:
+    """
+    Sessions saved to local files (one per user) so in-progress dialogue
+    survives a restart of the API process. A session is read back from its
+    file on the user's next request; the file goes when the session is
+    evicted or removed.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # updated_at of each session as last written, so unchanged sessions are skipped
+        self._written: Dict[str, datetime] = {}
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode()).hexdigest()[:32] + ".session")
+
+    def write(self, sessions: List[UserSession]) -> int:
+        """Write the sessions changed since their last snapshot; returns how many were written"""
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        for session in sessions:
+            # Read before encoding: a turn landing meanwhile leaves the session marked as changed
+            updated_at = session.updated_at
+            if self._written.get(session.user_id) == updated_at:
+                continue
+            path = self._path(session.user_id)
+            with open(path + ".tmp", "wb") as f:
+                f.write(dump_session(session))
+            os.replace(path + ".tmp", path)
+            self._written[session.user_id] = updated_at
+            written += 1
+        return written
+
+    def _read_file(self, path: str) -> Optional[UserSession]:
+        try:
+            with open(path, "rb") as f:
+                return load_session(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Dropping unreadable session snapshot {path}: {e}")
+            os.remove(path)
+            return None
+
+    def read(self, user_id: str) -> Optional[UserSession]:
+        session = self._read_file(self._path(user_id))
+        if session is not None:
+            self._written[user_id] = session.updated_at
+        return session
+
+    def discard(self, user_id: str) -> None:
+        self._written.pop(user_id, None)
+        try:
+            os.remove(self._path(user_id))
+        except FileNotFoundError:
+            pass
+
+    def older_than(self, max_age_seconds: float, skip: Callable[[str], bool]) -> List[UserSession]:
+        """Read and delete the snapshots not written for max_age_seconds, except those of users skip() accepts"""
+        if not os.path.isdir(self.directory):
+            return []
+        now = time.time()
+        stale = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".session") or now - entry.stat().st_mtime <= max_age_seconds:
+                continue
+            session = self._read_file(entry.path)
+            if session is None or skip(session.user_id):
+                continue
+            stale.append(session)
+            self.discard(session.user_id)
+        return stale
+
+
+class _Slot:
+    __slots__ = ("session", "size", "last_used", "version")
+
+    def __init__(self, session: UserSession, version: int = 0):
+        self.session = session
+        self.size = estimate_session_bytes(session)
+        self.last_used = time.monotonic()
+        # Shared-store version the session was loaded at (0: never saved)
+        self.version = version
+
+
+class SessionStore:
+    """
+    In-memory UserSessions, bounded by idle time, count and approximate size.
+
+    Sessions idle for ttl_seconds are dropped first, then the least recently
+    used until both limits hold. The session being used is never evicted.
+    Eviction hooks get each dropped session (outside the lock) so unsaved
+    dialogue can be persisted; a hook that fails does not stop the others.
+
+    With a shared backend the local sessions are only a cache of it: requests
+    load the user's session with refresh() and save it with commit(), which
+    fails with SessionConflictError if another request saved it in between.
+    Evicting a cached copy loses nothing, so hooks do not run for it. Sessions
+    idle in the backend are taken from it by sweep() (or by the refresh() of
+    a returning user) and the hooks run for those.
+
+    Without one, snapshots (if given) keep sessions across restarts:
+    snapshot() writes the changed ones, and a session missing from memory is
+    restored from its snapshot on first use, with the idle time it had.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_STORE_MAX_SESSIONS,
+        max_bytes: int = SESSION_STORE_MAX_BYTES,
+        ttl_seconds: float = SESSION_IDLE_TTL_SECONDS,
+        backend: Optional[SessionStoreBackend] = None,
+        snapshots: Optional[SessionSnapshots] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.snapshots = snapshots if backend is None else None
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._eviction_hooks: List[Callable[[UserSession], Any]] = []
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.evictions: Dict[str, int] = {"idle": 0, "sessions": 0, "bytes": 0}
+
+    def add_eviction_hook(self, hook: Callable[[UserSession], Any]) -> None:
+        if hook not in self._eviction_hooks:
+            self._eviction_hooks.append(hook)
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        return now - slot.last_used > self.ttl_seconds
+
+    def _pop(self, user_id: str) -> Optional[_Slot]:
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._bytes -= slot.size
+        return slot
+
+    def _evict(self, keep: Optional[str] = None) -> List[UserSession]:
+        """Drop idle sessions, then LRU ones over the limits; returns the dropped sessions"""
+        now = time.monotonic()
+        evicted = []
+        # Least recently used first, so idle sessions are at the front
+        while self._slots:
+            user_id, slot = next(iter(self._slots.items()))
+            if user_id == keep:
+                break
+            if self._expired(slot, now):
+                reason = "idle"
+            elif len(self._slots) > self.max_sessions:
+                reason = "sessions"
+            elif self._bytes > self.max_bytes:
+                reason = "bytes"
+            else:
+                break
+            evicted.append(self._pop(user_id).session)
+            self.evictions[reason] += 1
+            record_session_eviction(reason)
+        set_session_store_size(len(self._slots), self._bytes)
+        return evicted
+
+    def _run_hooks(self, evicted: List[UserSession]) -> None:
+        if self.backend is not None:
+            # Cached copies: the sessions are still in the backend
+            return
+        if self.snapshots is not None:
+            for session in evicted:
+                self.snapshots.discard(session.user_id)
+        self._call_hooks(evicted)
+
+    def _call_hooks(self, evicted: List[UserSession]) -> None:
+        for session in evicted:
+            for hook in self._eviction_hooks:
+                try:
+                    hook(session)
+                except Exception as e:
+                    print(f"⚠️  Session eviction hook failed for {session.user_id}: {e}")
+
+    def get(self, user_id: str) -> UserSession:
+        """The user's session, created if missing or expired; marks it most recently used"""
+        with self._lock:
+            now = time.monotonic()
+            slot = self._slots.get(user_id)
+            expired = []
+            if slot is not None and self._expired(slot, now):
+                expired.append(self._pop(user_id).session)
+                self.evictions["idle"] += 1
+                record_session_eviction("idle")
+                slot = None
+            if slot is None:
+                self.misses += 1
+                slot = self._restore(user_id, expired) or _Slot(UserSession(user_id=user_id))
+                self._slots[user_id] = slot
+                self._bytes += slot.size
+            else:
+                self.hits += 1
+                slot.last_used = now
+                self._slots.move_to_end(user_id)
+            evicted = expired + self._evict(keep=user_id)
+        self._run_hooks(evicted)
+        return slot.session
+
+    def _restore(self, user_id: str, expired: List[UserSession]) -> Optional[_Slot]:
+        """Slot for the user's snapshot, if any; one idle past the TTL is added to expired instead"""
+        if self.snapshots is None:
+            return None
+        session = self.snapshots.read(user_id)
+        if session is None:
+            return None
+        idle = (datetime.now(timezone.utc) - session.updated_at).total_seconds()
+        if idle > self.ttl_seconds:
+            expired.append(session)
+            self.evictions["idle"] += 1
+            record_session_eviction("idle")
+            return None
+        slot = _Slot(session)
+        slot.last_used -= max(0.0, idle)
+        self.restored += 1
+        return slot
+
+    def resize(self, user_id: str) -> None:
+        """Re-estimate a session's size after it changed, evicting others if the store is now over its limit"""
+        with self._lock:
+            slot = self._slots.get(user_id)
+            if slot is None:
+                return
+            size = estimate_session_bytes(slot.session)
+            self._bytes += size - slot.size
+            slot.size = size
+            # A change is a use: the session moves to the back of the LRU order
+            slot.last_used = time.monotonic()
+            self._slots.move_to_end(user_id)
+            evicted = self._evict(keep=user_id)
+        self._run_hooks(evicted)
+
+    def refresh(self, user_id: str) -> Tuple[UserSession, int]:
+        """
+        The user's session as last saved to the backend, and its version. The
+        cached copy is kept (with its agent) when the backend has no newer one.
+        """
+        with self._lock:
+            slot = self._slots.get(user_id)
+            cached = (slot.session, slot.version) if slot is not None and not self._expired(slot, time.monotonic()) else None
+        if cached is not None and self.backend.version(user_id) == cached[1]:
+            with self._lock:
+                if self._slots.get(user_id) is slot:
+                    self.hits += 1
+                    slot.last_used = time.monotonic()
+                    self._slots.move_to_end(user_id)
+            return cached
+        loaded = self.backend.load(user_id)
+        expired = []
+        if loaded is None:
+            session, version = UserSession(user_id=user_id), 0
+        else:
+            session, version = load_session(loaded[1]), loaded[0]
+            if (datetime.now(timezone.utc) - session.updated_at).total_seconds() > self.ttl_seconds:
+                # Abandoned before the sweeper got to it: close it and start afresh
+                expired = self._take_idle([user_id])
+                if expired:
+                    session, version = UserSession(user_id=user_id), 0
+        with self._lock:
+            self._pop(user_id)
+            self._slots[user_id] = _Slot(session, version)
+            self._bytes += self._slots[user_id].size
+            self.misses += 1
+            evicted = self._evict(keep=user_id)
+        self._run_hooks(evicted)
+        self._call_hooks(expired)
+        return session, version
+
+    def _take_idle(self, user_ids: List[str]) -> List[UserSession]:
+        """Sessions of these users taken from the backend, for those still idle past the TTL"""
+        taken = []
+        for user_id in user_ids:
+            payload = self.backend.take(user_id, self.ttl_seconds)
+            if payload is None:
+                continue
+            taken.append(load_session(payload))
+            with self._lock:
+                self.evictions["idle"] += 1
+            record_session_eviction("idle")
+        return taken
+
+    def commit(self, session: UserSession, version: int) -> int:
+        """Save a session loaded at version; SessionConflictError if the backend has moved on"""
+        new_version = self.backend.save(session.user_id, dump_session(session), version)
+        with self._lock:
+            slot = self._slots.get(session.user_id)
+            if slot is not None and slot.session is session:
+                slot.version = new_version
+        return new_version
+
+    def sweep(self) -> int:
+        """Drop idle sessions now (otherwise they go on the next get); returns how many were dropped"""
+        with self._lock:
+            evicted = self._evict()
+        if self.backend is not None:
+            # Cached copies go without hooks; sessions idle in the backend get them
+            taken = self._take_idle(self.backend.idle_users(self.ttl_seconds))
+            with self._lock:
+                for session in taken:
+                    self._pop(session.user_id)
+                set_session_store_size(len(self._slots), self._bytes)
+            self._call_hooks(taken)
+            return len(evicted) + len(taken)
+        if self.snapshots is not None:
+            # Snapshots of users who have not come back since the restart
+            stale = self.snapshots.older_than(self.ttl_seconds, skip=self.__contains__)
+            with self._lock:
+                self.evictions["idle"] += len(stale)
+            for _ in stale:
+                record_session_eviction("idle")
+            evicted += stale
+        self._run_hooks(evicted)
+        return len(evicted)
+
+    def snapshot(self) -> int:
+        """Write the sessions changed since the last snapshot; returns how many were written"""
+        if self.snapshots is None:
+            return 0
+        with self._lock:
+            sessions = [slot.session for slot in self._slots.values()]
+        return self.snapshots.write(sessions)
+
+    def remove(self, user_id: str) -> Optional[UserSession]:
+        """Forget a session without running the eviction hooks"""
+        with self._lock:
+            slot = self._pop(user_id)
+            set_session_store_size(len(self._slots), self._bytes)
+        if self.snapshots is not None:
+            self.snapshots.discard(user_id)
+        return slot.session if slot is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._bytes = 0
+            set_session_store_size(0, 0)
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._slots),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "restored": self.restored,
+                "evictions": dict(self.evictions),
+            }
+
+
+session_store = SessionStore(
+    backend=RedisSessionBackend(SESSION_STORE_REDIS_URL) if SESSION_STORE_REDIS_URL else None,
+    snapshots=SessionSnapshots(SESSION_SNAPSHOT_DIR) if SESSION_SNAPSHOT_DIR else None,
+)
 
 
 def get_session(user_id: str) -> UserSession:
-    session = SESSION_STORE.get(user_id)
-    if not session:
-        session = UserSession(user_id=user_id)
-        SESSION_STORE[user_id] = session
-    return session
+    return session_store.get(user_id)
+
+
+@asynccontextmanager
+async def user_session(user_id: str) -> AsyncIterator[UserSession]:
+    """
+    Hold the user's session for one request. With a shared store it is loaded
+    on entry and saved on a clean exit; SessionConflictError means a concurrent
+    request for the same user saved first, and this request's changes are dropped.
+    """
+    if session_store.backend is None:
+        yield get_session(user_id)
+        return
+    session, version = await run_db(session_store.refresh, user_id)
+    yield session
+    await run_db(session_store.commit, session, version)
+
+
+def _touch(session: UserSession) -> None:
+    session.updated_at = datetime.now(timezone.utc)
+    session_store.resize(session.user_id)
 
 
 def update_known_words_in_session(user_id: str, words: List[Word]) -> None:
     session = get_session(user_id)
     session.known_words = words
-    session.updated_at = datetime.now(timezone.utc)
+    _touch(session)
 
 
 def update_dialogue_turn_in_session(user_id: str, dialogue_history: List[ModelMessage]) -> None:
     session = get_session(user_id)
     session.dialogue_history = dialogue_history
-    session.updated_at = datetime.now(timezone.utc)
+    _touch(session)
 
 
 def store_agent_response_in_session(user_id: str, agent_response: Dict) -> None:
     """Store the full agent response for the most recent AI message"""
     session = get_session(user_id)
     session.last_agent_response = agent_response
-    session.updated_at = datetime.now(timezone.utc)
+    _touch(session)
 
 
 def get_agent_response_from_session(user_id: str) -> Dict:
@@ -46,7 +579,43 @@ def get_dialogue_history_from_session(user_id: str) -> List[ModelMessage]:
     return get_session(user_id).dialogue_history
 
 
+def record_turn_in_transcript(user_id: str, student_response: str, ai_turn: AiTurn) -> Optional[TranscriptTurn]:
+    """
+    Pair the user's reply with the AI turn it answers, then hold the new AI turn until the next reply.
+    Returns the completed turn, if this reply completed one.
+    """
+    session = get_session(user_id)
+    completed = None
+    # The empty message that starts a conversation is a UI trigger, not a reply
+    if session.pending_ai_turn is not None and student_response and student_response.strip():
+        completed = TranscriptTurn(ai_turn=session.pending_ai_turn, user_turn=UserTurn(text=student_response))
+        session.transcript.append(completed)
+    session.pending_ai_turn = ai_turn
+    _touch(session)
+    return completed
+
+
+def get_transcript_from_session(user_id: str) -> Transcript:
+    return Transcript(transcript=list(get_session(user_id).transcript))
+
+
 def clear_dialogue_in_session(user_id: str) -> None:
     session = get_session(user_id)
     session.dialogue_history = []
-    session.updated_at = datetime.now(timezone.utc)
+    session.transcript = []
+    session.pending_ai_turn = None
+    # The next turn opens a new live session
+    session.session_id = None
+    session.started_at = None
+    _touch(session)
+
+
+def mark_session_ended(user_id: str, session_id: str) -> None:
+    """Remember the session saved by the last session end so a retry can return its results"""
+    session = get_session(user_id)
+    session.last_ended_session_id = session_id
+    _touch(session)
+
+
+def get_last_ended_session_id(user_id: str) -> Optional[str]:
+    return get_session(user_id).last_ended_session_id
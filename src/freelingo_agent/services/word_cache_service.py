@@ -0,0 +1,302 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Protocol
+
+from freelingo_agent.config import WORD_CACHE_MAX_USERS, WORD_CACHE_MAX_WORDS, WORD_CACHE_TTL_SECONDS, WORD_CACHE_REDIS_URL
+from freelingo_agent.db.words import get_user_words, get_word, create_word, create_words_bulk, update_word, delete_word
+from freelingo_agent.models.words_model import Word
+from freelingo_agent.services.metrics_service import record_word_cache_lookup, record_word_cache_eviction, set_word_cache_size
+
+
+class WordCacheBackend(Protocol):
+    """Shared second-level store (e.g. Redis) so several API processes reuse each other's loads"""
+
+    def get(self, user_id: str) -> Optional[List[Dict[str, Any]]]: ...
+
+    def set(self, user_id: str, rows: List[Dict[str, Any]]) -> None: ...
+
+    def delete(self, user_id: str) -> None: ...
+
+
+class RedisWordCacheBackend:
+    """Word lists as JSON under freelingo:words:<user_id> (needs the optional `redis` extra)"""
+
+    def __init__(self, url: str, ttl_seconds: float = WORD_CACHE_TTL_SECONDS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("WORD_CACHE_REDIS_URL needs redis: pip install 'freelingo-agent[redis]'")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, user_id: str) -> str:
+        return f"freelingo:words:{user_id}"
+
+    def get(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        payload = self.client.get(self._key(user_id))
+        return json.loads(payload) if payload else None
+
+    def set(self, user_id: str, rows: List[Dict[str, Any]]) -> None:
+        self.client.set(self._key(user_id), json.dumps(rows), ex=max(1, int(self.ttl_seconds)))
+
+    def delete(self, user_id: str) -> None:
+        self.client.delete(self._key(user_id))
+
+
+class _Entry:
+    __slots__ = ("words", "loaded_at", "vocabulary_version")
+
+    def __init__(self, words: List[Word], vocabulary_version: Optional[int] = None):
+        # Keyed by id, in the DB listing order (newest first)
+        self.words: "OrderedDict[str, Word]" = OrderedDict((word.id, word) for word in words)
+        self.loaded_at = time.monotonic()
+        # DB vocabulary version the list is known to include (None: unknown, e.g. after a local write)
+        self.vocabulary_version = vocabulary_version
+
+
+class WordCache:
+    """
+    Per-user cache of word lists, kept current by the write paths.
+
+    Bounded by users and by total words; the least recently used users are
+    evicted first. Writes are stamped with a version from a cache-wide
+    counter, and a list loaded from the DB is only stored if the user had no
+    write after the load began, so a slow read never overwrites a newer
+    write. Entries also expire after ttl_seconds to pick up changes made
+    outside this process.
+    """
+
+    def __init__(
+        self,
+        max_users: int = WORD_CACHE_MAX_USERS,
+        max_words: int = WORD_CACHE_MAX_WORDS,
+        ttl_seconds: float = WORD_CACHE_TTL_SECONDS,
+        backend: Optional[WordCacheBackend] = None,
+    ):
+        self.max_users = max_users
+        self.max_words = max_words
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._clock = 0
+        # Version of each user's latest write; the oldest are forgotten past max_users
+        self._last_write: "OrderedDict[str, int]" = OrderedDict()
+        self._forgotten_write = 0
+        self._word_count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _live_entry(self, user_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            self._drop(user_id)
+            return None
+        return entry
+
+    def _drop(self, user_id: str) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._word_count -= len(entry.words)
+
+    def _evict(self) -> None:
+        # The entry just stored is most recent, so it is evicted last (only if it alone exceeds max_words)
+        while self._entries and (len(self._entries) > self.max_users or self._word_count > self.max_words):
+            user_id = next(iter(self._entries))
+            self._drop(user_id)
+            self.evictions += 1
+            record_word_cache_eviction()
+        set_word_cache_size(len(self._entries), self._word_count)
+
+    def _lookup(self, user_id: str) -> Optional[List[Word]]:
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                return list(entry.words.values())
+        return None
+
+    def get(self, user_id: str) -> Optional[List[Word]]:
+        """The user's words, or None on a miss"""
+        words = self._lookup(user_id)
+        if words is None and self.backend is not None:
+            version = self.version(user_id)
+            try:
+                rows = self.backend.get(user_id)
+            except Exception as e:
+                print(f"⚠️  Word cache backend read failed for {user_id}: {e}")
+                rows = None
+            if rows is not None:
+                words = [Word.model_validate(row) for row in rows]
+                self._store_local(user_id, words, version)
+        with self._lock:
+            if words is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_word_cache_lookup(words is not None)
+        return words
+
+    def version(self, user_id: str) -> int:
+        """Take before loading from the DB and pass to store()"""
+        with self._lock:
+            return self._clock
+
+    def _store_local(self, user_id: str, words: List[Word], version: int, vocabulary_version: Optional[int] = None) -> bool:
+        with self._lock:
+            # Unknown users are judged by the newest forgotten write, which can only refuse too often
+            if self._last_write.get(user_id, self._forgotten_write) > version:
+                # Written to while loading: the loaded list may be missing that write
+                return False
+            self._drop(user_id)
+            self._entries[user_id] = _Entry(words, vocabulary_version)
+            self._word_count += len(words)
+            self._evict()
+            return True
+
+    def store(self, user_id: str, words: List[Word], version: int, vocabulary_version: Optional[int] = None) -> bool:
+        """Cache a list loaded from the DB; False if a write happened since version() was taken"""
+        stored = self._store_local(user_id, words, version, vocabulary_version)
+        if stored:
+            self._write_backend(user_id, words)
+        return stored
+
+    def _write_backend(self, user_id: str, words: Optional[List[Word]]) -> None:
+        if self.backend is None:
+            return
+        try:
+            if words is None:
+                self.backend.delete(user_id)
+            else:
+                self.backend.set(user_id, [word.model_dump(mode="json") for word in words])
+        except Exception as e:
+            print(f"⚠️  Word cache backend write failed for {user_id}: {e}")
+
+    def _apply_write(self, user_id: str, change) -> None:
+        with self._lock:
+            self._clock += 1
+            self._last_write.pop(user_id, None)
+            self._last_write[user_id] = self._clock
+            while len(self._last_write) > self.max_users:
+                _, self._forgotten_write = self._last_write.popitem(last=False)
+            entry = self._live_entry(user_id)
+            if entry is not None:
+                self._word_count -= len(entry.words)
+                change(entry.words)
+                entry.vocabulary_version = None
+                self._word_count += len(entry.words)
+                self._evict()
+            words = list(entry.words.values()) if entry is not None else None
+        # Not cached here: drop the shared copy rather than leave it stale
+        self._write_backend(user_id, words)
+
+    def put_word(self, word: Word) -> None:
+        """Write-through for a created or updated word"""
+        def change(words: "OrderedDict[str, Word]") -> None:
+            created = word.id not in words
+            words[word.id] = word
+            if created:
+                words.move_to_end(word.id, last=False)
+        self._apply_write(word.user_id, change)
+
+    def remove_word(self, user_id: str, word_id: str) -> None:
+        """Write-through for a deleted word"""
+        self._apply_write(user_id, lambda words: words.pop(word_id, None))
+
+    def check_vocabulary_version(self, user_id: str, vocabulary_version: int) -> None:
+        """
+        Drop the user's list unless it was loaded at this DB vocabulary version.
+        A list of unknown version (after a local write, or from the shared
+        backend) may be missing writes made elsewhere, so it is reloaded too.
+        """
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is not None and entry.vocabulary_version != vocabulary_version:
+                self._drop(user_id)
+                set_word_cache_size(len(self._entries), self._word_count)
+
+    def find_word(self, user_id: str, word_id: str) -> Optional[Word]:
+        """A word of the user's from a cached list, None if not cached or not in it"""
+        with self._lock:
+            entry = self._live_entry(user_id)
+            return entry.words.get(word_id) if entry is not None else None
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._drop(user_id)
+            set_word_cache_size(len(self._entries), self._word_count)
+        self._write_backend(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._word_count = 0
+            set_word_cache_size(0, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "words": self._word_count,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+word_cache = WordCache(backend=RedisWordCacheBackend(WORD_CACHE_REDIS_URL) if WORD_CACHE_REDIS_URL else None)
+
+
+def get_user_words_cached(user_id: str, vocabulary_version: Optional[int] = None) -> List[Word]:
+    """
+    get_user_words served from the word cache. Pass the DB vocabulary_version
+    (read before calling) when the result must be at least that current.
+    """
+    if vocabulary_version is not None:
+        word_cache.check_vocabulary_version(user_id, vocabulary_version)
+    words = word_cache.get(user_id)
+    if words is not None:
+        return words
+    version = word_cache.version(user_id)
+    words = get_user_words(user_id)
+    word_cache.store(user_id, words, version, vocabulary_version)
+    return words
+
+
+def find_user_word(user_id: str, word_id: str) -> Optional[Word]:
+    """A word by id for ownership checks: from the user's cached list, else a single-row lookup"""
+    word = word_cache.find_word(user_id, word_id)
+    return word if word is not None else get_word(word_id)
+
+
+def create_user_word(user_id: str, word: Word) -> Word:
+    new_word = create_word(user_id, word)
+    word_cache.put_word(new_word)
+    return new_word
+
+
+def create_user_words(user_id: str, words: List[Word]) -> List[Word]:
+    """Bulk insert; returns only the words that were new"""
+    created = create_words_bulk(user_id, words)
+    for word in created:
+        word_cache.put_word(word)
+    return created
+
+
+def update_user_word(word_id: str, updates: Word) -> Optional[Word]:
+    updated_word = update_word(word_id, updates)
+    if updated_word is not None:
+        word_cache.put_word(updated_word)
+    return updated_word
+
+
+def delete_user_word(user_id: str, word_id: str) -> bool:
+    deleted = delete_word(word_id)
+    if deleted:
+        word_cache.remove_word(user_id, word_id)
+    return deleted
@@ -0,0 +1,202 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from freelingo_agent.config import REVIEW_QUEUE_SIZE, REVIEW_WORDS_FOR_AGENTS
+from freelingo_agent.db.word_stats import get_word_stats_db, upsert_word_stats_db, get_review_queue_db, save_review_queue_db
+from freelingo_agent.db.words import word_key, get_words_by_ids
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.words_model import Word, WordStats, ReviewItem, ReviewQueue
+from freelingo_agent.services.word_cache_service import get_user_words_cached
+
+# SM-2 lower bound of the ease factor
+MIN_EASE = 1.3
+
+# Words the learner has not used yet rank after overdue words
+UNPRACTISED_PRIORITY = 0.5
+
+# Longest phrase (in tokens) matched against a transcript
+MAX_PHRASE_TOKENS = 6
+
+
+def normalize_text(text: str) -> str:
+    """word_key form of a text with punctuation (except apostrophes and hyphens) turned into spaces"""
+    key = word_key(text.replace("’", "'"))
+    return " ".join("".join(c if c.isalnum() or c in "'-" else " " for c in key).split())
+
+
+def text_phrases(text: str, max_tokens: int) -> Set[str]:
+    """Every run of up to max_tokens consecutive tokens of the text, normalized"""
+    tokens = normalize_text(text).split()
+    return {" ".join(tokens[i:i + n]) for n in range(1, max_tokens + 1) for i in range(len(tokens) - n + 1)}
+
+
+def count_word_occurrences(words: List[Word], transcript: Transcript, mistakes: Iterable[str] = ()) -> Dict[str, Tuple[int, int, int]]:
+    """
+    (learner turns, AI turns, mistakes) containing each word, for the words
+    that occur at all. Texts are split into phrases once, so the cost is
+    linear in vocabulary plus transcript size.
+    """
+    keys: Dict[str, List[str]] = {}
+    for word in words:
+        key = normalize_text(word.word)
+        if key and word.id:
+            keys.setdefault(key, []).append(word.id)
+    if not keys:
+        return {}
+    max_tokens = min(MAX_PHRASE_TOKENS, max(len(key.split()) for key in keys))
+
+    counts: Dict[str, List[int]] = {}
+
+    def count(texts: Iterable[str], column: int) -> None:
+        for text in texts:
+            for phrase in text_phrases(text, max_tokens) & keys.keys():
+                for word_id in keys[phrase]:
+                    counts.setdefault(word_id, [0, 0, 0])[column] += 1
+
+    count((turn.user_turn.text for turn in transcript.transcript), 0)
+    count((turn.ai_turn.ai_reply.text for turn in transcript.transcript), 1)
+    count(mistakes, 2)
+    return {word_id: (used, offered, errors) for word_id, (used, offered, errors) in counts.items()}
+
+
+def session_quality(used: int, errors: int) -> Optional[int]:
+    """SM-2 grade (0-5) of a word in one session; None when the learner did not use it"""
+    if errors:
+        return 2
+    if used >= 2:
+        return 5
+    if used:
+        return 4
+    return None
+
+
+def apply_review(stats: WordStats, quality: int, now: datetime) -> None:
+    """SM-2 step: reset on a failed grade, otherwise 1 day, 6 days, then interval * ease"""
+    if quality < 3:
+        stats.repetitions = 0
+        stats.interval_days = 1.0
+    else:
+        if stats.repetitions == 0:
+            stats.interval_days = 1.0
+        elif stats.repetitions == 1:
+            stats.interval_days = 6.0
+        else:
+            stats.interval_days = round(stats.interval_days * stats.ease, 1)
+        stats.repetitions += 1
+    stats.ease = max(MIN_EASE, round(stats.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02), 3))
+    stats.due_at = now + timedelta(days=stats.interval_days)
+
+
+def review_priority(stats: Optional[WordStats], now: datetime) -> Optional[float]:
+    """How urgently a word needs practice, higher first; None when it is not due"""
+    if stats is None or stats.due_at is None:
+        return UNPRACTISED_PRIORITY
+    if stats.due_at > now:
+        return None
+    overdue_days = (now - stats.due_at).total_seconds() / 86400
+    error_rate = stats.error_count / max(stats.times_used, 1)
+    return round(1.0 + overdue_days / max(stats.interval_days, 1.0) + error_rate, 3)
+
+
+def build_review_queue(words: List[Word], stats_by_id: Dict[str, WordStats], now: datetime, size: int = REVIEW_QUEUE_SIZE) -> List[Dict[str, Any]]:
+    """The size most urgent words as queue items; among equal priorities older words come first"""
+    candidates = []
+    # words is newest first, so a higher index is an older word
+    for index, word in enumerate(words):
+        stats = stats_by_id.get(word.id)
+        priority = review_priority(stats, now)
+        if priority is not None:
+            candidates.append((priority, index, word.id, stats))
+    items = []
+    for priority, _, word_id, stats in heapq.nlargest(size, candidates, key=lambda c: (c[0], c[1])):
+        items.append({
+            "word_id": word_id,
+            "priority": priority,
+            "due_at": stats.due_at.isoformat() if stats and stats.due_at else None,
+            "error_count": stats.error_count if stats else 0,
+        })
+    return items
+
+
+def _load_stats(user_id: str) -> Dict[str, WordStats]:
+    return {row["word_id"]: WordStats.model_validate(row) for row in get_word_stats_db(user_id)}
+
+
+def update_word_stats_after_session(
+    user_id: str,
+    transcript: Transcript,
+    feedback: Optional[FeedbackAgentOutput] = None,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fold one finished session into the learner's word stats (one batched
+    upsert of the words it touched) and rebuild the review queue. Returns
+    the queue items; failures are logged and leave the previous stats.
+    """
+    now = now or datetime.now(timezone.utc)
+    try:
+        words = get_user_words_cached(user_id)
+        stats_by_id = _load_stats(user_id)
+        mistakes = [mistake.what_you_said for mistake in feedback.mistakes] if feedback else []
+        changed = []
+        for word_id, (used, offered, errors) in count_word_occurrences(words, transcript, mistakes).items():
+            stats = stats_by_id.get(word_id) or WordStats(word_id=word_id, user_id=user_id)
+            stats.times_used += used
+            stats.times_offered += offered
+            stats.error_count += errors
+            stats.last_seen_at = now
+            quality = session_quality(used, errors)
+            if quality is not None:
+                apply_review(stats, quality, now)
+            stats_by_id[word_id] = stats
+            changed.append(stats.model_dump(mode="json"))
+        if changed:
+            upsert_word_stats_db(changed)
+        items = build_review_queue(words, stats_by_id, now)
+        save_review_queue_db(user_id, items)
+        return items
+    except Exception as e:
+        print(f"⚠️  Could not update word stats for {user_id}: {e}")
+        return []
+
+
+def rebuild_review_queue(user_id: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Build and store the queue from the current stats (e.g. before the learner's first analysed session)"""
+    now = now or datetime.now(timezone.utc)
+    items = build_review_queue(get_user_words_cached(user_id), _load_stats(user_id), now)
+    save_review_queue_db(user_id, items)
+    return items
+
+
+def get_review_queue(user_id: str, limit: int = REVIEW_QUEUE_SIZE) -> ReviewQueue:
+    """
+    The first `limit` words of the precomputed queue: one queue row plus one
+    lookup of those word ids. Words deleted since the last rebuild are left
+    out, so fewer than `limit` may come back until the next session.
+    """
+    row = get_review_queue_db(user_id)
+    if row is None:
+        items, updated_at = rebuild_review_queue(user_id), datetime.now(timezone.utc)
+    else:
+        items, updated_at = row["items"], row.get("updated_at")
+    top = items[:limit]
+    words = {word.id: word for word in get_words_by_ids([item["word_id"] for item in top])}
+    return ReviewQueue(
+        user_id=user_id,
+        items=[
+            ReviewItem(word=words[item["word_id"]].word, translation=words[item["word_id"]].translation, **item)
+            for item in top if item["word_id"] in words
+        ],
+        updated_at=updated_at,
+    )
+
+
+def get_review_words(user_id: str, limit: int = REVIEW_WORDS_FOR_AGENTS) -> List[str]:
+    """The words the planner and words agents should bring back, most urgent first (empty if unavailable)"""
+    try:
+        return [item.word for item in get_review_queue(user_id, limit).items]
+    except Exception as e:
+        print(f"⚠️  Could not load review queue for {user_id}: {e}")
+        return []
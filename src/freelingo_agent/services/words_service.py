@@ -1,22 +1,68 @@
 # src/services/words_service.py
 
-from freelingo_agent.db.words import get_known_words, get_user_words
-from typing import List
+from freelingo_agent.db.words import get_known_words, list_user_words_page_db, WORD_FIELDS
+from freelingo_agent.services.word_cache_service import get_user_words_cached
+from freelingo_agent.db.pool import run_db
+from freelingo_agent.utils.pagination import encode_cursor, decode_cursor
+from typing import Any, Dict, List, Optional, Tuple
 
 from freelingo_agent.models.words_model import WordSuggestion, Word
 from freelingo_agent.services.llm_service import suggest_new_words
 from freelingo_agent.services.user_session_service import update_known_words_in_session
 
 def fetch_known_words(user_id: str) -> List[Word]:
-    known_words = get_user_words(user_id)
+    known_words = get_user_words_cached(user_id)
     update_known_words_in_session(user_id=user_id, words=known_words)
     return known_words
 
+async def fetch_known_words_async(user_id: str) -> List[Word]:
+    """fetch_known_words for async callers: the query runs on the DB thread pool"""
+    known_words = await run_db(get_user_words_cached, user_id)
+    update_known_words_in_session(user_id=user_id, words=known_words)
+    return known_words
+
+def parse_word_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Columns from a comma-separated `fields` parameter (all when empty); ValueError on unknown ones"""
+    if not fields:
+        return WORD_FIELDS
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in WORD_FIELDS]
+    if unknown or not requested:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(WORD_FIELDS)}")
+    return requested
 
+def list_user_words_service(
+    user_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    vocabulary_version: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Newest-first words, projected to `fields`, plus the cursor for the next page.
+    Without limit/cursor this is the whole (cached) list; pages are read from
+    the DB with only the requested columns.
+    """
+    columns = parse_word_fields(fields)
+    if limit is None and cursor is None:
+        words = get_user_words_cached(user_id, vocabulary_version)
+        words = [word.model_dump(mode="json", include=set(columns)) for word in words]
+        return {"words": words, "next_cursor": None}
+    
+    limit = limit or 100
+    before = tuple(decode_cursor(cursor, 2)) if cursor else None
+    # One extra row tells whether another page follows
+    rows = list_user_words_page_db(user_id, limit + 1, before, columns)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    words = [{column: row.get(column) for column in columns} for row in rows]
+    return {"words": words, "next_cursor": next_cursor}
 
 
 
 async def suggest_new_words_for_user(user_id: str) -> WordSuggestion:
-    known_words = get_user_words(user_id)  # Use get_user_words to get Word objects
+    known_words = await run_db(get_user_words_cached, user_id)  # Word objects, not just the strings
     new_words = await suggest_new_words(known_words)
     return new_words
\ No newline at end of file
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from freelingo_agent.db.workflow_results import save_workflow_result_db, get_workflow_result_db
+from freelingo_agent.db.dialogue_session import get_dialogue_session_db
+from freelingo_agent.db.pool import run_db
+from freelingo_agent.models.dialogue_session import WorkflowResult
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.transcript_model import Transcript
+
+# Runs still in progress, keyed by (session_id, transcript_hash), so a retry joins the running workflow
+_in_flight: Dict[Tuple[str, str], "asyncio.Task[Optional[WorkflowResult]]"] = {}
+
+
+def transcript_hash(transcript: Optional[Transcript]) -> str:
+    """Stable hash of the transcript a workflow ran on"""
+    payload = transcript.model_dump_json() if transcript else ""
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _result_from_row(row: Dict[str, Any]) -> WorkflowResult:
+    return WorkflowResult(
+        session_id=row["session_id"],
+        user_id=row["user_id"],
+        transcript_hash=row["transcript_hash"],
+        feedback=row.get("feedback"),
+        plan=row.get("plan"),
+        new_words=row.get("new_words"),
+        is_valid=row.get("is_valid"),
+        created_at=row.get("created_at"),
+    )
+
+
+def get_stored_workflow_result(session_id: str, hash_: Optional[str] = None) -> Optional[WorkflowResult]:
+    """Stored result for a session (for one transcript version when hash_ is given)"""
+    try:
+        row = get_workflow_result_db(session_id, hash_)
+    except Exception as e:
+        print(f"⚠️  Could not read stored workflow result for {session_id}: {e}")
+        return None
+    return _result_from_row(row) if row else None
+
+
+def store_workflow_result(final_state: GraphState) -> Optional[WorkflowResult]:
+    """Persist a finished run's outputs; runs that produced no feedback are not stored so they can be retried"""
+    if final_state.last_feedback is None or not final_state.session_id:
+        return None
+    decision = final_state.last_referee_decision
+    result = WorkflowResult(
+        session_id=final_state.session_id,
+        user_id=final_state.user_id,
+        transcript_hash=transcript_hash(final_state.transcript),
+        feedback=final_state.last_feedback,
+        plan=final_state.last_plan,
+        new_words=final_state.last_words,
+        is_valid=decision.is_valid if decision else None,
+    )
+    try:
+        save_workflow_result_db(
+            session_id=result.session_id,
+            user_id=result.user_id,
+            transcript_hash=result.transcript_hash,
+            feedback=result.feedback.model_dump() if result.feedback else None,
+            plan=result.plan.model_dump() if result.plan else None,
+            new_words=result.new_words.model_dump() if result.new_words else None,
+            is_valid=result.is_valid,
+        )
+    except Exception as e:
+        # Still hand the result to the caller; only retries lose the shortcut
+        print(f"⚠️  Could not store workflow result for {result.session_id}: {e}")
+    return result
+
+
+async def _run_and_store(workflow_service, state: GraphState) -> Optional[WorkflowResult]:
+    final_state = await workflow_service.trigger_feedback_loop(state)
+    return await run_db(store_workflow_result, final_state)
+
+
+async def run_session_workflow(workflow_service, state: GraphState) -> Optional[WorkflowResult]:
+    """
+    Workflow result for a saved session: the stored one if this transcript was
+    already analysed, the in-flight run if one is going, otherwise a new run.
+    """
+    hash_ = transcript_hash(state.transcript)
+    stored = await run_db(get_stored_workflow_result, state.session_id, hash_)
+    if stored is not None:
+        return stored
+
+    key = (state.session_id, hash_)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(_run_and_store(workflow_service, state))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # Shielded: a dropped client connection must not cancel the run or lose its result
+    return await asyncio.shield(task)
+
+
+async def resume_session_workflow(workflow_service, session_id: str) -> Optional[GraphState]:
+    """
+    Finish an interrupted run from its checkpoint and store its result (the
+    checkpoint is deleted once the run finishes). None if there was no such run.
+    """
+    final_state = await workflow_service.resume_workflow(session_id)
+    if final_state is not None:
+        await run_db(store_workflow_result, final_state)
+    return final_state
+
+
+async def get_session_workflow_result(session_id: str) -> Optional[WorkflowResult]:
+    """Result for a session, waiting for its run if it is still in progress"""
+    for (in_flight_session_id, _), task in list(_in_flight.items()):
+        if in_flight_session_id == session_id:
+            return await asyncio.shield(task)
+    return await run_db(get_stored_workflow_result, session_id)
+
+
+async def retry_session_workflow(workflow_service, user_id: str, session_id: str) -> Optional[WorkflowResult]:
+    """
+    Run the workflow again on a saved session whose earlier run stored no
+    result (it produced no feedback), using the transcript saved with the session.
+    """
+    from freelingo_agent.services.reanalysis_service import transcript_from_messages
+    from freelingo_agent.services.word_cache_service import get_user_words_cached
+    from freelingo_agent.services.dialogue_turn_service import get_learner_history
+    from freelingo_agent.services.word_stats_service import get_review_words
+
+    row = await run_db(get_dialogue_session_db, session_id)
+    if not row or row["user_id"] != user_id:
+        return None
+    transcript = transcript_from_messages(row["messages"])
+    if not transcript.transcript:
+        return None
+    known_words = await run_db(get_user_words_cached, user_id)
+    state = GraphState(
+        user_id=user_id,
+        session_id=session_id,
+        known_words=[word.word for word in known_words],
+        transcript=transcript,
+        learner_history=await run_db(get_learner_history, user_id, exclude_session_id=session_id),
+        review_words=await run_db(get_review_words, user_id),
+    )
+    return await run_session_workflow(workflow_service, state)
@@ -1,12 +1,90 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer
-from jose import jwt, JWTError
-from models.user import User
-from config import SUPABASE_URL
+from jose import jwk, jwt, JWTError
+from freelingo_agent.models.user import User
+from freelingo_agent.config import SUPABASE_URL, JWKS_TTL_SECONDS, JWKS_MIN_REFRESH_SECONDS
 import httpx
 
 bearer_scheme = HTTPBearer()
-_JWKS_CACHE = None
+
+
+class JwksManager:
+    """
+    Supabase signing keys, parsed once per kid. The key set is re-fetched
+    after ttl_seconds, and early when a token names an unknown kid (key
+    rotation), but at most every min_refresh_seconds. Concurrent requests
+    share one fetch, over one pooled client. A failed refresh keeps the keys
+    already known.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl_seconds: float = JWKS_TTL_SECONDS,
+        min_refresh_seconds: float = JWKS_MIN_REFRESH_SECONDS,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self._client = client
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._inflight: Optional["asyncio.Future"] = None
+
+    def _can_fetch(self, now: float) -> bool:
+        return self._attempted_at is None or now - self._attempted_at >= self.min_refresh_seconds
+
+    async def _fetch(self) -> None:
+        self._attempted_at = time.monotonic()
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        res = await self._client.get(self.url)
+        res.raise_for_status()
+        keys = {}
+        for key in res.json()["keys"]:
+            try:
+                keys[key["kid"]] = jwk.construct(key, algorithm=key.get("alg", "RS256"))
+            except Exception as e:
+                print(f"⚠️  Skipping unusable JWK {key.get('kid')}: {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Fetch the key set, joining the fetch already in flight if there is one"""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+            self._inflight.add_done_callback(lambda _: setattr(self, "_inflight", None))
+        try:
+            # Shielded: a cancelled request does not cancel the fetch the others wait for
+            await asyncio.shield(self._inflight)
+        except Exception as e:
+            if not self._keys:
+                raise
+            print(f"⚠️  JWKS refresh failed, keeping the known keys: {e}")
+
+    async def get_key(self, kid: str) -> Any:
+        now = time.monotonic()
+        stale = self._fetched_at is None or now - self._fetched_at > self.ttl_seconds
+        if (stale or kid not in self._keys) and (self._inflight is not None or self._can_fetch(now)):
+            await self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise JWTError("Unable to find matching JWK")
+        return key
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+jwks = JwksManager(f"{SUPABASE_URL}/auth/v1/keys")
+
 
 async def get_current_user(authorization=Depends(bearer_scheme)) -> User:
     token = authorization.credentials
@@ -17,17 +95,9 @@ async def get_current_user(authorization=Depends(bearer_scheme)) -> User:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 async def verify_jwt(token: str) -> dict:
-    global _JWKS_CACHE
-    if not _JWKS_CACHE:
-        async with httpx.AsyncClient() as client:
-            res = await client.get(f"{SUPABASE_URL}/auth/v1/keys")
-            res.raise_for_status()
-            _JWKS_CACHE = res.json()
     try:
         unverified_header = jwt.get_unverified_header(token)
-        key = next((k for k in _JWKS_CACHE["keys"] if k["kid"] == unverified_header["kid"]), None)
-        if not key:
-            raise Exception("Unable to find matching JWK")
+        key = await jwks.get_key(unverified_header.get("kid"))
         return jwt.decode(token, key, algorithms=["RS256"], options={"verify_aud": False})
     except JWTError as e:
-        raise HTTPException(status_code=401, detail=f"JWT error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail=f"JWT error: {e}")
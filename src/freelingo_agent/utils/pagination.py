@@ -0,0 +1,19 @@
+import base64
+import json
+from typing import Any, List
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor for the sort-key values of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Sort-key values from a cursor made by encode_cursor; ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,63 @@
+# tests/db/test_pool.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+from freelingo_agent.db import pool
+
+
+@pytest.mark.asyncio
+async def test_run_db_runs_off_the_event_loop():
+    loop_thread = threading.get_ident()
+
+    def query(user_id, limit=10):
+        return threading.get_ident(), user_id, limit
+
+    thread_id, user_id, limit = await pool.run_db(query, "user1", limit=5)
+    assert thread_id != loop_thread
+    assert (user_id, limit) == ("user1", 5)
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_overlap_within_pool_size(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(pool, "_db_pool", executor)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_query():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    # The loop stays free while queries run, and the pool bounds how many run at once
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while running or ticks == 0:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(ticker(), *(pool.run_db(slow_query) for _ in range(6)))
+    executor.shutdown()
+    assert peak == 2
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_run_db_propagates_errors():
+    def failing():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError, match="db down"):
+        await pool.run_db(failing)
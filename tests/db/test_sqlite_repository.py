@@ -0,0 +1,146 @@
+# tests/db/test_sqlite_repository.py
+
+import pytest
+from freelingo_agent.db import words, dialogue_session, dialogue_turns, workflow_results
+from freelingo_agent.db.repository import DuplicateWordError, create_repository, set_repository
+from freelingo_agent.db.sqlite_repository import SqliteRepository
+from freelingo_agent.models.words_model import Word
+
+USER = "firebase-uid-1"
+
+
+@pytest.fixture(autouse=True)
+def sqlite_backend():
+    repository = SqliteRepository(":memory:")
+    set_repository(repository)
+    yield repository
+    set_repository(None)
+    repository.close()
+
+
+def word(text, translation="t"):
+    return Word(user_id=USER, word=text, translation=translation)
+
+
+# ---- words ----
+def test_word_crud_and_vocabulary_version():
+    assert words.get_vocabulary_version_db(USER) == 0
+    chat = words.create_word(USER, word("chat", "cat"))
+    chien = words.create_word(USER, word("chien", "dog"))
+
+    assert [w.word for w in words.get_user_words(USER)] == ["chien", "chat"]
+    assert words.get_known_words(USER) == ["chien", "chat"]
+    assert words.get_word(chat.id).translation == "cat"
+
+    updated = words.update_word(chat.id, Word(user_id=USER, word="Chat", translation="cat (pet)"))
+    assert (updated.word, updated.translation) == ("Chat", "cat (pet)")
+    assert words.delete_word(chien.id) is True
+    assert words.delete_word(chien.id) is False
+    # Two inserts, one update, one delete
+    assert words.get_vocabulary_version_db(USER) == 4
+    assert words.get_vocabulary_version_db("someone-else") == 0
+
+
+def test_duplicate_word_key_is_rejected_or_skipped():
+    words.create_word(USER, word("Café"))
+    with pytest.raises(DuplicateWordError):
+        words.create_word(USER, word("cafe"))
+
+    created = words.create_words_bulk(USER, [word("café"), word("pain"), word("Pain"), word("vin")])
+    assert [w.word for w in created] == ["pain", "vin"]
+    # Another user may have the same word
+    assert len(words.create_words_bulk("other-user", [Word(user_id="other-user", word="café", translation="t")])) == 1
+
+    # Renaming onto an existing word is a duplicate too
+    with pytest.raises(DuplicateWordError):
+        words.update_word(created[0].id, word("CAFE"))
+
+
+def test_word_pages_and_projection():
+    for i in range(5):
+        words.create_word(USER, word(f"mot{i}"))
+
+    first = words.list_user_words_page_db(USER, 2, fields=("word",))
+    assert [row["word"] for row in first] == ["mot4", "mot3"]
+    assert set(first[0]) == {"created_at", "id", "word"}
+
+    after = (first[-1]["created_at"], first[-1]["id"])
+    rest = words.list_user_words_page_db(USER, 10, after, ("word",))
+    assert [row["word"] for row in rest] == ["mot2", "mot1", "mot0"]
+
+
+# ---- dialogue sessions, turns and workflow results ----
+def session_row(session_id, started_at):
+    return {"id": session_id, "user_id": USER, "messages": {"transcript": []}, "started_at": started_at, "created_at": started_at}
+
+
+def turn_row(session_id, idx, tags, one_sentence=True):
+    return {
+        "session_id": session_id, "idx": idx, "user_id": USER,
+        "ai_text": "Bonjour ?", "user_text": "bonjour toi", "user_word_count": 2, "tags": tags,
+        "used_only_allowed_vocabulary": True, "one_sentence": one_sentence,
+        "max_eight_words": True, "no_corrections_or_translations": True,
+    }
+
+
+def test_live_session_lifecycle():
+    assert dialogue_session.upsert_dialogue_sessions_db([session_row("s1", "2024-01-01T10:00:00")]) == 1
+    # Re-sent by a retried flush: left as it is
+    dialogue_session.upsert_dialogue_sessions_db([session_row("s1", "2024-01-01T10:00:00")])
+    dialogue_turns.upsert_dialogue_turns_db([turn_row("s1", 0, ["no_verbs"]), turn_row("s1", 1, ["no_verbs", "greeting"], one_sentence=False)])
+
+    transcript = {"transcript": [{"ai_turn": {}, "user_turn": {"text": "bonjour toi"}}]}
+    dialogue_session.complete_dialogue_session_db("s1", transcript, "2024-01-01T10:05:00", 4, 2, 300.0)
+    assert dialogue_session.get_dialogue_session_db("s1")["messages"] == transcript
+
+    listed = dialogue_session.list_dialogue_sessions_db(USER, 10)
+    assert listed == [{
+        "session_id": "s1", "started_at": "2024-01-01T10:00:00", "ended_at": "2024-01-01T10:05:00",
+        "message_count": 4, "turn_count": 2, "duration_seconds": 300.0,
+    }]
+
+    summary = dialogue_turns.get_learner_turn_summary_db(USER, "2000-01-01")
+    assert (summary["sessions"], summary["turns"], summary["avg_user_words"], summary["not_one_sentence"]) == (1, 2, 2.0, 1)
+    assert dialogue_turns.get_learner_challenge_tag_counts_db(USER, "2000-01-01") == {"no_verbs": 2, "greeting": 1}
+    assert dialogue_turns.get_learner_turn_summary_db(USER, "2000-01-01", exclude_session_id="s1")["turns"] == 0
+
+    with pytest.raises(RuntimeError):
+        dialogue_session.complete_dialogue_session_db("missing", transcript, None, 0, 0, None)
+
+
+def test_session_listing_keyset_and_reanalysis_pages():
+    for i in range(3):
+        dialogue_session.save_dialogue_session_db(
+            f"s{i}", USER, {"transcript": []}, started_at=f"2024-01-0{i + 1}T10:00:00", ended_at=f"2024-01-0{i + 1}T10:05:00"
+        )
+    # Live session, not ended yet
+    dialogue_session.upsert_dialogue_sessions_db([session_row("s3", "2024-01-04T10:00:00")])
+
+    first = dialogue_session.list_dialogue_sessions_db(USER, 2)
+    assert [s["session_id"] for s in first] == ["s3", "s2"]
+    older = dialogue_session.list_dialogue_sessions_db(USER, 3, (first[-1]["started_at"], first[-1]["session_id"]))
+    assert [s["session_id"] for s in older] == ["s1", "s0"]
+
+    # Re-analysis pages skip the live session
+    page = dialogue_session.list_dialogue_sessions_page_db(5, after_id="s0")
+    assert [row["id"] for row in page] == ["s1", "s2"]
+    assert page[0]["messages"] == {"transcript": []}
+
+
+def test_workflow_result_upsert():
+    dialogue_session.save_dialogue_session_db("s1", USER, {"transcript": []})
+    workflow_results.save_workflow_result_db("s1", USER, "hash", {"strengths": []}, None, None, False)
+    workflow_results.save_workflow_result_db("s1", USER, "hash", {"strengths": ["ok"]}, None, None, True)
+
+    result = workflow_results.get_workflow_result_db("s1", "hash")
+    assert (result["feedback"], result["plan"], result["is_valid"]) == ({"strengths": ["ok"]}, None, True)
+    assert workflow_results.get_workflow_result_db("s1", "other-hash") is None
+
+
+def test_backend_selection(tmp_path, monkeypatch):
+    from freelingo_agent.db import repository
+
+    monkeypatch.setattr(repository, "SQLITE_DB_PATH", str(tmp_path / "freelingo.db"))
+    assert isinstance(create_repository("sqlite"), SqliteRepository)
+    with pytest.raises(ValueError):
+        create_repository("mysql")
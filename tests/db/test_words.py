@@ -1,7 +1,16 @@
 # tests/db/test_words.py
 
 import pytest
-from freelingo_agent.db import words
+from freelingo_agent.db import words, supabase_repository
+from freelingo_agent.db.repository import set_repository
+
+
+@pytest.fixture(autouse=True)
+def supabase_backend():
+    # These tests mock the Supabase client, whatever DB_BACKEND says
+    set_repository(supabase_repository.SupabaseRepository())
+    yield
+    set_repository(None)
 
 class MockResponse:
     def __init__(self, data=None):
@@ -31,7 +40,7 @@ def test_get_known_words(monkeypatch):
         def select(self, fields):
             return MockQuery()
 
-    monkeypatch.setattr(words.supabase, "from_", lambda table: MockFrom())
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockFrom())
 
     result = words.get_known_words("00000000-0000-0000-0000-000000000000")
     assert result == ["bonjour", "chat"]
@@ -66,7 +75,7 @@ def test_get_user_words(monkeypatch):
             return MockQuery()
 
     # Patch supabase.from_ to return our MockFrom
-    monkeypatch.setattr(words.supabase, "from_", lambda table: MockFrom())
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockFrom())
 
     # Now run the test
     result = words.get_user_words("00000000-0000-0000-0000-000000000000")
@@ -99,7 +108,7 @@ def test_create_word(monkeypatch):
         def insert(self, data):
             return MockInsert(data)
 
-    monkeypatch.setattr(words.supabase, "from_", lambda table: MockFrom())
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockFrom())
 
     # Run the function
     word_data = Word(
@@ -136,7 +145,7 @@ def test_delete_word(monkeypatch):
         def delete(self):
             return MockDeleteQuery()
 
-    monkeypatch.setattr(words.supabase, "from_", lambda table: MockFrom())
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockFrom())
 
     # Run test
     result = words.delete_word("123")
@@ -144,3 +153,88 @@ def test_delete_word(monkeypatch):
     # Assert expected delete arguments and return value
     assert deleted[0] == [("id", "123")]  # Check the full list of calls
     assert result == True
+
+# ---- word_key ----
+def test_word_key_ignores_case_accents_and_spacing():
+    from freelingo_agent.db import words
+
+    assert words.word_key("Café") == words.word_key("cafe") == "cafe"
+    assert words.word_key("  Être   là ") == "etre la"
+    assert words.word_key("garçon") != words.word_key("garcons")
+    # Same keys as the SQL backfill, lower(unaccent(...))
+    assert words.word_key("Cœur") == "coeur"
+    assert words.word_key("Ex æquo") == "ex aequo"
+
+# ---- create_words_bulk ----
+def test_create_words_bulk_dedups_and_chunks(monkeypatch):
+    from freelingo_agent.db import words
+    from freelingo_agent.models.words_model import Word
+    upserts = []
+
+    class MockUpsert:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def execute(self):
+            # The DB already has "chat": that row is ignored and not returned
+            return MockResponse(data=[
+                {**row, "id": f"id-{row['word_key']}", "created_at": "2024-01-01T00:00:00Z"}
+                for row in self.rows if row["word_key"] != "chat"
+            ])
+
+    class MockFrom:
+        def upsert(self, rows, on_conflict, ignore_duplicates):
+            upserts.append((len(rows), on_conflict, ignore_duplicates))
+            return MockUpsert(rows)
+
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockFrom())
+    monkeypatch.setattr(words, "BULK_INSERT_CHUNK_SIZE", 2)
+
+    user_id = "00000000-0000-0000-0000-000000000000"
+    requested = [Word(user_id=user_id, word=w, translation="t") for w in ["Café", "café", "chat", "pain", "vin"]]
+    result = words.create_words_bulk(user_id, requested)
+
+    # "café" repeats "Café" in the request: 4 distinct words in chunks of 2
+    assert upserts == [(2, "user_id,word_key", True), (2, "user_id,word_key", True)]
+    assert [w.word for w in result] == ["Café", "pain", "vin"]
+
+# ---- list_user_words_page_db ----
+def test_list_user_words_page_db_keyset_and_projection(monkeypatch):
+    from freelingo_agent.db import words
+    calls = []
+
+    class MockQuery:
+        def select(self, columns):
+            calls.append(("select", columns))
+            return self
+
+        def eq(self, key, value):
+            return self
+
+        def or_(self, filters):
+            calls.append(("or", filters))
+            return self
+
+        def order(self, field, desc):
+            calls.append(("order", field, desc))
+            return self
+
+        def limit(self, n):
+            calls.append(("limit", n))
+            return self
+
+        def execute(self):
+            return MockResponse(data=[{"id": "w1", "created_at": "2024-01-01T00:00:00+00:00", "word": "chat"}])
+
+    monkeypatch.setattr(supabase_repository.supabase, "from_", lambda table: MockQuery())
+
+    result = words.list_user_words_page_db("user1", 3, ("2024-01-02T00:00:00+00:00", "w2"), ("word",))
+
+    assert result[0]["word"] == "chat"
+    assert calls == [
+        ("select", "created_at, id, word"),
+        ("or", 'created_at.lt."2024-01-02T00:00:00+00:00",and(created_at.eq."2024-01-02T00:00:00+00:00",id.lt.w2)'),
+        ("order", "created_at", True),
+        ("order", "id", True),
+        ("limit", 3),
+    ]
@@ -0,0 +1,49 @@
+"""
+Test for the API lifespan: the background loops run while the app serves and
+are cancelled on shutdown, after which pending turns are flushed and the
+sessions snapshotted; startup fails if the certificate refresh cannot work.
+"""
+
+import firebase_admin
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# auth_service initializes Firebase from a service account file unless an app exists
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(firebase_admin.credentials.ApplicationDefault(), {"projectId": "freelingo-test"})
+
+# The voice router creates its speech client on import
+with patch("google.cloud.speech_v1p1beta1.SpeechClient", MagicMock()):
+    from freelingo_agent.main import app
+
+
+def test_background_loops_stop_before_the_final_flush_and_snapshot():
+    order = []
+
+    def snapshot():
+        order.append(("snapshot", [task.done() for task in app.state.background_tasks]))
+        return 0
+
+    async def close():
+        order.append(("close", [task.done() for task in app.state.background_tasks]))
+
+    # No certificate fetches from the test
+    with patch("freelingo_agent.services.auth_service.certificate_request", MagicMock()), \
+         patch("freelingo_agent.services.auth_service.refresh_certificates", MagicMock()), \
+         patch("freelingo_agent.services.turn_writer_service.turn_writer.close", AsyncMock(side_effect=close)), \
+         patch("freelingo_agent.services.user_session_service.session_store.snapshot", side_effect=snapshot):
+        with TestClient(app) as client:
+            assert client.get("/api/health").status_code == 200
+            assert not any(task.done() for task in app.state.background_tasks)
+        tasks = app.state.background_tasks
+
+    assert all(task.cancelled() for task in tasks)
+    assert order == [("close", [True] * 3), ("snapshot", [True] * 3)]
+
+
+def test_startup_fails_when_the_sdk_has_no_certificate_cache():
+    with patch("freelingo_agent.services.auth_service.certificate_request", side_effect=RuntimeError("no certificate cache")):
+        with pytest.raises(RuntimeError, match="no certificate cache"):
+            with TestClient(app):
+                pass
@@ -71,7 +71,7 @@ class TestGraphWorkflowTranscript:
         # Verify the workflow completed successfully
         assert final_state is not None
         assert final_state.user_id == "test_user_001"
-        assert final_state.user_session.session_id == "test_session_001"
+        assert final_state.session_id == "test_session_001"
         
         # Verify that the transcript was processed
         assert final_state.transcript is not None
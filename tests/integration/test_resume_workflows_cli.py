@@ -0,0 +1,84 @@
+"""
+Test for `freelingo resume`: a workflow run interrupted mid-graph is finished
+from its checkpoint and its result stored, like the resume endpoint does.
+"""
+
+import firebase_admin
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from freelingo_agent.db.repository import set_repository
+from freelingo_agent.db.sqlite_repository import SqliteRepository
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.services.workflow_result_service import get_session_workflow_result
+
+# auth_service initializes Firebase from a service account file unless an app exists
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(firebase_admin.credentials.ApplicationDefault(), {"projectId": "freelingo-test"})
+
+# The voice router creates its speech client on import
+with patch("google.cloud.speech_v1p1beta1.SpeechClient", MagicMock()):
+    from freelingo_agent.main import resume_workflows
+
+
+class SimulatedCrash(BaseException):
+    """Escapes the nodes' `except Exception` handlers like a killed process would"""
+
+
+FEEDBACK = FeedbackAgentOutput(strengths=["Good greetings"], mistakes=[], conversation_examples=[])
+PLAN = PlannerAgentOutput(session_objectives=["Ask questions"], vocab_gaps=["Question words"])
+WORDS = WordSuggestion(new_words=["pourquoi"], usages={})
+VALID = RefereeAgentOutput(
+    is_valid=True,
+    violations=[],
+    rationale={
+        "reasoning_summary": "Chain is coherent",
+        "chain_checks": {
+            "feedback_transcript_alignment": True,
+            "planner_feedback_incorporation": True,
+            "new_words_plan_alignment": True,
+            "overall_chain_coherence": True,
+        },
+    },
+)
+
+
+@pytest.fixture
+def sqlite_backend():
+    repository = SqliteRepository(":memory:")
+    set_repository(repository)
+    yield repository
+    set_repository(None)
+    repository.close()
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_result_is_stored(tmp_path, sqlite_backend):
+    checkpoint_path = str(tmp_path / "checkpoints.db")
+    sqlite_backend.upsert_dialogue_sessions([{
+        "id": "session-crashed", "user_id": "cli_user", "messages": {"transcript": []},
+        "started_at": "2025-01-01T10:00:00+00:00", "created_at": "2025-01-01T10:00:00+00:00",
+    }])
+    state = GraphState(user_id="cli_user", known_words=["bonjour"], session_id="session-crashed", transcript=Transcript(transcript=[]))
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(return_value=FEEDBACK)), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(return_value=PLAN)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(side_effect=SimulatedCrash())):
+        with pytest.raises(SimulatedCrash):
+            await GraphWorkflowService(checkpoint_path=checkpoint_path).run_workflow(state)
+
+    with patch("freelingo_agent.api.dialogue.workflow_service", GraphWorkflowService(checkpoint_path=checkpoint_path)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=VALID)):
+        # No ids: every interrupted run
+        await resume_workflows([])
+
+    result = await get_session_workflow_result("session-crashed")
+    assert result is not None and result.user_id == "cli_user"
+    assert (result.feedback, result.plan, result.new_words) == (FEEDBACK, PLAN, WORDS)
@@ -0,0 +1,53 @@
+"""
+The API must start with DB_BACKEND=sqlite and no Supabase credentials at all.
+Runs the import in a subprocess so this process's config module is untouched.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def service_account_file(tmp_path):
+    """A syntactically valid Firebase service account (never used to call Google)"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    path = tmp_path / "service-account.json"
+    path.write_text(json.dumps({
+        "type": "service_account",
+        "project_id": "freelingo-test",
+        "private_key_id": "test",
+        "private_key": pem.decode(),
+        "client_email": "test@freelingo-test.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }))
+    return path
+
+
+def test_app_imports_with_sqlite_and_no_supabase_env(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_API_KEY")}
+    env.update({
+        "DB_BACKEND": "sqlite",
+        "SQLITE_DB_PATH": str(tmp_path / "freelingo.db"),
+        "FIREBASE_SERVICE_ACCOUNT_PATH": str(service_account_file(tmp_path)),
+    })
+    for var in ("VAPI_API_KEY", "VAPI_ASSISTANT_ID", "OPENAI_API_KEY", "LOGFIRE_TOKEN", "FIREBASE_PROJECT_ID"):
+        env.setdefault(var, "test")
+    for var in ("WORDS", "DIALOGUE", "FEEDBACK", "PLANNER", "REFEREE"):
+        env.setdefault(f"{var}_LLM_MODEL", "openai:gpt-4o-mini")
+
+    script = (
+        "import sys\n"
+        "from freelingo_agent.main import app\n"
+        "from freelingo_agent.db.repository import get_repository\n"
+        "print(type(get_repository()).__name__, 'freelingo_agent.db.supabase' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], env=env, cwd=tmp_path, capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "SqliteRepository False"
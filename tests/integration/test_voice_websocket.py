@@ -0,0 +1,123 @@
+"""
+Tests for the voice WebSocket: authentication once per socket, each spoken
+reply transcribed (in French) and answered by the dialogue agent on the same socket with
+stage timings, and recognition that ends before the client's end_of_audio.
+"""
+
+import firebase_admin
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from freelingo_agent.models.user import User
+
+# auth_service initializes Firebase from a service account file unless an app exists
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(firebase_admin.credentials.ApplicationDefault(), {"projectId": "freelingo-test"})
+
+# The router creates its speech client on import
+with patch("google.cloud.speech_v1p1beta1.SpeechClient", MagicMock()):
+    from freelingo_agent.api import voice
+
+
+async def authenticate(token: str) -> User:
+    if token != "good-token":
+        raise HTTPException(status_code=401, detail="Invalid Firebase token")
+    return User(user_id="learner", email="learner@example.com")
+
+
+async def transcribe_all(audio) -> str:
+    return b"".join([chunk async for chunk in audio]).decode()
+
+
+async def transcribe_first_chunk(audio) -> str:
+    """Like single-utterance recognition ending on its own, before the client's end_of_audio"""
+    async for chunk in audio:
+        return chunk.decode()
+    return ""
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.include_router(voice.router)
+    return app
+
+
+@pytest.fixture
+def dialogue():
+    async def reply(user_id, student_response):
+        return f"Tu as dit : {student_response}", {}
+
+    with patch.object(voice, "authenticate", authenticate), \
+         patch.object(voice, "run_dialogue_turn", AsyncMock(side_effect=reply)) as mock:
+        yield mock
+
+
+def say(ws, *chunks: bytes) -> None:
+    for chunk in chunks:
+        ws.send_bytes(chunk)
+    ws.send_json({"type": "end_of_audio"})
+
+
+def test_replies_are_recognized_as_french():
+    assert voice.stt_service.streaming_config.config.language_code == "fr-FR"
+
+
+def test_invalid_token_closes_the_socket(app, dialogue):
+    with TestClient(app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": "forged"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1008
+    dialogue.assert_not_called()
+
+
+def test_spoken_replies_are_answered_on_the_same_socket(app, dialogue):
+    with patch.object(voice.stt_service, "stream_transcribe", transcribe_all), \
+         TestClient(app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": "good-token"})
+        assert ws.receive_json() == {"type": "ready"}
+
+        for words in ((b"bon", b"jour"), (b"merci",)):
+            say(ws, *words)
+            assert ws.receive_json() == {"type": "transcript", "text": b"".join(words).decode()}
+            reply = ws.receive_json()
+            assert reply["text"] == f"Tu as dit : {b''.join(words).decode()}"
+            assert set(reply["timings"]) == {"stt_ms", "dialogue_ms", "total_ms"}
+            assert reply["timings"]["total_ms"] >= reply["timings"]["dialogue_ms"]
+
+    assert [call.args for call in dialogue.call_args_list] == [("learner", "bonjour"), ("learner", "merci")]
+
+
+def test_audio_after_recognition_ended_is_not_the_next_reply(app, dialogue):
+    with patch.object(voice.stt_service, "stream_transcribe", transcribe_first_chunk), \
+         TestClient(app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": "good-token"})
+        ws.receive_json()
+
+        say(ws, b"oui", b" et encore")
+        assert ws.receive_json()["text"] == "oui"
+        assert ws.receive_json()["type"] == "reply"
+        say(ws, b"non")
+        assert ws.receive_json() == {"type": "transcript", "text": "non"}
+        ws.receive_json()
+
+    assert [call.args[1] for call in dialogue.call_args_list] == ["oui", "non"]
+
+
+def test_silence_gets_no_reply(app, dialogue):
+    async def silence(audio):
+        async for _ in audio:
+            pass
+        return ""
+
+    with patch.object(voice.stt_service, "stream_transcribe", silence), \
+         TestClient(app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": "good-token"})
+        ws.receive_json()
+        say(ws, b"\x00\x00")
+        assert ws.receive_json() == {"type": "transcript", "text": ""}
+    dialogue.assert_not_called()
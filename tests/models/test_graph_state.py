@@ -0,0 +1,38 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, UserPromptPart, TextPart
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.user_session import UserSession
+from freelingo_agent.models.words_model import Word
+
+
+def test_graph_state_from_user_session_keeps_only_word_strings():
+    session = UserSession(
+        user_id="user_1",
+        session_id="session_1",
+        known_words=[Word(user_id="user_1", word="bonjour", translation="hello")],
+        dialogue_agent=object(),
+        dialogue_history=[
+            ModelRequest(parts=[UserPromptPart(content="bonjour")]),
+            ModelResponse(parts=[TextPart(content="bonjour !")]),
+        ],
+        last_agent_response={"ai_reply": {"text": "bonjour !", "word_count": 1}},
+    )
+
+    state = GraphState(user_session=session)
+
+    assert state.user_id == "user_1"
+    assert state.session_id == "session_1"
+    assert state.known_words == ["bonjour"]
+    assert "user_session" not in state.model_dump()
+
+
+def test_graph_state_explicit_fields_win_over_user_session():
+    state = GraphState(
+        user_id="user_1",
+        session_id="saved_session",
+        known_words=["merci"],
+        user_session=UserSession(user_id="user_1", session_id="live_session"),
+    )
+
+    assert state.session_id == "saved_session"
+    assert state.known_words == ["merci"]
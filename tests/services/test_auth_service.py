@@ -0,0 +1,142 @@
+"""
+Tests for bearer token verification: claims cached by token hash until the
+token expires, misses verified off the event loop, and the background
+certificate refresh going through the Firebase SDK's HTTP cache (and failing
+loudly if the SDK no longer has it).
+"""
+
+import threading
+
+import firebase_admin
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from unittest.mock import MagicMock, patch
+
+# auth_service initializes Firebase from a service account file unless an app exists
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(firebase_admin.credentials.ApplicationDefault(), {"projectId": "freelingo-test"})
+
+from freelingo_agent.services import auth_service
+from freelingo_agent.services.auth_service import TokenCache, certificate_request, get_current_user, refresh_certificates
+
+
+class FakeClock:
+    """Stands in for the time module of auth_service"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("freelingo_agent.services.auth_service.time", fake):
+        yield fake
+
+
+@pytest.fixture
+def verifier(clock):
+    """Firebase verification: tokens are "<uid>" and expire an hour from now; "bad" is rejected"""
+    threads = []
+
+    def verify_id_token(token):
+        threads.append(threading.current_thread())
+        if token == "bad":
+            raise ValueError("Token has wrong signature")
+        return {"uid": token, "email": f"{token}@example.com", "exp": clock.now + 3600}
+
+    auth_service.token_cache.clear()
+    with patch.object(auth_service.firebase_auth, "verify_id_token", side_effect=verify_id_token) as mock:
+        mock.threads = threads
+        yield mock
+    auth_service.token_cache.clear()
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.asyncio
+async def test_verified_claims_are_reused_until_the_token_expires(clock, verifier):
+    user = await get_current_user(bearer("learner"))
+    assert (user.user_id, user.email) == ("learner", "learner@example.com")
+    # Verified on a worker thread, not on the event loop
+    assert verifier.threads[0] is not threading.current_thread()
+
+    clock.now += 3599
+    assert (await get_current_user(bearer("learner"))).user_id == "learner"
+    assert verifier.call_count == 1
+
+    clock.now += 1
+    await get_current_user(bearer("learner"))
+    assert verifier.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_rejected_every_time(verifier):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(bearer("bad"))
+        assert error.value.status_code == 401
+    assert verifier.call_count == 2 and len(auth_service.token_cache) == 0
+
+
+def test_cache_is_bounded_least_recently_used_first(clock):
+    cache = TokenCache(max_entries=2)
+    for token in ("a", "b"):
+        cache.put(token, {"uid": token, "exp": clock.now + 60})
+    cache.get("a")
+    cache.put("c", {"uid": "c", "exp": clock.now + 60})
+
+    assert cache.get("b") is None
+    assert cache.get("a")["uid"] == "a" and cache.get("c")["uid"] == "c"
+    # Tokens that are already expired are not cached
+    cache.put("d", {"uid": "d", "exp": clock.now})
+    assert cache.get("d") is None and len(cache) == 2
+
+
+def test_certificate_refresh_bypasses_the_sdk_http_cache():
+    request = MagicMock()
+    client = MagicMock()
+    client._token_verifier.request = request
+    with patch.object(auth_service.firebase_auth, "_get_client", return_value=client):
+        refresh_certificates()
+
+    assert request.call_args.kwargs["headers"] == {"Cache-Control": "no-cache"}
+    assert "securetoken" in request.call_args.kwargs["url"]
+
+
+def test_installed_sdk_has_the_certificate_cache():
+    # The SDK's auth client needs real credentials: a service account that never calls Google
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    app = firebase_admin.initialize_app(firebase_admin.credentials.Certificate({
+        "type": "service_account",
+        "project_id": "freelingo-test",
+        "private_key_id": "test",
+        "private_key": pem.decode(),
+        "client_email": "test@freelingo-test.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }), name="certificate-cache-test")
+    try:
+        with patch.object(auth_service.firebase_admin, "get_app", return_value=app):
+            request, url = certificate_request()
+    finally:
+        firebase_admin.delete_app(app)
+    assert callable(request) and "securetoken" in url
+
+
+def test_sdk_without_the_certificate_cache_fails_loudly():
+    with patch.object(auth_service.firebase_auth, "_get_client", return_value=object()):
+        with pytest.raises(RuntimeError, match="FIREBASE_CERT_REFRESH_SECONDS=0"):
+            refresh_certificates()
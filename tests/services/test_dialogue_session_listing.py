@@ -0,0 +1,88 @@
+"""
+Tests for session summary columns and keyset-paginated session listing.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from freelingo_agent.models.transcript_model import AiTurn
+from freelingo_agent.services.dialogue_session_service import (
+    list_dialogue_sessions_service, save_dialogue_session_service, session_duration_seconds,
+)
+from freelingo_agent.services.user_session_service import clear_dialogue_in_session, record_turn_in_transcript
+
+AI_TURN = AiTurn.model_validate({
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": []},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": True,
+        },
+    },
+    "ai_reply": {"text": "Bonjour ?", "word_count": 1},
+})
+
+
+def fake_sessions_table(count: int):
+    # Two sessions share each start time so the id tie-breaker is exercised
+    rows = [
+        {"session_id": f"s{i:02d}", "started_at": f"2025-01-{1 + i // 2:02d}T10:00:00+00:00", "ended_at": None,
+         "message_count": 2, "turn_count": 1, "duration_seconds": 60.0}
+        for i in range(count)
+    ]
+
+    def list_page(user_id, limit, before=None):
+        ordered = sorted(rows, key=lambda r: (r["started_at"], r["session_id"]), reverse=True)
+        if before:
+            ordered = [r for r in ordered if (r["started_at"], r["session_id"]) < tuple(before)]
+        return ordered[:limit]
+
+    return list_page
+
+
+def test_listing_walks_all_pages_newest_first():
+    with patch("freelingo_agent.services.dialogue_session_service.list_dialogue_sessions_db", side_effect=fake_sessions_table(7)):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            page = list_dialogue_sessions_service("list_user", limit=3, cursor=cursor)
+            seen += [s["session_id"] for s in page["sessions"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    assert pages == 3
+    assert seen == ["s06", "s05", "s04", "s03", "s02", "s01", "s00"]
+
+
+def test_listing_rejects_malformed_cursor():
+    with pytest.raises(ValueError):
+        list_dialogue_sessions_service("list_user", cursor="not-a-cursor")
+
+
+def test_save_writes_summary_columns():
+    user_id = "summary_user"
+    clear_dialogue_in_session(user_id)
+    record_turn_in_transcript(user_id, "", AI_TURN)
+    record_turn_in_transcript(user_id, "bonjour", AI_TURN)
+    record_turn_in_transcript(user_id, "oui", AI_TURN)
+
+    with patch("freelingo_agent.services.dialogue_session_service.save_dialogue_session_db") as save, \
+         patch("freelingo_agent.services.dialogue_session_service.save_dialogue_turns"):
+        save_dialogue_session_service(user_id, started_at="2025-01-01T10:00:00+00:00", ended_at="2025-01-01T10:05:30")
+
+    kwargs = save.call_args.kwargs
+    assert kwargs["turn_count"] == 2
+    # Two answered AI turns, two replies and the unanswered last AI turn
+    assert kwargs["message_count"] == 5
+    assert kwargs["duration_seconds"] == 330.0
+
+
+def test_session_duration_handles_missing_and_mixed_timestamps():
+    assert session_duration_seconds(None, "2025-01-01T10:00:00Z") is None
+    assert session_duration_seconds("2025-01-01T10:00:00Z", "2025-01-01T10:00:01.5") == 1.5
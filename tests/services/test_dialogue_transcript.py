@@ -0,0 +1,76 @@
+"""
+Tests that run_dialogue_turn keeps the session transcript up to date turn by turn.
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.dialogue_model import DialogueResponse
+from freelingo_agent.services.dialogue_service import run_dialogue_turn
+from freelingo_agent.services.dialogue_session_service import construct_transcript_from_dialogue_history
+from freelingo_agent.services.user_session_service import get_session, clear_dialogue_in_session
+
+
+def dialogue_response(text: str, summary: str) -> DialogueResponse:
+    return DialogueResponse.model_validate({
+        "rationale": {
+            "reasoning_summary": summary,
+            "vocabulary_challenge": {"description": "few verbs", "tags": ["no_verbs"]},
+            "rule_checks": {
+                "used_only_allowed_vocabulary": True,
+                "one_sentence": True,
+                "max_eight_words": True,
+                "no_corrections_or_translations": True,
+            },
+        },
+        "ai_reply": {"text": text, "word_count": len(text.split())},
+    })
+
+
+def agent_replies(*outputs):
+    """Mock get_dialogue_response returning each output in turn, the way llm_service shapes it"""
+    history = []
+
+    async def reply(user_id, known_words, student_response, dialogue_history):
+        output = outputs[len(history)]
+        history.append(student_response)
+        if isinstance(output, DialogueResponse):
+            return output.ai_reply.text, list(history), output.__dict__
+        return output, list(history), {"raw_response": output}
+
+    return AsyncMock(side_effect=reply)
+
+
+@pytest.mark.asyncio
+async def test_turns_are_recorded_from_structured_responses():
+    user_id = "transcript_turn_user"
+    clear_dialogue_in_session(user_id)
+    get_session(user_id).known_words = []
+
+    replies = agent_replies(
+        dialogue_response("Bonjour ?", "open"),
+        dialogue_response("Ça va ?", "ask"),
+        "Au revoir.",
+    )
+    with patch("freelingo_agent.services.dialogue_service.get_dialogue_response", replies), \
+         patch("freelingo_agent.services.dialogue_session_service.turn_writer", AsyncMock()), \
+         patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])):
+        await run_dialogue_turn(user_id, "")
+        assert construct_transcript_from_dialogue_history(user_id).transcript == []
+
+        await run_dialogue_turn(user_id, "bonjour")
+        await run_dialogue_turn(user_id, "oui")
+
+    transcript = construct_transcript_from_dialogue_history(user_id)
+    assert [(t.ai_turn.ai_reply.text, t.user_turn.text) for t in transcript.transcript] == [
+        ("Bonjour ?", "bonjour"),
+        ("Ça va ?", "oui"),
+    ]
+    # Each AI turn keeps its own rationale, not the last response's
+    assert [t.ai_turn.rationale.reasoning_summary for t in transcript.transcript] == ["open", "ask"]
+    # The unstructured last reply waits for an answer with a placeholder rationale
+    pending = get_session(user_id).pending_ai_turn
+    assert pending.ai_reply.text == "Au revoir." and pending.rationale.reasoning_summary == "No rationale available"
+
+    clear_dialogue_in_session(user_id)
+    assert get_session(user_id).transcript == [] and get_session(user_id).pending_ai_turn is None
@@ -0,0 +1,93 @@
+"""
+Tests for per-turn storage and the learner history given to the feedback and planner agents.
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.transcript_model import Transcript, LearnerHistory
+from freelingo_agent.services.dialogue_session_service import save_dialogue_session_service
+from freelingo_agent.services.dialogue_turn_service import build_turn_rows, get_learner_history
+from freelingo_agent.services.llm_service import get_feedback
+from freelingo_agent.services.user_session_service import clear_dialogue_in_session
+
+
+def ai_turn(text: str, tags, one_sentence: bool = True):
+    return {
+        "rationale": {
+            "reasoning_summary": "r",
+            "vocabulary_challenge": {"description": "d", "tags": tags},
+            "rule_checks": {
+                "used_only_allowed_vocabulary": True,
+                "one_sentence": one_sentence,
+                "max_eight_words": True,
+                "no_corrections_or_translations": True,
+            },
+        },
+        "ai_reply": {"text": text, "word_count": len(text.split())},
+    }
+
+
+TRANSCRIPT = Transcript.model_validate({"transcript": [
+    {"ai_turn": ai_turn("Bonjour ?", ["no_verbs"]), "user_turn": {"text": "bonjour madame"}},
+    {"ai_turn": ai_turn("Ça va ? Oui ?", ["no_verbs", "short_vocab"], one_sentence=False), "user_turn": {"text": "oui"}},
+]})
+
+
+def test_turn_rows_flatten_transcript():
+    rows = build_turn_rows("session-1", "turn_user", TRANSCRIPT)
+
+    assert [row["idx"] for row in rows] == [0, 1]
+    assert rows[0]["user_word_count"] == 2
+    assert rows[1]["tags"] == ["no_verbs", "short_vocab"]
+    assert rows[1]["one_sentence"] is False and rows[1]["max_eight_words"] is True
+
+
+def test_session_save_inserts_turns_in_one_batch():
+    clear_dialogue_in_session("turn_user")
+    with patch("freelingo_agent.services.dialogue_session_service.save_dialogue_session_db"), \
+         patch("freelingo_agent.services.dialogue_turn_service.upsert_dialogue_turns_db", return_value=2) as insert:
+        session_id = save_dialogue_session_service("turn_user", transcript=TRANSCRIPT)
+
+    insert.assert_called_once()
+    rows = insert.call_args.args[0]
+    assert len(rows) == 2 and all(row["session_id"] == session_id for row in rows)
+
+
+def test_learner_history_from_turn_queries():
+    summary = {
+        "sessions": 3, "turns": 12, "avg_user_words": 2.3333,
+        "not_allowed_vocabulary": 0, "not_one_sentence": 2, "over_eight_words": 0, "corrections_or_translations": 1,
+    }
+    with patch("freelingo_agent.services.dialogue_turn_service.get_learner_turn_summary_db", return_value=summary) as turn_summary, \
+         patch("freelingo_agent.services.dialogue_turn_service.get_learner_challenge_tag_counts_db", return_value={"no_verbs": 7}):
+        history = get_learner_history("turn_user", exclude_session_id="current")
+
+    assert turn_summary.call_args.args[2] == "current"
+    assert history == LearnerHistory(
+        sessions=3, turns=12, avg_user_words_per_turn=2.33,
+        challenge_tags={"no_verbs": 7},
+        rule_check_failures={"one_sentence": 2, "no_corrections_or_translations": 1},
+    )
+
+    with patch("freelingo_agent.services.dialogue_turn_service.get_learner_turn_summary_db", return_value={"turns": 0}):
+        assert get_learner_history("new_user") is None
+    with patch("freelingo_agent.services.dialogue_turn_service.get_learner_turn_summary_db", side_effect=RuntimeError("db down")):
+        assert get_learner_history("turn_user") is None
+
+
+@pytest.mark.asyncio
+async def test_feedback_prompt_includes_learner_history():
+    result = MagicMock()
+    result.output = FeedbackAgentOutput(strengths=["ok"], mistakes=[], conversation_examples=[])
+    agent = MagicMock()
+    agent.run = AsyncMock(return_value=result)
+    history = LearnerHistory(sessions=2, turns=9, avg_user_words_per_turn=1.5, challenge_tags={"no_verbs": 4})
+
+    with patch("freelingo_agent.services.llm_service.feedback_agent", agent):
+        await get_feedback(transcript=TRANSCRIPT, known_words=["bonjour"], learner_history=history)
+
+    prompt = agent.run.call_args.kwargs["user_prompt"]
+    assert "Learner history (earlier sessions):" in prompt
+    assert '"no_verbs": 4' in prompt
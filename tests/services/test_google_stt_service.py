@@ -0,0 +1,96 @@
+"""
+Tests for the streaming STT bridge: the blocking gRPC stream runs on a worker
+thread fed from an async audio stream, without blocking the event loop, and
+stops when the caller is cancelled.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import patch
+
+from freelingo_agent.services.google_stt_service import GoogleSTTService
+
+
+class FakeSpeechClient:
+    """Sync streaming_recognize like the real client: consumes requests and blocks while recognizing"""
+
+    def __init__(self):
+        self.received = []
+        self.finished = threading.Event()
+
+    def streaming_recognize(self, config, requests):
+        try:
+            for request in requests:
+                # Blocking work per chunk, as a gRPC call would do
+                time.sleep(0.01)
+                self.received.append(request.audio_content)
+        finally:
+            self.finished.set()
+        text = b"".join(self.received).decode()
+        return iter([SimpleNamespace(results=[SimpleNamespace(is_final=True, alternatives=[SimpleNamespace(transcript=text)])])])
+
+
+@pytest.fixture
+def stt():
+    client = FakeSpeechClient()
+    with patch("freelingo_agent.services.google_stt_service.speech.SpeechClient", return_value=client):
+        service = GoogleSTTService(max_streams=4)
+    yield service, client
+    service._executor.shutdown(wait=False)
+
+
+@pytest.mark.asyncio
+async def test_transcribes_without_blocking_the_event_loop(stt):
+    service, client = stt
+    queue = asyncio.Queue(maxsize=2)
+
+    async def audio():
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def send():
+        for word in ("bon", "jour"):
+            # The bounded queue holds the sender back until the recognizer takes the chunk
+            await queue.put(word.encode())
+        await queue.put(None)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while not client.finished.is_set():
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    transcript, _, _ = await asyncio.gather(service.stream_transcribe(audio()), send(), ticker())
+    assert transcript == "bonjour"
+    assert client.received == [b"bon", b"jour"]
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_cancelled_transcription_releases_its_thread(stt):
+    service, client = stt
+    never = asyncio.Event()
+
+    async def audio():
+        yield b"bon"
+        await never.wait()
+        yield b"jour"
+
+    task = asyncio.create_task(service.stream_transcribe(audio()))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The request iterator ends, so the blocking call returns instead of waiting for audio forever
+    assert await asyncio.get_running_loop().run_in_executor(None, client.finished.wait, 2)
+    assert client.received == [b"bon"]
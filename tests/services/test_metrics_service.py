@@ -0,0 +1,72 @@
+"""
+Tests that workflow runs export node latency, fallback, referee and loop-depth metrics.
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+from prometheus_client import REGISTRY
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.services.metrics_service import render_metrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def decision(is_valid: bool, violations) -> RefereeAgentOutput:
+    return RefereeAgentOutput(
+        is_valid=is_valid,
+        violations=violations,
+        rationale={
+            "reasoning_summary": "checked",
+            "chain_checks": {
+                "feedback_transcript_alignment": is_valid,
+                "planner_feedback_incorporation": True,
+                "new_words_plan_alignment": True,
+                "overall_chain_coherence": True,
+            },
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_workflow_run_records_metrics():
+    service = GraphWorkflowService(checkpoint_path=None)
+    before = {
+        "feedback_runs": sample("freelingo_workflow_node_duration_seconds_count", node="FEEDBACK"),
+        "planner_fallbacks": sample("freelingo_workflow_fallbacks_total", node="PLANNER", reason="agent_error"),
+        "violations": sample("freelingo_referee_violations_total", violation="feedback_misaligned_with_transcript"),
+        "valid_runs": sample("freelingo_workflow_runs_total", outcome="valid"),
+        "rounds_sum": sample("freelingo_workflow_referee_rounds_sum"),
+    }
+
+    decisions = iter([decision(False, ["feedback_misaligned_with_transcript"]), decision(True, [])])
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback",
+               AsyncMock(return_value=FeedbackAgentOutput(strengths=["ok"], mistakes=[], conversation_examples=[]))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(side_effect=RuntimeError("planner down"))), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words",
+               AsyncMock(return_value=WordSuggestion(new_words=[], usages={}))), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(side_effect=lambda **kwargs: next(decisions))):
+        final_state = await service.run_workflow(GraphState(user_id="metrics_user", transcript=Transcript(transcript=[])))
+
+    assert final_state.last_referee_decision.is_valid
+    assert sample("freelingo_workflow_node_duration_seconds_count", node="FEEDBACK") == before["feedback_runs"] + 2
+    assert sample("freelingo_workflow_fallbacks_total", node="PLANNER", reason="agent_error") == before["planner_fallbacks"] + 2
+    assert sample("freelingo_referee_violations_total", violation="feedback_misaligned_with_transcript") == before["violations"] + 1
+    assert sample("freelingo_workflow_runs_total", outcome="valid") == before["valid_runs"] + 1
+    assert sample("freelingo_workflow_referee_rounds_sum") == before["rounds_sum"] + 2
+
+
+def test_render_metrics_exposes_prometheus_text():
+    body, content_type = render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b"freelingo_workflow_node_duration_seconds" in body
+    assert b"freelingo_http_requests_total" in body
@@ -0,0 +1,182 @@
+"""
+Tests for batch re-analysis of stored dialogue sessions.
+"""
+
+import json
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.services.reanalysis_service import reanalyze_sessions, transcript_from_messages
+
+AI_TURN = {
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": []},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": True,
+        },
+    },
+    "ai_reply": {"text": "Bonjour ?", "word_count": 1},
+}
+
+
+def stored_rows(count: int):
+    return [
+        {
+            "id": f"session-{i:03d}",
+            "user_id": f"user-{i % 2}",
+            "started_at": "2025-01-01T10:00:00Z",
+            "messages": {"transcript": [{"ai_turn": AI_TURN, "user_turn": {"text": f"bonjour {i}"}}]},
+        }
+        for i in range(count)
+    ]
+
+
+def fake_fetch_page(rows):
+    calls = []
+
+    def fetch_page(page_size, after_id):
+        calls.append(after_id)
+        remaining = [row for row in rows if after_id is None or row["id"] > after_id]
+        return remaining[:page_size]
+
+    return fetch_page, calls
+
+
+def mocked_agents():
+    referee = RefereeAgentOutput(
+        is_valid=True,
+        violations=[],
+        rationale={
+            "reasoning_summary": "ok",
+            "chain_checks": {
+                "feedback_transcript_alignment": True,
+                "planner_feedback_incorporation": True,
+                "new_words_plan_alignment": True,
+                "overall_chain_coherence": True,
+            },
+        },
+    )
+    feedback = AsyncMock(return_value=FeedbackAgentOutput(strengths=["ok"], mistakes=[], conversation_examples=[]))
+    return feedback, [
+        patch("freelingo_agent.services.graph_workflow_service.get_feedback", feedback),
+        patch("freelingo_agent.services.graph_workflow_service.get_plan",
+              AsyncMock(return_value=PlannerAgentOutput(session_objectives=["a"], vocab_gaps=["b"]))),
+        patch("freelingo_agent.services.graph_workflow_service.suggest_new_words",
+              AsyncMock(return_value=WordSuggestion(new_words=["avec"], usages={}))),
+        patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=referee)),
+    ]
+
+
+def test_transcript_from_stored_transcript_and_legacy_messages():
+    stored = Transcript.model_validate({"transcript": [{"ai_turn": AI_TURN, "user_turn": {"text": "salut"}}]})
+    assert transcript_from_messages(stored.model_dump()) == stored
+
+    legacy = [
+        {"id": "1", "sender": "ai", "text": "Bonjour ?", "agent_response": AI_TURN},
+        {"id": "2", "sender": "user", "text": "bonjour"},
+        {"id": "3", "sender": "ai", "text": "Ça va ?", "agent_response": None},
+        {"id": "4", "sender": "user", "text": "oui"},
+    ]
+    transcript = transcript_from_messages(legacy)
+    assert [turn.user_turn.text for turn in transcript.transcript] == ["bonjour", "oui"]
+    assert transcript.transcript[0].ai_turn.rationale.reasoning_summary == "greet"
+    assert transcript.transcript[1].ai_turn.ai_reply.text == "Ça va ?"
+
+    with pytest.raises(ValueError):
+        transcript_from_messages("not a transcript")
+
+
+@pytest.mark.asyncio
+async def test_reanalyze_writes_results_and_resumes(tmp_path):
+    output = tmp_path / "results.ndjson"
+    rows = stored_rows(7)
+    fetch_page, calls = fake_fetch_page(rows)
+    known_words = {"user-0": ["bonjour"], "user-1": ["salut", "oui"]}
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    feedback, patches = mocked_agents()
+    for p in patches:
+        p.start()
+    try:
+        summary = await reanalyze_sessions(
+            str(output), fetch_page, lambda user_id: known_words[user_id],
+            service=service, concurrency=3, page_size=3, limit=5,
+        )
+        assert summary["processed"] == 5 and summary["failed"] == 0
+        # Keyset pagination: each page starts after the last id of the previous one
+        assert calls == [None, "session-002"]
+
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert sorted(r["session_id"] for r in records) == [f"session-{i:03d}" for i in range(5)]
+        assert all(r["is_valid"] and r["new_words"]["new_words"] == ["avec"] and r["turns"] == 1 for r in records)
+        assert len({r["prompt_version"] for r in records}) == 1
+        assert {tuple(c.kwargs["known_words"]) for c in feedback.await_args_list} == {tuple(w) for w in known_words.values()}
+
+        # Running again with the same output only processes what is left; the limit counts new sessions only
+        summary = await reanalyze_sessions(
+            str(output), fetch_page, lambda user_id: known_words[user_id],
+            service=service, concurrency=3, page_size=3, limit=1,
+        )
+        assert summary["processed"] == 1 and summary["skipped"] == 5
+        summary = await reanalyze_sessions(
+            str(output), fetch_page, lambda user_id: known_words[user_id],
+            service=service, concurrency=3, page_size=3,
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert summary["processed"] == 1 and summary["skipped"] == 6
+    assert feedback.await_count == 7
+    assert len(output.read_text().splitlines()) == 7
+
+
+@pytest.mark.asyncio
+async def test_reanalyze_records_unreadable_sessions_as_failed(tmp_path):
+    output = tmp_path / "results.ndjson"
+    rows = stored_rows(2)
+    rows[0]["messages"] = "corrupt"
+    fetch_page, _ = fake_fetch_page(rows)
+
+    _, patches = mocked_agents()
+    for p in patches:
+        p.start()
+    try:
+        summary = await reanalyze_sessions(
+            str(output), fetch_page, lambda user_id: [],
+            service=GraphWorkflowService(checkpoint_path=None), concurrency=2,
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert summary["processed"] == 2 and summary["failed"] == 1
+    records = {r["session_id"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert "Unsupported messages format" in records["session-000"]["error"]
+    assert records["session-001"]["is_valid"]
+
+    # Failed sessions are not treated as done: a resumed run retries only them
+    rows[0]["messages"] = stored_rows(1)[0]["messages"]
+    for p in patches:
+        p.start()
+    try:
+        summary = await reanalyze_sessions(
+            str(output), fetch_page, lambda user_id: [],
+            service=GraphWorkflowService(checkpoint_path=None), concurrency=2,
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert summary["processed"] == 1 and summary["skipped"] == 1 and summary["failed"] == 0
@@ -0,0 +1,112 @@
+"""
+Tests for the compact session codec: exact round trips of pydantic-ai message
+histories and session state, and system prompts stored once.
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from pydantic_ai.messages import (
+    BinaryContent, ModelMessagesTypeAdapter, ModelRequest, ModelResponse, RetryPromptPart, SystemPromptPart,
+    TextPart, ToolCallPart, ToolReturnPart, UserPromptPart,
+)
+
+from freelingo_agent.models.transcript_model import AiTurn, TranscriptTurn, UserTurn
+from freelingo_agent.models.user_session import UserSession
+from freelingo_agent.models.words_model import Word
+from freelingo_agent.services import session_codec
+from freelingo_agent.services.session_codec import decode_session, encode_session
+
+PROMPT = "Tu es un partenaire de conversation. Mots connus : " + json.dumps([f"mot{i}" for i in range(500)])
+
+AI_TURN = AiTurn.model_validate({
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": ["short_vocab"]},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": False,
+        },
+    },
+    "ai_reply": {"text": "Bonjour, ça va ?", "word_count": 3},
+})
+
+
+def run_messages(i: int):
+    """One agent run as pydantic-ai records it: the system prompt comes again with every run"""
+    args = {"rationale": AI_TURN.rationale.model_dump(), "ai_reply": {"text": f"Phrase {i} ?", "word_count": 2}}
+    return [
+        ModelRequest(parts=[SystemPromptPart(content=PROMPT), UserPromptPart(content=f"réponse {i}")]),
+        ModelResponse(parts=[ToolCallPart(tool_name="final_result", args=json.dumps(args), tool_call_id=f"call-{i}")], model_name="gpt-4o-mini"),
+        ModelRequest(parts=[ToolReturnPart(tool_name="final_result", content="Final result processed.", tool_call_id=f"call-{i}")]),
+    ]
+
+
+def long_session(turns: int) -> UserSession:
+    history = [message for i in range(turns) for message in run_messages(i)]
+    return UserSession(
+        user_id="learner",
+        session_id="live-1",
+        dialogue_history=history,
+        transcript=[TranscriptTurn(ai_turn=AI_TURN, user_turn=UserTurn(text=f"réponse {i}")) for i in range(turns)],
+        pending_ai_turn=AI_TURN,
+        last_agent_response={"ai_reply": {"text": "Phrase ?", "word_count": 1}},
+        started_at=datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc),
+    )
+
+
+def test_every_message_kind_round_trips_like_the_pydantic_ai_adapter():
+    history = run_messages(0) + [
+        ModelRequest(parts=[UserPromptPart(content=["Regarde", BinaryContent(data=b"\x89PNG\x00", media_type="image/png")])]),
+        ModelResponse(parts=[TextPart(content="Une image !"), ToolCallPart(tool_name="lookup", args={"word": "chat"})]),
+        ModelRequest(parts=[ToolReturnPart(tool_name="lookup", content={"fr": "chat", "en": ["cat"]}, tool_call_id="t1")]),
+        ModelRequest(parts=[RetryPromptPart(content="Use only known words", tool_name="final_result", tool_call_id="call-0")]),
+    ]
+    session = UserSession(user_id="learner", dialogue_history=history)
+
+    for compression in ("none", "zlib"):
+        decoded = decode_session(encode_session(session, compression=compression)).dialogue_history
+        assert decoded == history
+        assert ModelMessagesTypeAdapter.dump_json(decoded) == ModelMessagesTypeAdapter.dump_json(history)
+
+
+def test_session_state_round_trips_and_exclusions_are_left_empty():
+    session = long_session(3)
+    session.known_words = [Word(id="w1", user_id="learner", word="chat", translation="cat")]
+    session.dialogue_agent = object()
+
+    full = decode_session(encode_session(session))
+    assert full.model_dump(exclude={"dialogue_agent"}) == session.model_dump(exclude={"dialogue_agent"})
+    assert full.dialogue_agent is None
+
+    lean = decode_session(encode_session(session, exclude={"known_words"}))
+    assert lean.known_words == [] and lean.transcript == session.transcript
+
+
+def test_system_prompt_is_stored_once_and_payload_is_compact():
+    session = long_session(50)
+
+    raw = encode_session(session, compression="none")
+    assert raw.count(PROMPT.encode()) == 1
+    compressed = encode_session(session)
+    json_size = len(session.model_dump_json(exclude={"dialogue_agent"}))
+    assert len(compressed) * 20 < json_size
+
+
+def test_zstd_when_installed():
+    if session_codec.zstandard is None:
+        with pytest.raises(RuntimeError):
+            encode_session(long_session(1), compression="zstd")
+        return
+    payload = encode_session(long_session(5), compression="zstd")
+    assert payload[0] == session_codec.ZSTD
+    assert decode_session(payload).transcript == long_session(5).transcript
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        decode_session(b"\x07" + b"garbage")
@@ -0,0 +1,127 @@
+"""
+Tests for session snapshots: sessions written to disk survive a restart of
+the process and are restored on the user's next request, with the idle TTL
+still applying to them.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from freelingo_agent.models.transcript_model import AiTurn, TranscriptTurn, UserTurn
+from freelingo_agent.services.user_session_service import SessionSnapshots, SessionStore
+
+AI_TURN = AiTurn.model_validate({
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": []},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": True,
+        },
+    },
+    "ai_reply": {"text": "Bonjour, tu vas bien ?", "word_count": 4},
+})
+
+
+def process(directory) -> SessionStore:
+    """One run of the API process: a fresh store over the snapshot directory"""
+    store = SessionStore(max_sessions=100, max_bytes=10 ** 9, ttl_seconds=600, snapshots=SessionSnapshots(str(directory)))
+    evicted = []
+    store.add_eviction_hook(lambda session: evicted.append(session.user_id))
+    store.evicted = evicted
+    return store
+
+
+def live_session(store: SessionStore, user_id: str, idle_seconds: float = 0):
+    session = store.get(user_id)
+    session.session_id = f"live-{user_id}"
+    session.started_at = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+    session.dialogue_history = [
+        ModelRequest(parts=[SystemPromptPart(content="Known words: chat"), UserPromptPart(content="")]),
+        ModelResponse(parts=[TextPart(content="Bonjour, tu vas bien ?")]),
+    ]
+    session.transcript = [TranscriptTurn(ai_turn=AI_TURN, user_turn=UserTurn(text="oui")) for _ in range(2)]
+    session.pending_ai_turn = AI_TURN
+    session.updated_at = datetime.now(timezone.utc) - timedelta(seconds=idle_seconds)
+    store.resize(user_id)
+    return session
+
+
+def test_sessions_survive_a_restart_and_are_restored_lazily(tmp_path):
+    before = process(tmp_path)
+    session = live_session(before, "learner")
+    before.get("idle-without-dialogue")
+    assert before.snapshot() == 2
+    # Nothing changed since: nothing is rewritten
+    assert before.snapshot() == 0
+
+    after = process(tmp_path)
+    assert "learner" not in after
+    restored = after.get("learner")
+    assert restored.model_dump(exclude={"dialogue_agent", "known_words"}) == session.model_dump(exclude={"dialogue_agent", "known_words"})
+    assert after.stats()["restored"] == 1
+    assert after.snapshot() == 0
+
+    restored.transcript.append(TranscriptTurn(ai_turn=AI_TURN, user_turn=UserTurn(text="merci")))
+    restored.updated_at = datetime.now(timezone.utc)
+    assert after.snapshot() == 1
+    assert len(process(tmp_path).get("learner").transcript) == 3
+
+
+def test_dropped_sessions_lose_their_snapshot(tmp_path):
+    before = process(tmp_path)
+    live_session(before, "evicted")
+    live_session(before, "removed")
+    before.snapshot()
+    before.max_sessions = 2
+    before.get("someone-else")
+    before.remove("removed")
+
+    assert before.evicted == ["evicted"]
+    after = process(tmp_path)
+    assert after.get("evicted").session_id is None
+    assert after.get("removed").session_id is None
+    assert after.stats()["restored"] == 0
+
+
+def test_snapshot_idle_past_the_ttl_is_ended_instead_of_restored(tmp_path):
+    before = process(tmp_path)
+    live_session(before, "learner", idle_seconds=700)
+    live_session(before, "restored-with-its-idle-time", idle_seconds=500)
+    before.snapshot()
+
+    after = process(tmp_path)
+    assert after.get("learner").session_id is None
+    assert after.evicted == ["learner"]
+    assert after.get("restored-with-its-idle-time").session_id == "live-restored-with-its-idle-time"
+    assert not os.path.exists(after.snapshots._path("learner"))
+
+
+def test_sweep_ends_snapshots_of_users_who_did_not_come_back(tmp_path):
+    before = process(tmp_path)
+    live_session(before, "gone")
+    live_session(before, "back")
+    before.snapshot()
+    old = time.time() - 700
+    for user_id in ("gone", "back"):
+        os.utime(before.snapshots._path(user_id), (old, old))
+
+    after = process(tmp_path)
+    after.get("back")
+    assert after.sweep() == 1
+    assert after.evicted == ["gone"]
+    assert os.listdir(tmp_path) == [os.path.basename(after.snapshots._path("back"))]
+
+
+def test_unreadable_snapshot_is_dropped(tmp_path):
+    store = process(tmp_path)
+    with open(store.snapshots._path("learner"), "wb") as f:
+        f.write(b"\x07not a session")
+
+    assert store.get("learner").session_id is None
+    assert os.listdir(tmp_path) == []
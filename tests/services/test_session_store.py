@@ -0,0 +1,162 @@
+"""
+Tests for the bounded in-memory session store: idle TTL, LRU limits on count
+and approximate size, and the eviction hook that saves live dialogue.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import patch
+
+from freelingo_agent.db.repository import set_repository
+from freelingo_agent.db.sqlite_repository import SqliteRepository
+from freelingo_agent.models.transcript_model import AiTurn, TranscriptTurn, UserTurn
+from freelingo_agent.services import dialogue_session_service
+from freelingo_agent.services.dialogue_session_service import persist_evicted_session
+from freelingo_agent.services.user_session_service import SessionStore, estimate_session_bytes
+
+AI_TURN = AiTurn.model_validate({
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": []},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": True,
+        },
+    },
+    "ai_reply": {"text": "Bonjour, tu vas bien ?", "word_count": 4},
+})
+
+
+class FakeClock:
+    """Stands in for the time module of user_session_service"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("freelingo_agent.services.user_session_service.time", fake):
+        yield fake
+
+
+def store_with_hook(**limits):
+    store = SessionStore(**{"max_sessions": 100, "max_bytes": 10 ** 9, "ttl_seconds": 60, **limits})
+    evicted = []
+    store.add_eviction_hook(lambda session: evicted.append(session.user_id))
+    return store, evicted
+
+
+def add_turns(store: SessionStore, user_id: str, count: int) -> None:
+    session = store.get(user_id)
+    session.transcript += [TranscriptTurn(ai_turn=AI_TURN, user_turn=UserTurn(text="oui, très bien merci")) for _ in range(count)]
+    store.resize(user_id)
+
+
+def test_idle_sessions_expire(clock):
+    store, evicted = store_with_hook()
+    first = store.get("a")
+    clock.now += 30
+    store.get("b")
+    clock.now += 40
+
+    # a has been idle 70s: the next get replaces it with a new session
+    assert store.get("a") is not first
+    assert evicted == ["a"]
+    clock.now += 61
+    assert store.sweep() == 2
+    assert evicted == ["a", "b", "a"] and len(store) == 0
+    assert store.stats()["evictions"] == {"idle": 3, "sessions": 0, "bytes": 0}
+
+
+def test_least_recently_used_go_first(clock):
+    store, evicted = store_with_hook(max_sessions=2)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert evicted == ["b"]
+    assert "a" in store and "c" in store
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]["sessions"]) == (1, 3, 1)
+
+
+def test_size_limit_counts_dialogue_and_spares_the_session_in_use(clock):
+    empty = estimate_session_bytes(SessionStore().get("x"))
+    store, evicted = store_with_hook(max_bytes=3 * empty + 1500)
+    for user_id in ("a", "b", "c"):
+        store.get(user_id)
+    assert store.stats()["bytes"] == 3 * empty
+
+    add_turns(store, "a", 2)
+    # a grew past the limit; b (least recently used) makes room
+    assert evicted == ["b"]
+    assert store.stats()["bytes"] == estimate_session_bytes(store.get("a")) + empty
+
+    add_turns(store, "a", 50)
+    # Alone over the limit: a stays, everything else goes
+    assert evicted == ["b", "c"] and len(store) == 1
+
+
+def test_failing_hook_does_not_stop_eviction(clock):
+    store, evicted = store_with_hook(max_sessions=1)
+    store._eviction_hooks.insert(0, lambda session: 1 / 0)
+    store.get("a")
+    store.get("b")
+    assert evicted == ["a"] and len(store) == 1
+
+
+@pytest.fixture
+def sqlite_backend():
+    repository = SqliteRepository(":memory:")
+    set_repository(repository)
+    yield repository
+    set_repository(None)
+    repository.close()
+
+
+def live_session(store: SessionStore, user_id: str, turns: int):
+    session = store.get(user_id)
+    session.session_id = f"live-{user_id}"
+    session.started_at = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+    add_turns(store, user_id, turns)
+    session.pending_ai_turn = AI_TURN
+    session.updated_at = datetime(2025, 1, 1, 10, 4, tzinfo=timezone.utc)
+    return session
+
+
+def test_evicted_live_session_is_saved_as_ended(clock, sqlite_backend):
+    store = SessionStore(max_sessions=10, max_bytes=10 ** 9, ttl_seconds=60)
+    store.add_eviction_hook(persist_evicted_session)
+    live_session(store, "learner", 3)
+    store.get("idle-without-dialogue")
+    clock.now += 120
+
+    assert store.sweep() == 2
+    saved = sqlite_backend.get_dialogue_session("live-learner")
+    assert saved["ended_at"].startswith("2025-01-01T10:04")
+    assert (saved["turn_count"], saved["message_count"], saved["duration_seconds"]) == (3, 7, 240.0)
+    assert len(saved["messages"]["transcript"]) == 3
+    rows = sqlite_backend._query("select count(*) as n from dialogue_turns where session_id = ?", ("live-learner",))
+    assert rows[0]["n"] == 3
+
+
+@pytest.mark.asyncio
+async def test_eviction_on_the_event_loop_saves_in_the_background(clock, sqlite_backend):
+    store = SessionStore(max_sessions=1, max_bytes=10 ** 9, ttl_seconds=60)
+    store.add_eviction_hook(persist_evicted_session)
+    live_session(store, "learner", 2)
+
+    store.get("someone-else")
+    await asyncio.gather(*dialogue_session_service._evicted_session_saves)
+
+    assert sqlite_backend.get_dialogue_session("live-learner")["turn_count"] == 2
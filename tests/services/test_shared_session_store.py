@@ -0,0 +1,249 @@
+"""
+Tests for sessions shared between API workers through a Redis backend
+(fakeredis stands in for the server): serialization, optimistic concurrency,
+and dialogue turns of one user served by different workers.
+"""
+
+import time
+
+import firebase_admin
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, ToolCallPart, UserPromptPart
+
+from freelingo_agent.db.repository import set_repository
+from freelingo_agent.db.sqlite_repository import SqliteRepository
+from freelingo_agent.models.dialogue_model import DialogueResponse
+from freelingo_agent.models.user import User
+from freelingo_agent.models.words_model import Word
+from freelingo_agent.services.dialogue_service import run_dialogue_turn
+from freelingo_agent.services.turn_writer_service import TurnWriter
+from freelingo_agent.services.user_session_service import (
+    RedisSessionBackend, SessionConflictError, SessionStore, get_session,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+# auth_service initializes Firebase from a service account file unless an app exists
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(firebase_admin.credentials.ApplicationDefault(), {"projectId": "freelingo-test"})
+
+from freelingo_agent.api.dialogue import save_end_dialogue_session
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def worker(redis_client, ttl_seconds: float = 600) -> SessionStore:
+    """One API process: its own local cache in front of the shared Redis"""
+    return SessionStore(max_sessions=100, max_bytes=10 ** 9, ttl_seconds=ttl_seconds, backend=RedisSessionBackend(client=redis_client, ttl_seconds=ttl_seconds))
+
+
+async def reply(user_id, known_words, student_response, dialogue_history):
+    response = dialogue_response(f"Réponse {len(dialogue_history) // 2 + 1}")
+    history = dialogue_history + [
+        ModelRequest(parts=[UserPromptPart(content=student_response)]),
+        ModelResponse(parts=[TextPart(content=response.ai_reply.text)]),
+    ]
+    return response.ai_reply.text, history, response.__dict__
+
+
+def dialogue_response(text: str) -> DialogueResponse:
+    return DialogueResponse.model_validate({
+        "rationale": {
+            "reasoning_summary": "r",
+            "vocabulary_challenge": {"description": "d", "tags": ["short_vocab"]},
+            "rule_checks": {
+                "used_only_allowed_vocabulary": True,
+                "one_sentence": True,
+                "max_eight_words": True,
+                "no_corrections_or_translations": True,
+            },
+        },
+        "ai_reply": {"text": text, "word_count": len(text.split())},
+    })
+
+
+def test_session_round_trips_without_process_local_state(redis_client):
+    first, second = worker(redis_client), worker(redis_client)
+    session, version = first.refresh("learner")
+    assert version == 0
+    session.session_id = "live-1"
+    session.known_words = [Word(id="w1", user_id="learner", word="chat", translation="cat")]
+    session.dialogue_agent = object()
+    session.dialogue_history = [
+        ModelRequest(parts=[SystemPromptPart(content="Known words: chat"), UserPromptPart(content="")]),
+        ModelResponse(parts=[ToolCallPart(tool_name="final_result", args={"ai_reply": {"text": "Salut"}}, tool_call_id="c1")], model_name="gpt-4o-mini"),
+    ]
+    assert first.commit(session, version) == 1
+
+    loaded, loaded_version = second.refresh("learner")
+    assert loaded_version == 1
+    assert loaded.session_id == "live-1"
+    assert loaded.dialogue_history == session.dialogue_history
+    # The agent is rebuilt and the words reloaded by each worker
+    assert loaded.dialogue_agent is None and loaded.known_words == []
+
+
+def test_concurrent_save_conflicts(redis_client):
+    first, second = worker(redis_client), worker(redis_client)
+    mine, version = first.refresh("learner")
+    theirs, their_version = second.refresh("learner")
+    second.commit(theirs, their_version)
+
+    with pytest.raises(SessionConflictError):
+        first.commit(mine, version)
+    # After reloading the newer version the save goes through
+    mine, version = first.refresh("learner")
+    assert (version, first.commit(mine, version)) == (1, 2)
+
+
+def test_cached_copy_is_reused_until_another_worker_saves(redis_client):
+    first, second = worker(redis_client), worker(redis_client)
+    session, version = first.refresh("learner")
+    session.dialogue_agent = agent = object()
+    first.commit(session, version)
+
+    cached, _ = first.refresh("learner")
+    assert cached is session and cached.dialogue_agent is agent
+
+    other, other_version = second.refresh("learner")
+    second.commit(other, other_version)
+    reloaded, _ = first.refresh("learner")
+    assert reloaded is not session and reloaded.dialogue_agent is None
+
+
+@pytest.mark.asyncio
+async def test_turns_of_one_user_can_hit_different_workers(redis_client):
+    workers = [worker(redis_client), worker(redis_client)]
+    writer = TurnWriter(batch_size=100, flush_interval=60, max_pending=100, write_sessions=lambda rows: None, write_turns=lambda rows: None)
+
+    with patch("freelingo_agent.services.dialogue_session_service.turn_writer", writer), \
+         patch("freelingo_agent.services.dialogue_service.get_dialogue_response", AsyncMock(side_effect=reply)), \
+         patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])):
+        for i, message in enumerate(["", "bonjour", "oui", "merci"]):
+            with patch("freelingo_agent.services.user_session_service.session_store", workers[i % 2]):
+                ai_message, _ = await run_dialogue_turn("learner", message)
+            assert ai_message == f"Réponse {i + 1}"
+
+        with patch("freelingo_agent.services.user_session_service.session_store", workers[1]):
+            session = get_session("learner")
+    await writer.close()
+
+    assert [turn.user_turn.text for turn in session.transcript] == ["bonjour", "oui", "merci"]
+    assert session.pending_ai_turn.ai_reply.text == "Réponse 4"
+    assert len(session.dialogue_history) == 8
+    assert session.session_id is not None
+
+
+@pytest.mark.asyncio
+async def test_turn_lost_to_a_conflict_writes_no_rows(redis_client):
+    mine, theirs = worker(redis_client), worker(redis_client)
+    sessions, turns = [], []
+    writer = TurnWriter(batch_size=100, flush_interval=60, max_pending=100, write_sessions=sessions.extend, write_turns=turns.extend)
+
+    async def reply_while_another_worker_saves(user_id, known_words, student_response, dialogue_history):
+        other, version = theirs.refresh(user_id)
+        theirs.commit(other, version)
+        response = dialogue_response("Salut")
+        return response.ai_reply.text, dialogue_history, response.__dict__
+
+    with patch("freelingo_agent.services.dialogue_session_service.turn_writer", writer), \
+         patch("freelingo_agent.services.user_session_service.session_store", mine), \
+         patch("freelingo_agent.services.dialogue_service.get_dialogue_response", AsyncMock(side_effect=reply_while_another_worker_saves)), \
+         patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])):
+        with pytest.raises(SessionConflictError):
+            await run_dialogue_turn("learner", "")
+    await writer.close()
+
+    # The live session this turn opened was never saved, so neither is its row
+    assert sessions == [] and turns == []
+
+
+@pytest.mark.asyncio
+async def test_ended_session_is_saved_before_the_workflow_runs(redis_client):
+    mine, other_worker = worker(redis_client), worker(redis_client)
+    repository = SqliteRepository(":memory:")
+    set_repository(repository)
+    writer = TurnWriter(batch_size=100, flush_interval=60, max_pending=100)
+    seen_by_other_worker = []
+
+    async def workflow(workflow_service, state):
+        # Meanwhile another worker (a new turn, or a retried end) sees the session as ended
+        session, _ = other_worker.refresh(state.user_id)
+        seen_by_other_worker.append((session.last_ended_session_id, session.session_id, session.dialogue_history))
+        return None
+
+    try:
+        with patch("freelingo_agent.services.dialogue_session_service.turn_writer", writer), \
+             patch("freelingo_agent.services.user_session_service.session_store", mine), \
+             patch("freelingo_agent.services.dialogue_service.get_dialogue_response", AsyncMock(side_effect=reply)), \
+             patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])), \
+             patch("freelingo_agent.services.words_service.fetch_known_words_async", AsyncMock(return_value=[])), \
+             patch("freelingo_agent.api.dialogue.run_session_workflow", AsyncMock(side_effect=workflow)):
+            for message in ["", "bonjour"]:
+                await run_dialogue_turn("learner", message)
+            ended = await save_end_dialogue_session("learner", current_user=User(user_id="learner", email="learner@example.com"))
+        await writer.close()
+    finally:
+        set_repository(None)
+        repository.close()
+
+    assert ended.status == "saved"
+    assert seen_by_other_worker == [(ended.session_id, None, [])]
+
+
+async def abandon_live_session(store: SessionStore) -> None:
+    """Two turns of a live dialogue through store, then no more requests"""
+    writer = TurnWriter(batch_size=100, flush_interval=60, max_pending=100, write_sessions=lambda rows: None, write_turns=lambda rows: None)
+    with patch("freelingo_agent.services.dialogue_session_service.turn_writer", writer), \
+         patch("freelingo_agent.services.user_session_service.session_store", store), \
+         patch("freelingo_agent.services.dialogue_service.get_dialogue_response", AsyncMock(side_effect=reply)), \
+         patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])):
+        for message in ["", "bonjour"]:
+            await run_dialogue_turn("learner", message)
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_sweep_closes_sessions_abandoned_in_the_shared_store(redis_client):
+    served, sweeping = worker(redis_client, ttl_seconds=0.2), worker(redis_client, ttl_seconds=0.2)
+    closed = []
+    for store in (served, sweeping):
+        store.add_eviction_hook(closed.append)
+    await abandon_live_session(served)
+
+    assert sweeping.sweep() == 0
+    time.sleep(0.3)
+    # Any worker's sweeper closes it, once
+    assert sweeping.sweep() == 1
+    # The serving worker only drops its cached copy
+    served.sweep()
+    assert "learner" not in served
+    assert len(closed) == 1
+    assert closed[0].session_id is not None
+    assert [turn.user_turn.text for turn in closed[0].transcript] == ["bonjour"]
+    assert not redis_client.exists("freelingo:session:learner")
+
+
+@pytest.mark.asyncio
+async def test_returning_user_closes_an_abandoned_session_not_yet_swept(redis_client):
+    store = worker(redis_client, ttl_seconds=0.2)
+    closed = []
+    store.add_eviction_hook(closed.append)
+    await abandon_live_session(store)
+    live_session_id = get_session_id(store)
+
+    time.sleep(0.3)
+    session, version = store.refresh("learner")
+    assert (session.session_id, session.transcript, version) == (None, [], 0)
+    assert [s.session_id for s in closed] == [live_session_id]
+    assert store.sweep() == 0
+
+
+def get_session_id(store: SessionStore) -> str:
+    with patch("freelingo_agent.services.user_session_service.session_store", store):
+        return get_session("learner").session_id
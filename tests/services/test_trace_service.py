@@ -0,0 +1,100 @@
+"""
+Tests for per-run workflow timelines exported in Chrome trace format.
+"""
+
+import json
+
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services import trace_service
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+
+
+def agent_returning(output):
+    result = MagicMock()
+    result.output = output
+    result.usage.return_value.total_tokens = 120
+    agent = MagicMock()
+    agent.run = AsyncMock(return_value=result)
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_traced_run_exports_chrome_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_service, "WORKFLOW_TRACE_DIR", str(tmp_path))
+    service = GraphWorkflowService(checkpoint_path=None, trace_enabled=True)
+
+    referee = RefereeAgentOutput(
+        is_valid=True,
+        violations=[],
+        rationale={
+            "reasoning_summary": "coherent",
+            "chain_checks": {
+                "feedback_transcript_alignment": True,
+                "planner_feedback_incorporation": True,
+                "new_words_plan_alignment": True,
+                "overall_chain_coherence": True,
+            },
+        },
+    )
+    words_json = json.dumps({"new_words": ["avec"], "usages": {"avec": {"fr": "Avec toi.", "en": "With you."}}})
+
+    with patch("freelingo_agent.services.llm_service.feedback_agent",
+               agent_returning(FeedbackAgentOutput(strengths=["ok"], mistakes=[], conversation_examples=[]))), \
+         patch("freelingo_agent.services.llm_service.planner_agent",
+               agent_returning(PlannerAgentOutput(session_objectives=["a"], vocab_gaps=["b"]))), \
+         patch("freelingo_agent.services.llm_service.words_agent", agent_returning(words_json)), \
+         patch("freelingo_agent.services.llm_service.referee_agent", agent_returning(referee)):
+        final_state = await service.run_workflow(GraphState(
+            user_id="trace_user",
+            session_id="traced-session",
+            known_words=["bonjour"],
+            transcript=Transcript(transcript=[]),
+        ))
+
+    assert final_state.tokens_used == 4 * 120
+
+    trace = trace_service.load_trace("traced-session")
+    assert trace["metadata"]["user_id"] == "trace_user"
+    events = trace["traceEvents"]
+
+    nodes = [e["name"] for e in events if e.get("cat") == "node"]
+    assert nodes == ["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE"]
+
+    llm_calls = [e for e in events if e.get("cat") == "llm"]
+    assert [e["name"] for e in llm_calls] == ["feedback_agent", "planner_agent", "words_agent", "referee_agent"]
+    assert all(e["args"]["prompt_chars"] > 0 and e["args"]["total_tokens"] == 120 for e in llm_calls)
+
+    # LLM spans nest inside their node span on the timeline
+    feedback_node = next(e for e in events if e["name"] == "FEEDBACK")
+    assert feedback_node["ts"] <= llm_calls[0]["ts"]
+    assert llm_calls[0]["ts"] + llm_calls[0]["dur"] <= feedback_node["ts"] + feedback_node["dur"]
+
+    decision = next(e for e in events if e["name"] == "referee_decision")
+    assert decision["ph"] == "i"
+    assert decision["args"] == {"is_valid": True, "violations": [], "next_agent": "END"}
+
+    # Also persisted for the CLI
+    with open(tmp_path / "traced-session.json", encoding="utf-8") as f:
+        assert json.load(f)["metadata"]["run_id"] == "traced-session"
+
+
+@pytest.mark.asyncio
+async def test_untraced_run_records_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_service, "WORKFLOW_TRACE_DIR", str(tmp_path))
+    service = GraphWorkflowService(checkpoint_path=None, trace_enabled=False)
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(side_effect=RuntimeError("down"))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(side_effect=RuntimeError("down"))), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(side_effect=RuntimeError("down"))), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(side_effect=RuntimeError("down"))):
+        await service.run_workflow(GraphState(user_id="trace_user", session_id="untraced-session"))
+
+    assert trace_service.load_trace("untraced-session") is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,184 @@
+"""
+Tests for write-behind persistence of live dialogue turns.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.dialogue_model import DialogueResponse
+from freelingo_agent.services import turn_writer_service
+from freelingo_agent.services.dialogue_service import run_dialogue_turn
+from freelingo_agent.services.dialogue_session_service import end_dialogue_session_service
+from freelingo_agent.services.turn_writer_service import TurnWriter
+from freelingo_agent.services.user_session_service import get_session, clear_dialogue_in_session
+
+
+class FakeDB:
+    def __init__(self, fail_times: int = 0):
+        self.session_batches = []
+        self.turn_batches = []
+        self.fail_times = fail_times
+
+    def write_sessions(self, rows):
+        self.session_batches.append(list(rows))
+
+    def write_turns(self, rows):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("db unavailable")
+        self.turn_batches.append(list(rows))
+
+    @property
+    def turns(self):
+        return [row for batch in self.turn_batches for row in batch]
+
+
+def turn(idx: int):
+    return {"session_id": "s1", "idx": idx}
+
+
+@pytest.mark.asyncio
+async def test_flushes_every_n_turns_and_on_request():
+    db = FakeDB()
+    writer = TurnWriter(batch_size=3, flush_interval=60, max_pending=100, write_sessions=db.write_sessions, write_turns=db.write_turns)
+
+    await writer.enqueue_session({"id": "s1"})
+    for idx in range(7):
+        await writer.enqueue_turn(turn(idx))
+    await asyncio.sleep(0.1)
+
+    # Two full batches went out on their own; the last turn waits for the interval
+    assert [len(batch) for batch in db.turn_batches] == [3, 3]
+    assert db.session_batches == [[{"id": "s1"}]]
+
+    assert await writer.flush()
+    assert [row["idx"] for row in db.turns] == list(range(7))
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval():
+    db = FakeDB()
+    writer = TurnWriter(batch_size=100, flush_interval=0.05, max_pending=100, write_sessions=db.write_sessions, write_turns=db.write_turns)
+
+    await writer.enqueue_turn(turn(0))
+    await writer.enqueue_turn(turn(1))
+    await asyncio.sleep(0.2)
+
+    assert db.turn_batches == [[turn(0), turn(1)]]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_full_backlog_makes_enqueue_wait():
+    release = threading.Event()
+    written = []
+
+    def slow_write(rows):
+        release.wait(5)
+        written.extend(rows)
+
+    writer = TurnWriter(batch_size=1, flush_interval=60, max_pending=2, write_sessions=lambda rows: None, write_turns=slow_write)
+    await writer.enqueue_turn(turn(0))
+    await asyncio.sleep(0.05)  # taken by the writer, which is now stuck in the DB
+    await writer.enqueue_turn(turn(1))
+    await writer.enqueue_turn(turn(2))
+
+    blocked = asyncio.create_task(writer.enqueue_turn(turn(3)))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    release.set()
+    await asyncio.wait_for(blocked, 2)
+    assert await writer.close()
+    assert [row["idx"] for row in written] == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_with_the_next_flush(monkeypatch):
+    monkeypatch.setattr(turn_writer_service, "RETRY_DELAY_SECONDS", 0)
+    db = FakeDB(fail_times=turn_writer_service.WRITE_ATTEMPTS)
+    writer = TurnWriter(batch_size=10, flush_interval=60, max_pending=100, write_sessions=db.write_sessions, write_turns=db.write_turns)
+
+    await writer.enqueue_turn(turn(0))
+    assert not await writer.flush()
+
+    await writer.enqueue_turn(turn(1))
+    assert await writer.flush()
+    assert [row["idx"] for row in db.turns] == [0, 1]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_carry_over_is_bounded_during_an_outage(monkeypatch):
+    monkeypatch.setattr(turn_writer_service, "RETRY_DELAY_SECONDS", 0)
+    db = FakeDB(fail_times=10 ** 6)
+    writer = TurnWriter(batch_size=1, flush_interval=0.01, max_pending=2, write_sessions=db.write_sessions, write_turns=db.write_turns)
+
+    for idx in range(4):
+        await asyncio.wait_for(writer.enqueue_turn(turn(idx)), 1)
+    blocked = asyncio.create_task(writer.enqueue_turn(turn(4)))
+    await asyncio.sleep(0.1)
+
+    # Two rows carried over, two waiting in the queue, and the next turn waits for the database
+    assert not blocked.done()
+    assert len(writer._carry_turns) == 2
+
+    db.fail_times = 0
+    await asyncio.wait_for(blocked, 2)
+    assert await writer.close()
+    assert [row["idx"] for row in db.turns] == [0, 1, 2, 3, 4]
+
+
+def dialogue_response(text: str) -> DialogueResponse:
+    return DialogueResponse.model_validate({
+        "rationale": {
+            "reasoning_summary": "r",
+            "vocabulary_challenge": {"description": "d", "tags": []},
+            "rule_checks": {
+                "used_only_allowed_vocabulary": True,
+                "one_sentence": True,
+                "max_eight_words": True,
+                "no_corrections_or_translations": True,
+            },
+        },
+        "ai_reply": {"text": text, "word_count": len(text.split())},
+    })
+
+
+@pytest.mark.asyncio
+async def test_live_session_turns_are_persisted_before_session_end():
+    user_id = "write_behind_user"
+    clear_dialogue_in_session(user_id)
+    get_session(user_id).known_words = []
+    db = FakeDB()
+    writer = TurnWriter(batch_size=100, flush_interval=0.05, max_pending=100, write_sessions=db.write_sessions, write_turns=db.write_turns)
+
+    async def reply(user_id, known_words, student_response, dialogue_history):
+        response = dialogue_response("Bonjour ?")
+        return response.ai_reply.text, dialogue_history + [student_response], response.__dict__
+
+    with patch("freelingo_agent.services.dialogue_session_service.turn_writer", writer), \
+         patch("freelingo_agent.services.dialogue_service.get_dialogue_response", AsyncMock(side_effect=reply)), \
+         patch("freelingo_agent.services.dialogue_service.fetch_known_words_async", AsyncMock(return_value=[])), \
+         patch("freelingo_agent.services.dialogue_session_service.complete_dialogue_session_db") as complete:
+        for message in ["", "bonjour", "oui"]:
+            await run_dialogue_turn(user_id, message)
+        session_id = get_session(user_id).session_id
+
+        # Written in the background while the session is still live
+        await asyncio.sleep(0.2)
+        assert db.session_batches[0][0]["id"] == session_id
+        assert [row["user_text"] for row in db.turns] == ["bonjour", "oui"]
+
+        assert await end_dialogue_session_service(user_id, ended_at="2030-01-01T00:00:00Z") == session_id
+
+    kwargs = complete.call_args.kwargs
+    assert kwargs["session_id"] == session_id and kwargs["turn_count"] == 2 and kwargs["message_count"] == 5
+    assert len(kwargs["messages"]["transcript"]) == 2
+    # The next turn starts a new session
+    assert get_session(user_id).session_id is None and get_session(user_id).transcript == []
+    await writer.close()
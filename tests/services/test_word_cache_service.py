@@ -0,0 +1,146 @@
+"""
+Tests for the per-user word cache and its write-through paths.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from freelingo_agent.models.words_model import Word
+from freelingo_agent.services import word_cache_service
+from freelingo_agent.services.word_cache_service import WordCache
+
+
+def make_words(user_id, count, start=0):
+    return [Word(id=f"{user_id}-{i}", user_id=user_id, word=f"mot{i}", translation=f"word {i}") for i in range(start, start + count)]
+
+
+class FakeBackend:
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, user_id):
+        return self.rows.get(user_id)
+
+    def set(self, user_id, rows):
+        self.rows[user_id] = rows
+
+    def delete(self, user_id):
+        self.rows.pop(user_id, None)
+
+
+def test_hits_misses_and_hit_rate():
+    cache = WordCache()
+    assert cache.get("u1") is None
+    cache.store("u1", make_words("u1", 3), cache.version("u1"))
+    assert [w.word for w in cache.get("u1")] == ["mot0", "mot1", "mot2"]
+    cache.get("u1")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+
+
+def test_lru_eviction_by_users_and_words():
+    cache = WordCache(max_users=2, max_words=10)
+    cache.store("u1", make_words("u1", 3), cache.version("u1"))
+    cache.store("u2", make_words("u2", 3), cache.version("u2"))
+    cache.get("u1")  # u2 is now least recently used
+    cache.store("u3", make_words("u3", 3), cache.version("u3"))
+    assert cache.find_word("u2", "u2-0") is None
+    assert cache.find_word("u1", "u1-0") is not None
+
+    # Over the word bound: u1 (least recent) goes
+    cache.store("u4", make_words("u4", 5), cache.version("u4"))
+    assert cache.stats()["users"] == 2
+    assert cache.stats()["words"] == 8
+    assert cache.find_word("u1", "u1-0") is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_writes_update_cached_list_in_place():
+    cache = WordCache()
+    cache.store("u1", make_words("u1", 2), cache.version("u1"))
+
+    cache.put_word(Word(id="u1-new", user_id="u1", word="neuf", translation="new"))
+    cache.put_word(Word(id="u1-1", user_id="u1", word="mot1", translation="updated"))
+    cache.remove_word("u1", "u1-0")
+
+    words = cache.get("u1")
+    assert [(w.id, w.translation) for w in words] == [("u1-new", "new"), ("u1-1", "updated")]
+    assert cache.stats()["words"] == 2
+
+
+def test_load_overlapping_a_write_is_not_stored():
+    cache = WordCache()
+    version = cache.version("u1")
+    stale = make_words("u1", 2)  # read from the DB before the write below landed
+    cache.put_word(Word(id="u1-new", user_id="u1", word="neuf", translation="new"))
+
+    assert cache.store("u1", stale, version) is False
+    assert cache.get("u1") is None
+    # A load started after the write is fine
+    assert cache.store("u1", make_words("u1", 3), cache.version("u1")) is True
+
+
+def test_expired_entries_reload(monkeypatch):
+    cache = WordCache(ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr(word_cache_service.time, "monotonic", lambda: now[0])
+    cache.store("u1", make_words("u1", 1), cache.version("u1"))
+    assert cache.get("u1") is not None
+    now[0] += 61
+    assert cache.get("u1") is None
+
+
+def test_shared_backend_fills_and_is_written_through():
+    backend = FakeBackend()
+    first = WordCache(backend=backend)
+    second = WordCache(backend=backend)
+
+    first.store("u1", make_words("u1", 2), first.version("u1"))
+    assert [w.id for w in second.get("u1")] == ["u1-0", "u1-1"]
+
+    first.remove_word("u1", "u1-0")
+    assert [row["id"] for row in backend.rows["u1"]] == ["u1-1"]
+
+    # A write where the list is not cached drops the shared copy instead of leaving it stale
+    third = WordCache(backend=backend)
+    third.put_word(Word(id="u1-2", user_id="u1", word="mot2", translation="word 2"))
+    assert "u1" not in backend.rows
+
+
+def test_cached_accessors_hit_the_db_once(monkeypatch):
+    monkeypatch.setattr(word_cache_service, "word_cache", WordCache())
+    with patch.object(word_cache_service, "get_user_words", return_value=make_words("u1", 2)) as db_read, \
+         patch.object(word_cache_service, "delete_word", return_value=True), \
+         patch.object(word_cache_service, "get_word") as db_get_word:
+        assert len(word_cache_service.get_user_words_cached("u1")) == 2
+        assert len(word_cache_service.get_user_words_cached("u1")) == 2
+        assert db_read.call_count == 1
+
+        # Ownership checks come from the cached list
+        assert word_cache_service.find_user_word("u1", "u1-1").word == "mot1"
+        db_get_word.assert_not_called()
+
+        assert word_cache_service.delete_user_word("u1", "u1-1") is True
+        assert [w.id for w in word_cache_service.get_user_words_cached("u1")] == ["u1-0"]
+        assert db_read.call_count == 1
+
+
+def test_versioned_reads_reload_lists_of_unknown_version(monkeypatch):
+    monkeypatch.setattr(word_cache_service, "word_cache", WordCache())
+    with patch.object(word_cache_service, "get_user_words", return_value=make_words("u1", 2)) as db_read:
+        # Loaded without a version, then the DB moves on (another process adds a word)
+        word_cache_service.get_user_words_cached("u1")
+        db_read.return_value = make_words("u1", 3)
+        assert len(word_cache_service.get_user_words_cached("u1", vocabulary_version=5)) == 3
+        assert db_read.call_count == 2
+
+        # Loaded at version 5: served from the cache while the version holds
+        assert len(word_cache_service.get_user_words_cached("u1", vocabulary_version=5)) == 3
+        assert db_read.call_count == 2
+
+        # A local write leaves the version unknown: the next versioned read reloads
+        word_cache_service.word_cache.put_word(Word(id="u1-9", user_id="u1", word="mot9", translation="word 9"))
+        db_read.return_value = make_words("u1", 4)
+        assert len(word_cache_service.get_user_words_cached("u1", vocabulary_version=6)) == 4
+        assert db_read.call_count == 3
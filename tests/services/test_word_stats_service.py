@@ -0,0 +1,166 @@
+"""
+Tests for per-word spaced-repetition stats and the precomputed review queue,
+run against the embedded SQLite repository.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from freelingo_agent.db import words as words_db
+from freelingo_agent.db.repository import set_repository
+from freelingo_agent.db.sqlite_repository import SqliteRepository
+from freelingo_agent.db.word_stats import get_word_stats_db
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput, Mistake
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.models.words_model import Word, WordStats
+from freelingo_agent.services.llm_service import get_plan
+from freelingo_agent.services.word_cache_service import word_cache
+from freelingo_agent.services.word_stats_service import (
+    apply_review, count_word_occurrences, get_review_queue, get_review_words, review_priority,
+    update_word_stats_after_session,
+)
+
+USER = "stats_user"
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def sqlite_backend():
+    repository = SqliteRepository(":memory:")
+    set_repository(repository)
+    word_cache.clear()
+    yield repository
+    set_repository(None)
+    word_cache.clear()
+    repository.close()
+
+
+def turn(ai_text: str, user_text: str) -> dict:
+    return {
+        "ai_turn": {
+            "rationale": {
+                "reasoning_summary": "",
+                "vocabulary_challenge": {"description": "", "tags": []},
+                "rule_checks": {
+                    "used_only_allowed_vocabulary": True,
+                    "one_sentence": True,
+                    "max_eight_words": True,
+                    "no_corrections_or_translations": True,
+                },
+            },
+            "ai_reply": {"text": ai_text, "word_count": len(ai_text.split())},
+        },
+        "user_turn": {"text": user_text},
+    }
+
+
+def transcript(*turns: dict) -> Transcript:
+    return Transcript.model_validate({"transcript": list(turns)})
+
+
+def add_words(*texts: str) -> dict:
+    return {text: words_db.create_word(USER, Word(user_id=USER, word=text, translation="t")).id for text in texts}
+
+
+def feedback(*said: str) -> FeedbackAgentOutput:
+    return FeedbackAgentOutput(
+        strengths=[],
+        mistakes=[Mistake(what_you_said=s, simple_explanation="", better_way="") for s in said],
+        conversation_examples=[],
+    )
+
+
+def test_counts_phrases_case_accents_and_punctuation():
+    words = [
+        Word(id="1", user_id=USER, word="café", translation="t"),
+        Word(id="2", user_id=USER, word="parce que", translation="t"),
+        Word(id="3", user_id=USER, word="j'aime", translation="t"),
+        Word(id="4", user_id=USER, word="thé", translation="t"),
+    ]
+    session = transcript(
+        turn("Tu aimes le café ?", "Oui, J’aime le CAFE parce que c'est bon."),
+        turn("Pourquoi ?", "Parce que... j'aime!"),
+    )
+
+    counts = count_word_occurrences(words, session, ["j'aime le cafe"])
+    assert counts == {"1": (1, 1, 1), "2": (2, 0, 0), "3": (2, 0, 1)}
+
+
+def test_sm2_intervals_grow_and_reset_on_error():
+    stats = WordStats(word_id="1", user_id=USER)
+    intervals = []
+    for _ in range(3):
+        apply_review(stats, 5, NOW)
+        intervals.append(stats.interval_days)
+    assert intervals == [1.0, 6.0, 16.2]
+    assert stats.ease == 2.8
+
+    apply_review(stats, 2, NOW)
+    assert (stats.repetitions, stats.interval_days, stats.due_at) == (0, 1.0, NOW + timedelta(days=1))
+    assert stats.ease == 2.48
+
+
+def test_priority_orders_overdue_before_unpractised():
+    overdue = WordStats(word_id="1", user_id=USER, interval_days=2, due_at=NOW - timedelta(days=4), times_used=2, error_count=1)
+    not_due = WordStats(word_id="2", user_id=USER, interval_days=6, due_at=NOW + timedelta(days=1))
+    assert review_priority(overdue, NOW) == 3.5
+    assert review_priority(not_due, NOW) is None
+    assert review_priority(None, NOW) == 0.5
+
+
+def test_session_updates_stats_and_rebuilds_queue():
+    ids = add_words("bonjour", "merci", "pomme", "chat")
+    session = transcript(
+        turn("Bonjour ! Une pomme ?", "bonjour, merci"),
+        turn("Tu aimes la pomme ?", "je mange la pome"),
+    )
+
+    update_word_stats_after_session(USER, session, feedback("je mange la pomme"), now=NOW)
+
+    stats = {row["word_id"]: row for row in get_word_stats_db(USER)}
+    assert set(stats) == {ids["bonjour"], ids["merci"], ids["pomme"]}
+    assert (stats[ids["bonjour"]]["times_used"], stats[ids["bonjour"]]["times_offered"]) == (1, 1)
+    assert (stats[ids["pomme"]]["times_offered"], stats[ids["pomme"]]["error_count"]) == (2, 1)
+    # Failed: due again tomorrow; chat did not come up at all
+    assert (stats[ids["pomme"]]["repetitions"], stats[ids["pomme"]]["interval_days"]) == (0, 1.0)
+    assert stats[ids["merci"]]["repetitions"] == 1
+
+    # Nothing is due yet; chat was never used
+    assert [item.word for item in get_review_queue(USER).items] == ["chat"]
+
+    # Two days later pomme (failed) is most urgent, then the words due yesterday, then chat
+    update_word_stats_after_session(USER, transcript(), now=NOW + timedelta(days=2))
+    queue = get_review_queue(USER)
+    assert [item.word for item in queue.items] == ["pomme", "bonjour", "merci", "chat"]
+    assert (queue.items[0].priority, queue.items[0].error_count) == (3.0, 1)
+
+
+def test_queue_is_capped_and_built_on_first_read():
+    add_words("un", "deux", "trois")
+
+    queue = get_review_queue(USER, limit=2)
+    # Never practised: oldest first
+    assert [item.word for item in queue.items] == ["un", "deux"]
+    assert get_review_words(USER, 1) == ["un"]
+
+
+def test_deleted_words_are_left_out_until_the_next_rebuild():
+    ids = add_words("un", "deux")
+    get_review_queue(USER)
+    words_db.delete_word(ids["un"])
+
+    assert [item.word for item in get_review_queue(USER).items] == ["deux"]
+
+
+@pytest.mark.asyncio
+async def test_planner_gets_review_words_instead_of_vocabulary():
+    run = AsyncMock(return_value=type("Result", (), {"output": PlannerAgentOutput(session_objectives=[], vocab_gaps=[])})())
+    with patch("freelingo_agent.services.llm_service.planner_agent.run", run):
+        await get_plan(known_words=["bonjour", "merci", "pomme"], review_words=["pomme"])
+
+    prompt = run.await_args.kwargs["user_prompt"]
+    assert 'review_words: ["pomme"]' in prompt and "known_word_count: 3" in prompt
+    assert "known_words:" not in prompt
@@ -0,0 +1,73 @@
+"""
+Tests for paginated, projected word listing.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from freelingo_agent.models.words_model import Word
+from freelingo_agent.services import word_cache_service, words_service
+from freelingo_agent.services.word_cache_service import WordCache
+
+
+def db_rows(count):
+    # Newest first, as the DB returns them
+    return [
+        {"id": f"w{i}", "created_at": f"2024-01-{i + 1:02d}T00:00:00+00:00", "word": f"mot{i}", "translation": f"word {i}"}
+        for i in reversed(range(count))
+    ]
+
+
+def test_parse_word_fields():
+    assert words_service.parse_word_fields(None) == words_service.WORD_FIELDS
+    assert words_service.parse_word_fields(" word, id,word ") == ("word", "id")
+    with pytest.raises(ValueError):
+        words_service.parse_word_fields("word,password")
+
+
+def test_pages_follow_cursor_and_project_fields():
+    rows = db_rows(5)
+
+    def fake_page(user_id, limit, before, columns):
+        start = 0
+        if before:
+            start = next(i for i, row in enumerate(rows) if (row["created_at"], row["id"]) == before) + 1
+        return rows[start:start + limit]
+
+    with patch.object(words_service, "list_user_words_page_db", side_effect=fake_page) as page_db:
+        first = words_service.list_user_words_service("u1", limit=2, fields="word")
+        second = words_service.list_user_words_service("u1", limit=2, cursor=first["next_cursor"], fields="word")
+        last = words_service.list_user_words_service("u1", limit=2, cursor=second["next_cursor"], fields="word")
+
+    assert first["words"] == [{"word": "mot4"}, {"word": "mot3"}]
+    assert second["words"] == [{"word": "mot2"}, {"word": "mot1"}]
+    assert last == {"words": [{"word": "mot0"}], "next_cursor": None}
+    # Only the requested columns are selected (the sort keys are added by the query itself)
+    assert page_db.call_args_list[0].args == ("u1", 3, None, ("word",))
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        words_service.list_user_words_service("u1", limit=2, cursor="not-a-cursor")
+
+
+def test_full_list_is_served_from_cache_and_reloaded_on_version_change(monkeypatch):
+    monkeypatch.setattr(word_cache_service, "word_cache", WordCache())
+    words = [Word(id="w1", user_id="u1", word="chat", translation="cat")]
+
+    with patch.object(word_cache_service, "get_user_words", return_value=words) as db_read:
+        listing = words_service.list_user_words_service("u1", fields="id,word", vocabulary_version=3)
+        assert listing == {"words": [{"id": "w1", "word": "chat"}], "next_cursor": None}
+        words_service.list_user_words_service("u1", vocabulary_version=3)
+        assert db_read.call_count == 1
+
+        # Another process changed the vocabulary: the cached list is dropped
+        words_service.list_user_words_service("u1", vocabulary_version=4)
+        assert db_read.call_count == 2
+
+        # A write through this process leaves the list's version unknown: the next versioned read reloads it
+        word_cache_service.word_cache.put_word(Word(id="w2", user_id="u1", word="chien", translation="dog"))
+        db_read.return_value = [Word(id="w2", user_id="u1", word="chien", translation="dog")] + words
+        listing = words_service.list_user_words_service("u1", fields="word", vocabulary_version=5)
+        assert listing["words"] == [{"word": "chien"}, {"word": "chat"}]
+        assert db_read.call_count == 3
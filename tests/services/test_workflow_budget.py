@@ -0,0 +1,146 @@
+"""
+Tests for the per-run workflow budget: the referee loop stops when the remaining
+wall-clock or token budget cannot pay for another round, and the best-scoring
+outputs seen so far are returned.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.services.llm_service import LLMUsage
+
+
+PLAN = PlannerAgentOutput(session_objectives=["Ask questions"], vocab_gaps=["Question words"])
+WORDS = WordSuggestion(new_words=["pourquoi"], usages={"pourquoi": {"fr": "Pourquoi ?", "en": "Why?"}})
+
+
+def feedback(label: str) -> FeedbackAgentOutput:
+    return FeedbackAgentOutput(strengths=[label], mistakes=[], conversation_examples=[])
+
+
+def invalid_decision(passing_checks: int) -> RefereeAgentOutput:
+    checks = ["feedback_transcript_alignment", "planner_feedback_incorporation", "new_words_plan_alignment", "overall_chain_coherence"]
+    return RefereeAgentOutput(
+        is_valid=False,
+        violations=["feedback_misaligned_with_transcript"],
+        rationale={
+            "reasoning_summary": "Feedback does not match the transcript",
+            "chain_checks": {check: i < passing_checks for i, check in enumerate(checks)},
+        },
+    )
+
+
+def make_state(**budget) -> GraphState:
+    return GraphState(
+        user_id="test_user_budget",
+        known_words=["bonjour", "merci"],
+        transcript=Transcript(transcript=[]),
+        **budget,
+    )
+
+
+class FakeClock:
+    """Stands in for the time module of graph_workflow_service; agent calls advance it instead of sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def slow(clock: FakeClock, value):
+    async def call(**kwargs):
+        clock.now += 0.05
+        return value() if callable(value) else value
+    return call
+
+
+@pytest.mark.asyncio
+async def test_time_budget_stops_loop_and_returns_best_round():
+    service = GraphWorkflowService(checkpoint_path=None)
+    clock = FakeClock()
+    feedbacks = iter([feedback("round 1"), feedback("round 2"), feedback("round 3")])
+    decisions = iter([invalid_decision(3), invalid_decision(1), invalid_decision(0)])
+
+    with patch("freelingo_agent.services.graph_workflow_service.time", clock), \
+         patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(side_effect=slow(clock, lambda: next(feedbacks)))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(side_effect=slow(clock, PLAN))), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(side_effect=slow(clock, WORDS))), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(side_effect=slow(clock, lambda: next(decisions)))):
+        final_state = await service.run_workflow(make_state(time_budget_seconds=0.5))
+
+    # Two rounds fit in the budget, a third would not
+    assert final_state.state_transitions.count("REFEREE") == 2
+    assert final_state.budget_exhausted
+    # Round 1 scored best, so its feedback is returned
+    assert final_state.last_feedback.strengths == ["round 1"]
+    assert final_state.agent_retry_count == {"FEEDBACK": 1}
+
+    summary = service.budget_summary(final_state)
+    assert summary["node_runs"] == {"FEEDBACK": 2, "PLANNER": 2, "NEW_WORDS": 2, "REFEREE": 2}
+    assert summary["time_spent_seconds"] == pytest.approx(0.4)
+
+
+@pytest.mark.asyncio
+async def test_token_budget_stops_loop():
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    @contextmanager
+    def thousand_tokens_per_node():
+        yield LLMUsage(requests=1, total_tokens=1000)
+
+    with patch("freelingo_agent.services.graph_workflow_service.track_llm_usage", thousand_tokens_per_node), \
+         patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(return_value=feedback("only round"))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(return_value=PLAN)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=invalid_decision(2))):
+        final_state = await service.run_workflow(make_state(token_budget=5000))
+
+    assert final_state.state_transitions == ["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE"]
+    assert final_state.tokens_used == 4000
+    assert final_state.budget_exhausted
+
+
+@pytest.mark.asyncio
+async def test_retry_limit_still_bounds_unlimited_budget():
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(return_value=feedback("again"))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(return_value=PLAN)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=invalid_decision(0))):
+        final_state = await service.run_workflow(make_state(time_budget_seconds=60))
+
+    assert final_state.agent_retry_count == {"FEEDBACK": 3}
+    assert final_state.state_transitions.count("REFEREE") == 4
+    assert not final_state.budget_exhausted
+
+
+@pytest.mark.asyncio
+async def test_referee_failure_keeps_best_round():
+    service = GraphWorkflowService(checkpoint_path=None)
+    feedbacks = iter([feedback("round 1")] + [feedback("later round")] * 3)
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(side_effect=lambda **kwargs: next(feedbacks))), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(return_value=PLAN)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain",
+               AsyncMock(side_effect=[invalid_decision(3)] + [RuntimeError("referee down")] * 3)):
+        final_state = await service.run_workflow(make_state(time_budget_seconds=60))
+
+    # The fallback decision is a real (failing) round, not a crash that drops the run's outputs
+    assert final_state.referee_feedback_history[1].violations == ["referee_agent_failed"]
+    assert final_state.last_feedback.strengths == ["round 1"]
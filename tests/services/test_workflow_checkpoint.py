@@ -0,0 +1,94 @@
+"""
+Tests for checkpointed workflow runs: a run that dies mid-graph is resumed
+from its last completed node instead of starting over.
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+
+
+class SimulatedCrash(BaseException):
+    """Escapes the nodes' `except Exception` handlers like a killed process would"""
+
+
+FEEDBACK = FeedbackAgentOutput(strengths=["Good greetings"], mistakes=[], conversation_examples=[])
+PLAN = PlannerAgentOutput(session_objectives=["Ask questions"], vocab_gaps=["Question words"])
+WORDS = WordSuggestion(new_words=["pourquoi"], usages={"pourquoi": {"fr": "Pourquoi ?", "en": "Why?"}})
+VALID = RefereeAgentOutput(
+    is_valid=True,
+    violations=[],
+    rationale={
+        "reasoning_summary": "Chain is coherent",
+        "chain_checks": {
+            "feedback_transcript_alignment": True,
+            "planner_feedback_incorporation": True,
+            "new_words_plan_alignment": True,
+            "overall_chain_coherence": True,
+        },
+    },
+)
+
+
+def make_state(session_id: str) -> GraphState:
+    return GraphState(
+        user_id="test_user_checkpoint",
+        known_words=["bonjour", "merci"],
+        session_id=session_id,
+        transcript=Transcript(transcript=[]),
+    )
+
+
+@pytest.mark.asyncio
+async def test_completed_run_leaves_no_checkpoint(tmp_path):
+    service = GraphWorkflowService(checkpoint_path=str(tmp_path / "checkpoints.db"))
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", AsyncMock(return_value=FEEDBACK)), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", AsyncMock(return_value=PLAN)), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=VALID)):
+        final_state = await service.run_workflow(make_state("session-done"))
+
+    assert final_state.state_transitions == ["FEEDBACK", "PLANNER", "NEW_WORDS", "REFEREE"]
+    assert await service.list_interrupted_runs() == []
+    assert await service.resume_workflow("session-done") is None
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_from_last_completed_node(tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoints.db")
+    feedback_mock = AsyncMock(return_value=FEEDBACK)
+    plan_mock = AsyncMock(return_value=PLAN)
+
+    crashing_service = GraphWorkflowService(checkpoint_path=checkpoint_path)
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", feedback_mock), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", plan_mock), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(side_effect=SimulatedCrash())):
+        with pytest.raises(SimulatedCrash):
+            await crashing_service.run_workflow(make_state("session-crashed"))
+
+    # A fresh service (new process) sees the run and resumes it without re-running FEEDBACK/PLANNER
+    service = GraphWorkflowService(checkpoint_path=checkpoint_path)
+    assert await service.list_interrupted_runs() == ["session-crashed"]
+    interrupted = await service.get_interrupted_run("session-crashed")
+    assert interrupted.user_id == "test_user_checkpoint"
+    assert interrupted.last_plan == PLAN
+
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", feedback_mock), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan", plan_mock), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words", AsyncMock(return_value=WORDS)), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=VALID)):
+        final_state = await service.resume_workflow("session-crashed")
+
+    assert feedback_mock.await_count == 1
+    assert plan_mock.await_count == 1
+    assert final_state.last_words == WORDS
+    assert final_state.last_referee_decision.is_valid
+    assert await service.list_interrupted_runs() == []
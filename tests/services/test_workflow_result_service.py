@@ -0,0 +1,161 @@
+"""
+Tests that session-end workflow results are stored by session id + transcript hash
+and reused by retries instead of re-running the agents.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from freelingo_agent.models.graph_state import GraphState
+from freelingo_agent.models.feedback_model import FeedbackAgentOutput
+from freelingo_agent.models.planner_model import PlannerAgentOutput
+from freelingo_agent.models.words_model import WordSuggestion
+from freelingo_agent.models.referee_model import RefereeAgentOutput
+from freelingo_agent.models.transcript_model import Transcript
+from freelingo_agent.services.graph_workflow_service import GraphWorkflowService
+from freelingo_agent.services.workflow_result_service import (
+    run_session_workflow, get_session_workflow_result, retry_session_workflow, transcript_hash,
+)
+
+AI_TURN = {
+    "rationale": {
+        "reasoning_summary": "greet",
+        "vocabulary_challenge": {"description": "few words", "tags": []},
+        "rule_checks": {
+            "used_only_allowed_vocabulary": True,
+            "one_sentence": True,
+            "max_eight_words": True,
+            "no_corrections_or_translations": True,
+        },
+    },
+    "ai_reply": {"text": "Bonjour ?", "word_count": 1},
+}
+
+
+def make_state(user_text: str = "bonjour") -> GraphState:
+    return GraphState(
+        user_id="result_user",
+        session_id="result-session",
+        known_words=["bonjour"],
+        transcript=Transcript.model_validate({"transcript": [{"ai_turn": AI_TURN, "user_turn": {"text": user_text}}]}),
+    )
+
+
+class FakeResultsTable:
+    """In-memory stand-in for the workflow_results table"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def save(self, **row):
+        self.rows[(row["session_id"], row["transcript_hash"])] = row
+        return True
+
+    def get(self, session_id, transcript_hash=None):
+        matches = [row for (sid, h), row in self.rows.items() if sid == session_id and transcript_hash in (None, h)]
+        return matches[-1] if matches else None
+
+
+@pytest.fixture
+def results_table():
+    table = FakeResultsTable()
+    with patch("freelingo_agent.services.workflow_result_service.save_workflow_result_db", side_effect=table.save), \
+         patch("freelingo_agent.services.workflow_result_service.get_workflow_result_db", side_effect=table.get):
+        yield table
+
+
+@pytest.fixture
+def feedback_agent():
+    referee = RefereeAgentOutput(
+        is_valid=True,
+        violations=[],
+        rationale={
+            "reasoning_summary": "ok",
+            "chain_checks": {
+                "feedback_transcript_alignment": True,
+                "planner_feedback_incorporation": True,
+                "new_words_plan_alignment": True,
+                "overall_chain_coherence": True,
+            },
+        },
+    )
+
+    async def slow_feedback(**kwargs):
+        await asyncio.sleep(0.05)
+        return FeedbackAgentOutput(strengths=["ok"], mistakes=[], conversation_examples=[])
+
+    feedback = AsyncMock(side_effect=slow_feedback)
+    with patch("freelingo_agent.services.graph_workflow_service.get_feedback", feedback), \
+         patch("freelingo_agent.services.graph_workflow_service.get_plan",
+               AsyncMock(return_value=PlannerAgentOutput(session_objectives=["a"], vocab_gaps=["b"]))), \
+         patch("freelingo_agent.services.graph_workflow_service.suggest_new_words",
+               AsyncMock(return_value=WordSuggestion(new_words=["avec"], usages={}))), \
+         patch("freelingo_agent.services.graph_workflow_service.validate_agent_chain", AsyncMock(return_value=referee)):
+        yield feedback
+
+
+@pytest.mark.asyncio
+async def test_result_is_stored_and_reused(results_table, feedback_agent):
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    first = await run_session_workflow(service, make_state())
+    assert first.plan.session_objectives == ["a"] and first.new_words.new_words == ["avec"]
+    assert results_table.rows[("result-session", transcript_hash(make_state().transcript))]["is_valid"] is True
+
+    again = await run_session_workflow(service, make_state())
+    assert again.feedback == first.feedback and again.transcript_hash == first.transcript_hash
+    assert feedback_agent.await_count == 1
+
+    # A different transcript for the same session is a different key
+    await run_session_workflow(service, make_state("salut"))
+    assert feedback_agent.await_count == 2
+
+    stored = await get_session_workflow_result("result-session")
+    assert stored.user_id == "result_user"
+
+
+@pytest.mark.asyncio
+async def test_retry_joins_in_flight_run_and_survives_cancelled_caller(results_table, feedback_agent):
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    # The first caller's connection drops mid-run
+    first = asyncio.create_task(run_session_workflow(service, make_state()))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    retried = await get_session_workflow_result("result-session")
+    assert retried is not None and retried.feedback.strengths == ["ok"]
+    assert feedback_agent.await_count == 1
+    assert len(results_table.rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_without_feedback_is_not_stored(results_table):
+    service = GraphWorkflowService(checkpoint_path=None)
+
+    with patch.object(service, "trigger_feedback_loop", AsyncMock(side_effect=lambda state: state)):
+        assert await run_session_workflow(service, make_state()) is None
+
+    assert results_table.rows == {}
+
+
+@pytest.mark.asyncio
+async def test_run_without_feedback_is_retried_from_saved_transcript(results_table, feedback_agent):
+    service = GraphWorkflowService(checkpoint_path=None)
+    saved = {"id": "result-session", "user_id": "result_user", "messages": make_state().transcript.model_dump()}
+
+    with patch.object(service, "trigger_feedback_loop", AsyncMock(side_effect=lambda state: state)):
+        assert await run_session_workflow(service, make_state()) is None
+
+    with patch("freelingo_agent.services.workflow_result_service.get_dialogue_session_db", return_value=saved), \
+         patch("freelingo_agent.services.word_cache_service.get_user_words_cached", return_value=[]), \
+         patch("freelingo_agent.services.dialogue_turn_service.get_learner_history", return_value=None), \
+         patch("freelingo_agent.services.word_stats_service.get_review_words", return_value=[]):
+        assert await retry_session_workflow(service, "someone_else", "result-session") is None
+        retried = await retry_session_workflow(service, "result_user", "result-session")
+
+    assert retried.feedback.strengths == ["ok"]
+    assert retried.transcript_hash == transcript_hash(make_state().transcript)
+    assert len(results_table.rows) == 1
@@ -0,0 +1,135 @@
+"""
+Tests for the Supabase JWKS manager: TTL expiry, refresh on an unknown kid
+(rate limited), one fetch for concurrent cold requests, and known keys kept
+when a refresh fails.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from unittest.mock import patch
+
+from freelingo_agent.utils.auth import JwksManager, verify_jwt
+
+
+def signing_key(kid: str):
+    """Private PEM to sign tokens with, and the public JWK the server publishes"""
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_pem = private.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    public = jwk.construct(public_pem, algorithm="RS256").to_dict()
+    return pem, {**public, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+KEYS = {kid: signing_key(kid) for kid in ("k1", "k2")}
+
+
+def token(kid: str, sub: str = "learner") -> str:
+    return jwt.encode({"sub": sub, "email": f"{sub}@example.com"}, KEYS[kid][0], algorithm="RS256", headers={"kid": kid})
+
+
+class FakeClock:
+    """Stands in for the time module of utils.auth"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("freelingo_agent.utils.auth.time", fake):
+        yield fake
+
+
+class KeyServer:
+    """JWKS endpoint serving the currently published kids, counting fetches"""
+
+    def __init__(self, *kids: str):
+        self.kids = list(kids)
+        self.fetches = 0
+        self.failing = False
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.fetches += 1
+        # Lets concurrent callers pile up while the fetch is in flight
+        await asyncio.sleep(0.01)
+        if self.failing:
+            return httpx.Response(503)
+        return httpx.Response(200, content=json.dumps({"keys": [KEYS[kid][1] for kid in self.kids]}))
+
+
+def manager(server: KeyServer) -> JwksManager:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    return JwksManager("https://project.supabase.co/auth/v1/keys", ttl_seconds=600, min_refresh_seconds=30, client=client)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_requests_share_one_fetch(clock):
+    server = KeyServer("k1")
+    keys = manager(server)
+
+    with patch("freelingo_agent.utils.auth.jwks", keys):
+        payloads = await asyncio.gather(*(verify_jwt(token("k1", f"user{i}")) for i in range(20)))
+        assert [payload["sub"] for payload in payloads] == [f"user{i}" for i in range(20)]
+        await verify_jwt(token("k1"))
+    assert server.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_key_set_is_refetched_after_the_ttl(clock):
+    server = KeyServer("k1")
+    keys = manager(server)
+    first = await keys.get_key("k1")
+    clock.now += 599
+    assert await keys.get_key("k1") is first and server.fetches == 1
+
+    clock.now += 2
+    await keys.get_key("k1")
+    assert server.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_rotated_key_is_fetched_on_unknown_kid_at_most_every_min_interval(clock):
+    server = KeyServer("k1")
+    keys = manager(server)
+    await keys.get_key("k1")
+
+    server.kids = ["k1", "k2"]
+    clock.now += 10
+    # Too soon after the last fetch: unknown kids do not trigger a refetch yet
+    with pytest.raises(Exception, match="Unable to find matching JWK"):
+        await keys.get_key("k2")
+    assert server.fetches == 1
+
+    clock.now += 20
+    with patch("freelingo_agent.utils.auth.jwks", keys):
+        assert (await verify_jwt(token("k2")))["sub"] == "learner"
+        with pytest.raises(HTTPException):
+            await verify_jwt(token("k2")[:-4] + "AAAA")
+    assert server.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_known_keys(clock):
+    server = KeyServer("k1")
+    keys = manager(server)
+    known = await keys.get_key("k1")
+
+    server.failing = True
+    clock.now += 601
+    assert await keys.get_key("k1") is known
+    assert server.fetches == 2
+
+    cold = manager(server)
+    with pytest.raises(httpx.HTTPStatusError):
+        await cold.get_key("k1")